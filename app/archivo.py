@@ -0,0 +1,173 @@
+import argparse
+import sys
+import time
+from datetime import date, datetime, timedelta
+from typing import List, Optional, Tuple
+
+from sqlalchemy import Column, Index, Table, delete, exists, func, insert, select, text
+from sqlalchemy.orm import Session, declarative_base
+
+from . import models
+from .config import settings
+
+# -------------------------
+# Historial frío: inspecciones viejas en un SQLite aparte (ARCHIVE_DATABASE), adjunto como `archivo`
+# -------------------------
+ESQUEMA = "archivo"
+PAUSA_LOTE = 0.05  # segundos entre lotes: deja pasar a los escritores de la API
+TABLAS = ("inspecciones", "inspeccion_detalles")
+
+# Mover no es borrar: con una fila aquí los triggers de borrado de TABLAS no hacen nada
+MARCA = "archivo_moviendo"
+SIN_MOVER = f"NOT EXISTS (SELECT 1 FROM {MARCA})"
+
+BaseArchivo = declarative_base()
+
+def _copia(tabla: Table, *indices) -> Table:
+    # Mismas columnas y PK, sin FKs (los catálogos y los items viven en la BD principal)
+    columnas = [Column(c.name, c.type, primary_key=c.primary_key, nullable=c.nullable) for c in tabla.columns]
+    return Table(tabla.name, BaseArchivo.metadata, *columnas, *indices, schema=ESQUEMA)
+
+class InspeccionArchivada(BaseArchivo):
+    __table__ = _copia(
+        models.Inspeccion.__table__,
+        Index("ix_archivo_inspecciones_fecha", "fecha"),
+        Index("ix_archivo_inspecciones_unidad_id", "unidad_id"),
+        Index("ix_archivo_inspecciones_zona_id", "zona_id"),
+        # La clave de idempotencia del cliente sigue siendo única y buscable después de archivar
+        Index("ix_archivo_inspecciones_clave_cliente", "clave_cliente", unique=True),
+    )
+    __tablename__ = __table__.name
+
+class DetalleArchivado(BaseArchivo):
+    __table__ = _copia(
+        models.InspeccionDetalle.__table__,
+        Index("ix_archivo_inspeccion_detalles_inspeccion_id", "inspeccion_id"),
+    )
+    __tablename__ = __table__.name
+
+def activo() -> bool:
+    return bool(settings.archivo_db) and settings.database_url.startswith("sqlite")
+
+def crear_marca(conn):
+    conn.exec_driver_sql(f"CREATE TABLE IF NOT EXISTS {MARCA} (id INTEGER PRIMARY KEY)")
+
+def preparar(engine):
+    """Crea las tablas e índices del archivo si faltan (el ATTACH ya creó el archivo al conectar)."""
+    if activo():
+        with engine.begin() as conn:
+            BaseArchivo.metadata.create_all(bind=conn, checkfirst=True)
+            for tabla in BaseArchivo.metadata.sorted_tables:
+                for indice in tabla.indexes:
+                    indice.create(bind=conn, checkfirst=True)
+
+# -------------------------
+# Lecturas con fallback
+# -------------------------
+def modelos_archivo() -> Optional[Tuple[type, type]]:
+    """(Inspeccion, Detalle) del archivo para buscar un id que no está en el almacén caliente."""
+    return (InspeccionArchivada, DetalleArchivado) if activo() else None
+
+def tabla_archivo(nombre: str) -> Optional[Table]:
+    """Copia archivada de la tabla caliente `nombre`, si la tiene."""
+    if not activo() or nombre not in TABLAS:
+        return None
+    return BaseArchivo.metadata.tables[f"{ESQUEMA}.{nombre}"]
+
+def almacenes(db: Session, desde: Optional[datetime] = None) -> List[Tuple[type, type]]:
+    """Pares (Inspeccion, Detalle) que alcanza un rango que empieza en `desde`: archivo y caliente."""
+    pares = []
+    if activo():
+        ultima = db.scalar(select(func.max(InspeccionArchivada.fecha)))
+        if ultima is not None and (desde is None or desde <= ultima):
+            pares.append((InspeccionArchivada, DetalleArchivado))
+    pares.append((models.Inspeccion, models.InspeccionDetalle))
+    return pares
+
+def por_clave_cliente(db: Session, clave: str):
+    """Inspección enviada antes con `clave` (caliente o archivada), o None."""
+    for I, _ in reversed(almacenes(db)):
+        ins = db.scalar(select(I).where(I.clave_cliente == clave))
+        if ins is not None:
+            return ins
+    return None
+
+# -------------------------
+# Archivado por lotes
+# -------------------------
+def _archivables(corte: datetime):
+    I, D, UI, ZI = models.Inspeccion, models.InspeccionDetalle, models.UnidadItem, models.ZonaItem
+    return select(I.id).where(
+        I.fecha < corte,
+        # Estado actual de algún item: la proyección y la FK de los items la siguen necesitando
+        ~exists().where(UI.ultima_inspeccion_id == I.id),
+        ~exists().where(ZI.ultima_inspeccion_id == I.id),
+        # Los ids más altos no se mueven: SQLite los reasignaría y chocarían con el archivo
+        I.id < select(func.max(I.id)).scalar_subquery(),
+        I.id != func.coalesce(select(D.inspeccion_id).order_by(D.id.desc()).limit(1).scalar_subquery(), 0),
+    )
+
+def archivar_lote(db: Session, corte: datetime, lote: int) -> Tuple[int, int]:
+    """Mueve hasta `lote` inspecciones anteriores a `corte`. -> (inspecciones, detalles) movidos."""
+    # Copia y borrado en transacciones separadas: una caída entre ambas repite filas, no las pierde
+    I, D = models.Inspeccion.__table__, models.InspeccionDetalle.__table__
+    IA, DA = InspeccionArchivada.__table__, DetalleArchivado.__table__
+    ids = db.scalars(_archivables(corte).order_by(models.Inspeccion.id).limit(lote)).all()
+    if not ids:
+        db.rollback()
+        return 0, 0
+    db.execute(insert(IA).prefix_with("OR REPLACE").from_select(list(I.c.keys()), select(I).where(I.c.id.in_(ids))))
+    db.execute(insert(DA).prefix_with("OR REPLACE").from_select(list(D.c.keys()), select(D).where(D.c.inspeccion_id.in_(ids))))
+    db.commit()
+
+    db.connection().exec_driver_sql("BEGIN IMMEDIATE")
+    # Condiciones repetidas con el lock tomado; alias porque las tablas del archivo se llaman igual
+    ia, da, d = IA.alias("ia"), DA.alias("da"), D.alias("d")
+    movibles = db.scalars(_archivables(corte).where(
+        models.Inspeccion.id.in_(ids),
+        exists().where(ia.c.id == models.Inspeccion.id),
+        ~exists().where(d.c.inspeccion_id == models.Inspeccion.id, ~exists().where(da.c.id == d.c.id)),
+    )).all()
+    detalles = 0
+    if movibles:
+        db.execute(text(f"INSERT INTO {MARCA} DEFAULT VALUES"))
+        detalles = db.execute(delete(D).where(D.c.inspeccion_id.in_(movibles))).rowcount
+        db.execute(delete(I).where(I.c.id.in_(movibles)))
+        db.execute(text(f"DELETE FROM {MARCA}"))
+    db.commit()
+    return len(movibles), detalles
+
+def archivar(db: Session, antes_de: Optional[date] = None, lote: Optional[int] = None) -> dict:
+    """Archiva por lotes todo lo anterior a `antes_de` (por defecto hoy - ARCHIVE_AFTER_DAYS)."""
+    if not activo():
+        raise RuntimeError("Archivado deshabilitado: configure ARCHIVE_DATABASE (solo SQLite)")
+    corte = datetime.combine(antes_de, datetime.min.time()) if antes_de else datetime.utcnow() - timedelta(days=settings.archivo_dias)
+    inspecciones = detalles = 0
+    while True:
+        n, d = archivar_lote(db, corte, lote or settings.archivo_lote)
+        if not n and not d:
+            break
+        inspecciones += n
+        detalles += d
+        time.sleep(PAUSA_LOTE)
+    return {"corte": corte.isoformat(), "inspecciones": inspecciones, "detalles": detalles}
+
+# -------------------------
+# CLI: python -m app.archivo [--antes-de AAAA-MM-DD]
+# -------------------------
+def main(argv=None):
+    from .database import SessionLocal, engine
+    from .migraciones import migrar
+
+    parser = argparse.ArgumentParser(description="Mueve el historial de inspecciones viejo a ARCHIVE_DATABASE.")
+    parser.add_argument("--antes-de", type=date.fromisoformat, default=None, help=f"Fecha de corte (por defecto hoy - {settings.archivo_dias} días)")
+    parser.add_argument("--lote", type=int, default=None, help=f"Inspecciones por transacción (por defecto {settings.archivo_lote})")
+    args = parser.parse_args(argv)
+    migrar(engine)
+    preparar(engine)
+    with SessionLocal() as db:
+        print(archivar(db, args.antes_de, args.lote))
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
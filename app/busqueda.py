@@ -0,0 +1,179 @@
+import argparse
+import html
+import re
+import sys
+from typing import List, Literal, Optional
+
+from fastapi import HTTPException, Query, status
+from sqlalchemy import inspect, text
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import Session
+
+from . import archivo
+
+# -------------------------
+# Búsqueda FTS5 (items, checklists, observaciones) mantenida con triggers; rowid = id * 4 + tipo
+# -------------------------
+TIPOS = {"unidad_item": 0, "zona_item": 1, "checklist_item": 2, "observacion": 3}
+TipoBusqueda = Literal["unidad_item", "zona_item", "checklist_item", "observacion"]
+LIMITE_BUSQUEDA = 20
+LIMITE_BUSQUEDA_MAXIMO = 100
+
+_DDL_TABLA = """
+CREATE VIRTUAL TABLE IF NOT EXISTS busqueda USING fts5(
+    texto,
+    tipo UNINDEXED,
+    ref_id UNINDEXED,
+    unidad_id UNINDEXED,
+    zona_id UNINDEXED,
+    inspeccion_id UNINDEXED,
+    tokenize = 'unicode61 remove_diacritics 2',
+    prefix = '3'
+)
+"""
+
+# tabla origen, columna de texto, tipo, expresiones (unidad_id, zona_id, inspeccion_id) sobre la fila {f}
+_ORIGENES = [
+    ("unidad_items", "nombre", "unidad_item", "{f}.unidad_id", "NULL", "NULL"),
+    ("zona_items", "nombre", "zona_item", "NULL", "{f}.zona_id", "NULL"),
+    ("checklist_items", "texto", "checklist_item", "NULL", "NULL", "NULL"),
+    (
+        "inspeccion_detalles", "observacion", "observacion",
+        "(SELECT unidad_id FROM inspecciones WHERE id = {f}.inspeccion_id)",
+        "(SELECT zona_id FROM inspecciones WHERE id = {f}.inspeccion_id)",
+        "{f}.inspeccion_id",
+    ),
+]
+_INSERTAR = "INSERT INTO busqueda (rowid, texto, tipo, ref_id, unidad_id, zona_id, inspeccion_id) SELECT "
+
+def _valores(columna, tipo, unidad, zona, inspeccion, fila: str) -> str:
+    plantilla = f"{{f}}.id * 4 + {TIPOS[tipo]}, {{f}}.{columna}, '{tipo}', {{f}}.id, {unidad}, {zona}, {inspeccion}"
+    return plantilla.format(f=fila)
+
+def _triggers() -> List[str]:
+    sentencias = []
+    for tabla, columna, tipo, *exprs in _ORIGENES:
+        borrar = f"DELETE FROM busqueda WHERE rowid = old.id * 4 + {TIPOS[tipo]}"
+        insertar = _INSERTAR + _valores(columna, tipo, *exprs, "new")
+        movida = f" AND {archivo.SIN_MOVER}" if tabla in archivo.TABLAS else ""
+        sentencias += [
+            f"CREATE TRIGGER IF NOT EXISTS {tabla}_busqueda_ai AFTER INSERT ON {tabla} "
+            f"WHEN new.{columna} IS NOT NULL BEGIN {insertar}; END",
+            f"CREATE TRIGGER IF NOT EXISTS {tabla}_busqueda_ad AFTER DELETE ON {tabla} "
+            f"WHEN old.{columna} IS NOT NULL{movida} BEGIN {borrar}; END",
+            f"CREATE TRIGGER IF NOT EXISTS {tabla}_busqueda_au AFTER UPDATE OF {columna} ON {tabla} "
+            f"WHEN old.{columna} IS NOT new.{columna} BEGIN {borrar}; {insertar} WHERE new.{columna} IS NOT NULL; END",
+        ]
+    return sentencias
+
+def crear_indice(conn):
+    conn.exec_driver_sql(_DDL_TABLA)
+    for sentencia in _triggers():
+        conn.exec_driver_sql(sentencia)
+
+def reconstruir_indice(conn) -> int:
+    """Vuelve a poblar el índice desde las tablas origen (Connection)."""
+    conn.exec_driver_sql("DELETE FROM busqueda")
+    for tabla, columna, tipo, *exprs in _ORIGENES:
+        conn.exec_driver_sql(
+            _INSERTAR + _valores(columna, tipo, *exprs, "f") + f" FROM {tabla} AS f WHERE f.{columna} IS NOT NULL"
+        )
+        if tabla in archivo.TABLAS and archivo.activo() and inspect(conn).has_table(tabla, schema=archivo.ESQUEMA):
+            exprs = [e.replace("FROM inspecciones", f"FROM {archivo.ESQUEMA}.inspecciones") for e in exprs]
+            conn.exec_driver_sql(
+                _INSERTAR + _valores(columna, tipo, *exprs, "f")
+                + f" FROM {archivo.ESQUEMA}.{tabla} AS f WHERE f.{columna} IS NOT NULL"
+            )
+    conn.exec_driver_sql("INSERT INTO busqueda (busqueda) VALUES ('optimize')")
+    return conn.exec_driver_sql("SELECT count(*) FROM busqueda").scalar()
+
+# -------------------------
+# Consulta
+# -------------------------
+_TOKEN = re.compile(r"\w+", re.UNICODE)
+# Marcadores de snippet(): se escapa el texto y después pasan a <mark>…</mark>
+_INICIO, _FIN = "\x02", "\x03"
+
+def snippet_html(crudo: str) -> str:
+    return html.escape(crudo).replace(_INICIO, "<mark>").replace(_FIN, "</mark>")
+
+def consulta_fts(q: str) -> str:
+    # Texto libre -> términos entre comillas con prefijo (AND implícito); sin sintaxis FTS5 del usuario
+    terminos = _TOKEN.findall(q)
+    return " ".join('"%s"*' % t for t in terminos)
+
+class FiltrosBusqueda:
+    def __init__(
+        self,
+        q: str = Query(..., min_length=1, description="Texto a buscar, p.ej. 'fuga' o 'lavaplatos'"),
+        tipo: Optional[TipoBusqueda] = None,
+        unidad_id: Optional[int] = None,
+        zona_id: Optional[int] = None,
+        torre: Optional[str] = None,
+        limit: int = Query(LIMITE_BUSQUEDA, ge=1, le=LIMITE_BUSQUEDA_MAXIMO),
+    ):
+        self.q = q
+        self.tipo = tipo
+        self.unidad_id = unidad_id
+        self.zona_id = zona_id
+        self.torre = torre
+        self.limit = limit
+
+def buscar(db: Session, filtros: FiltrosBusqueda) -> dict:
+    consulta = consulta_fts(filtros.q)
+    if not consulta:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="La búsqueda no tiene términos")
+    condiciones = ["busqueda MATCH :consulta"]
+    params = {"consulta": consulta, "limite": filtros.limit}
+    if filtros.tipo:
+        condiciones.append("tipo = :tipo")
+        params["tipo"] = filtros.tipo
+    if filtros.unidad_id is not None:
+        condiciones.append("unidad_id = :unidad_id")
+        params["unidad_id"] = filtros.unidad_id
+    if filtros.zona_id is not None:
+        condiciones.append("zona_id = :zona_id")
+        params["zona_id"] = filtros.zona_id
+    if filtros.torre:
+        condiciones.append("unidad_id IN (SELECT id FROM unidades WHERE torre = :torre)")
+        params["torre"] = filtros.torre
+    sentencia = text(
+        "SELECT tipo, ref_id, unidad_id, zona_id, inspeccion_id, texto, "
+        "snippet(busqueda, 0, :inicio, :fin, '…', 12) AS snippet, bm25(busqueda) AS rank "
+        f"FROM busqueda WHERE {' AND '.join(condiciones)} ORDER BY rank LIMIT :limite"
+    )
+    params.update(inicio=_INICIO, fin=_FIN)
+    try:
+        filas = db.execute(sentencia, params).all()
+    except OperationalError as e:
+        # Índice aún no creado (migración 6 pendiente) o consulta FTS inválida
+        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail=f"Búsqueda no disponible: {e.orig}")
+    resultados = [{
+        "tipo": f.tipo,
+        "id": f.ref_id,
+        "unidad_id": f.unidad_id,
+        "zona_id": f.zona_id,
+        "inspeccion_id": f.inspeccion_id,
+        "texto": f.texto,
+        "snippet": snippet_html(f.snippet),
+        "rank": f.rank,
+    } for f in filas]
+    return {"total": len(resultados), "resultados": resultados}
+
+# -------------------------
+# CLI: python -m app.busqueda (reconstruye el índice)
+# -------------------------
+def main(argv=None):
+    from .database import engine
+    from .migraciones import migrar
+
+    argparse.ArgumentParser(description="Reconstruye el índice de búsqueda FTS5.").parse_args(argv)
+    migrar(engine)
+    with engine.begin() as conn:
+        crear_indice(conn)
+        n = reconstruir_indice(conn)
+    print(f"Índice de búsqueda reconstruido: {n} filas")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
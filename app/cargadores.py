@@ -0,0 +1,59 @@
+from typing import Dict, Iterable, Set, Tuple
+
+from sqlalchemy import inspect as sa_inspect, select
+from sqlalchemy.orm import Session
+
+# SQLite admite hasta 32766 variables por sentencia; los IN se parten muy por debajo de eso
+LOTE_IN = 10000
+
+# -------------------------
+# Carga por lotes estilo DataLoader: un IN por columna en vez de un lazy load por objeto
+# -------------------------
+class Cargador:
+    """Objetos de un modelo por `columna` (la PK, o una FK con muchos=True para listas)."""
+
+    def __init__(self, db: Session, columna, muchos: bool = False):
+        self.db = db
+        self.columna = columna
+        self.muchos = muchos
+        self._pendientes: Set = set()
+        self._cargados: Dict = {}
+
+    def pedir(self, claves: Iterable):
+        for clave in claves:
+            if clave is not None and clave not in self._cargados:
+                self._pendientes.add(clave)
+
+    def despachar(self):
+        pendientes = sorted(self._pendientes)
+        self._pendientes.clear()
+        modelo = self.columna.class_
+        orden = sa_inspect(modelo).primary_key
+        for clave in pendientes:
+            self._cargados[clave] = [] if self.muchos else None
+        for i in range(0, len(pendientes), LOTE_IN):
+            q = select(modelo).where(self.columna.in_(pendientes[i:i + LOTE_IN])).order_by(*orden)
+            for obj in self.db.scalars(q):
+                clave = getattr(obj, self.columna.key)
+                if self.muchos:
+                    self._cargados[clave].append(obj)
+                else:
+                    self._cargados[clave] = obj
+
+    def obtener(self, clave):
+        if clave in self._pendientes:
+            self.despachar()
+        return self._cargados.get(clave, [] if self.muchos else None)
+
+class Cargadores:
+    """Registro por petición: un Cargador por (modelo, columna), compartido por todo el documento."""
+
+    def __init__(self, db: Session):
+        self.db = db
+        self._cargadores: Dict[Tuple[str, str, bool], Cargador] = {}
+
+    def __call__(self, columna, muchos: bool = False) -> Cargador:
+        clave = (columna.class_.__name__, columna.key, muchos)
+        if clave not in self._cargadores:
+            self._cargadores[clave] = Cargador(self.db, columna, muchos)
+        return self._cargadores[clave]
@@ -0,0 +1,139 @@
+import hashlib
+import json
+import threading
+import time
+from typing import Dict, List, Optional
+
+from fastapi import Request, Response, status
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from . import models, schemas
+from .database import SessionLocal
+from .pagination import NDJSON, VARIA, ParametrosPagina, listar_en_memoria, quiere_ndjson
+
+# Límite de obsolescencia entre procesos (cada worker de uvicorn tiene su propia caché)
+TTL_SEGUNDOS = 300
+_MODELOS_CATALOGO = (models.CatalogoEstado, models.CatalogoCategoria)
+_TABLAS_CATALOGO = {m.__table__ for m in _MODELOS_CATALOGO}
+
+# -------------------------
+# Instantánea inmutable de los catálogos
+# -------------------------
+class Catalogos:
+    def __init__(self, estados: List[schemas.CatalogoEstadoOut], categorias: List[schemas.CatalogoCategoriaOut], version: int):
+        self.version = version
+        self.estados = sorted(estados, key=lambda e: (e.orden_severidad, e.id))
+        self.categorias = sorted(categorias, key=lambda c: (c.nombre, c.id))
+        self.estado_por_id: Dict[int, schemas.CatalogoEstadoOut] = {e.id: e for e in estados}
+        self.estado_id_por_nombre: Dict[str, int] = {e.nombre: e.id for e in estados}
+        self.categoria_por_id: Dict[int, schemas.CatalogoCategoriaOut] = {c.id: c for c in categorias}
+        self.categoria_id_por_nombre: Dict[str, int] = {c.nombre: c.id for c in categorias}
+        contenido = json.dumps(
+            [[e.model_dump() for e in self.estados], [c.model_dump() for c in self.categorias]],
+            sort_keys=True, ensure_ascii=False,
+        )
+        # Derivado del contenido: igual en todos los workers para la misma versión de datos
+        self.huella = hashlib.sha1(contenido.encode()).hexdigest()
+
+    def etag(self, *variante) -> str:
+        # Una representación = datos + página + formato: cada combinación tiene su validador
+        return '"cat-%s"' % hashlib.sha1("|".join([self.huella, *map(str, variante)]).encode()).hexdigest()[:16]
+
+    def estado(self, estado_id: int) -> Optional[schemas.CatalogoEstadoOut]:
+        return self.estado_por_id.get(estado_id)
+
+    def categoria(self, categoria_id: int) -> Optional[schemas.CatalogoCategoriaOut]:
+        return self.categoria_por_id.get(categoria_id)
+
+    def ids_estado_pendiente(self, severidad_min: Optional[int] = None) -> List[int]:
+        # Sin umbral: todo lo que no es "Bueno"
+        if severidad_min is None:
+            return [e.id for e in self.estados if e.nombre != "Bueno"]
+        return [e.id for e in self.estados if e.orden_severidad >= severidad_min]
+
+# -------------------------
+# Caché en proceso con invalidación explícita
+# -------------------------
+class CacheCatalogos:
+    def __init__(self, ttl: float = TTL_SEGUNDOS):
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._datos: Optional[Catalogos] = None
+        self._cargado_en = 0.0
+        self._version = 0
+
+    def invalidar(self):
+        with self._lock:
+            self._datos = None
+            self._version += 1
+
+    def obtener(self, db: Optional[Session] = None) -> Catalogos:
+        datos = self._datos
+        if datos is not None and time.monotonic() - self._cargado_en < self.ttl:
+            return datos
+        # La lectura se hace fuera del lock: en la ruta async (run_sync) la consulta cede el event loop
+        version = self._version
+        propia = db is None
+        db = db or SessionLocal()
+        try:
+            estados = [schemas.CatalogoEstadoOut.model_validate(e) for e in db.query(models.CatalogoEstado)]
+            categorias = [schemas.CatalogoCategoriaOut.model_validate(c) for c in db.query(models.CatalogoCategoria)]
+        finally:
+            if propia:
+                db.close()
+        datos = Catalogos(estados, categorias, version)
+        with self._lock:
+            # Si hubo una invalidación mientras se leía, se usa el resultado pero no se guarda
+            if version == self._version:
+                self._datos = datos
+                self._cargado_en = time.monotonic()
+        return datos
+
+cache_catalogos = CacheCatalogos()
+
+def get_catalogos(db: Session) -> Catalogos:
+    return cache_catalogos.obtener(db)
+
+def no_modificado(request: Request, etag: str) -> Optional[Response]:
+    # GET condicional: If-None-Match puede traer varias etiquetas separadas por coma (comparación débil)
+    etiquetas = {e.strip().removeprefix("W/") for e in request.headers.get("if-none-match", "").split(",")}
+    if etag in etiquetas or "*" in etiquetas:
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag})
+    return None
+
+def listar_catalogo(request: Request, filas, claves, pagina: ParametrosPagina, schema, cat: Catalogos) -> Response:
+    etag = cat.etag(request.url.path, pagina.limit, pagina.after, NDJSON if quiere_ndjson(request) else "application/json")
+    if (r := no_modificado(request, etag)) is not None:
+        r.headers.update(VARIA)
+        return r
+    salida = listar_en_memoria(request, filas, claves, pagina, schema)
+    salida.headers["ETag"] = etag
+    return salida
+
+# -------------------------
+# Invalidación automática ante cualquier escritura de catálogos
+# -------------------------
+@event.listens_for(SessionLocal, "after_flush")
+def _marcar_catalogos_flush(session, flush_context):
+    for obj in (*session.new, *session.dirty, *session.deleted):
+        if isinstance(obj, _MODELOS_CATALOGO):
+            session.info["catalogos_sucios"] = True
+            return
+
+@event.listens_for(SessionLocal, "do_orm_execute")
+def _marcar_catalogos_dml(orm_execute_state):
+    # INSERT/UPDATE/DELETE masivos (sin pasar por el unit of work)
+    if orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete:
+        tabla = getattr(orm_execute_state.statement, "table", None)
+        if tabla in _TABLAS_CATALOGO:
+            orm_execute_state.session.info["catalogos_sucios"] = True
+
+@event.listens_for(SessionLocal, "after_commit")
+def _invalidar_tras_commit(session):
+    if session.info.pop("catalogos_sucios", False):
+        cache_catalogos.invalidar()
+
+@event.listens_for(SessionLocal, "after_rollback")
+def _limpiar_tras_rollback(session):
+    session.info.pop("catalogos_sucios", None)
@@ -0,0 +1,61 @@
+from typing import Dict, Optional, Sequence
+
+import pydantic_core
+from fastapi import Request
+from fastapi.responses import Response
+
+from .serializacion import a_json
+
+try:
+    import msgpack
+except ImportError:  # opcional: sin msgpack solo se ofrece la variante JSON
+    msgpack = None
+
+# -------------------------
+# Listados columnares (Accept: application/vnd.erp.columnar+json | +msgpack): un arreglo por campo
+# -------------------------
+COLUMNAR_JSON = "application/vnd.erp.columnar+json"
+COLUMNAR_MSGPACK = "application/vnd.erp.columnar+msgpack"
+
+def formato_columnar(request: Request) -> Optional[str]:
+    accept = request.headers.get("accept", "")
+    if msgpack is not None and COLUMNAR_MSGPACK in accept:
+        return COLUMNAR_MSGPACK
+    if COLUMNAR_JSON in accept:
+        return COLUMNAR_JSON
+    return None
+
+def columna(valores: list):
+    """Texto con repetidos (al menos la mitad de los valores) -> {"valores": [...], "indices": [...]}."""
+    distintos: Dict[str, int] = {}
+    indices = []
+    for v in valores:
+        if v is None:
+            indices.append(None)
+        elif isinstance(v, str):
+            indices.append(distintos.setdefault(v, len(distintos)))
+        else:
+            return valores
+    if not distintos or len(distintos) * 2 > len(valores):
+        return valores
+    return {"valores": list(distintos), "indices": indices}
+
+def tabla(filas: Sequence, campos: Sequence[str], anidadas: Optional[Dict[str, Sequence[str]]] = None) -> dict:
+    # anidadas: {relación: campos de sus filas}; las filas pueden ser objetos (getattr) o dicts
+    leer = dict.get if filas and isinstance(filas[0], dict) else getattr
+    columnas = {c: columna([leer(f, c) for f in filas]) for c in campos}
+    for relacion, sub in (anidadas or {}).items():
+        hijos, offsets = [], [0]
+        for f in filas:
+            hijos.extend(leer(f, relacion) or ())
+            offsets.append(len(hijos))
+        columnas[relacion] = {"offsets": offsets, **tabla(hijos, sub)}
+    return {"n": len(filas), "columnas": columnas}
+
+def responder_columnar(formato: str, documento: dict) -> Response:
+    if formato == COLUMNAR_MSGPACK:
+        # Fechas y demás como en JSON (texto ISO 8601): el cliente decodifica igual ambas variantes
+        cuerpo = msgpack.packb(documento, default=pydantic_core.to_jsonable_python, use_bin_type=True)
+    else:
+        cuerpo = a_json(documento)
+    return Response(cuerpo, media_type=formato, headers={"Vary": "Accept"})
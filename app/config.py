@@ -0,0 +1,80 @@
+import os
+
+from dotenv import load_dotenv
+
+# Variables de entorno (o archivo .env en el directorio de trabajo)
+load_dotenv()
+
+def _bool(nombre: str, defecto: bool) -> bool:
+    valor = os.getenv(nombre)
+    if valor is None:
+        return defecto
+    return valor.strip().lower() in ("1", "true", "si", "sí", "yes", "on")
+
+def _int(nombre: str, defecto: int) -> int:
+    valor = os.getenv(nombre)
+    return int(valor) if valor not in (None, "") else defecto
+
+def _url_async(url: str) -> str:
+    # sqlite:///x.db -> sqlite+aiosqlite:///x.db (driver async local)
+    if url.startswith("sqlite:"):
+        return "sqlite+aiosqlite:" + url[len("sqlite:"):]
+    return url
+
+class Settings:
+    def __init__(self):
+        self.database_url = os.getenv("DATABASE_URL", "sqlite:///./fastapidb.db")
+
+        # Aplicar migraciones pendientes al arrancar (python -m app.migraciones para hacerlo a mano)
+        self.auto_migrar = _bool("DB_AUTO_MIGRATE", True)
+
+        # Ruta async (SQLAlchemy asyncio) para los handlers más usados; por defecto sync
+        self.db_async = _bool("DB_ASYNC", False)
+        self.async_database_url = os.getenv("ASYNC_DATABASE_URL") or _url_async(self.database_url)
+
+        # Hilos del threadpool de anyio donde FastAPI ejecuta los handlers síncronos
+        self.threadpool = _int("THREADPOOL_SIZE", 40)
+
+        # Instrumentación por solicitud (Server-Timing, /metrics) y detector de N+1
+        self.metricas = _bool("METRICS_ENABLED", True)
+        self.umbral_n_mas_1 = _int("N_PLUS_ONE_THRESHOLD", 10)
+
+        # Perfil SQLite (se aplica en cada conexión nueva)
+        self.sqlite_journal_mode = os.getenv("SQLITE_JOURNAL_MODE", "WAL")
+        self.sqlite_synchronous = os.getenv("SQLITE_SYNCHRONOUS", "NORMAL")
+        self.sqlite_mmap_size = _int("SQLITE_MMAP_SIZE", 256 * 1024 * 1024)
+        self.sqlite_cache_size = _int("SQLITE_CACHE_SIZE", -64 * 1024)  # negativo = KiB
+        self.sqlite_busy_timeout_ms = _int("SQLITE_BUSY_TIMEOUT_MS", 5000)
+        self.sqlite_foreign_keys = _bool("SQLITE_FOREIGN_KEYS", True)
+
+        # Pool: por defecto una conexión por hilo del threadpool
+        self.pool_size = _int("DB_POOL_SIZE", self.threadpool)
+        self.pool_max_overflow = _int("DB_POOL_MAX_OVERFLOW", 10)
+        self.pool_timeout = _int("DB_POOL_TIMEOUT", 30)
+
+        # Pool de solo lectura para rutas GET (no esperan detrás de los escritores en WAL)
+        self.pool_lectura = _bool("DB_READ_POOL", False)
+        self.pool_lectura_size = _int("DB_READ_POOL_SIZE", self.pool_size)
+
+        # Trabajos en segundo plano (exportaciones/reportes pesados, ver app/trabajos.py)
+        self.trabajos_dir = os.getenv("JOBS_DIR", "./trabajos")
+        self.trabajos_workers = _int("JOBS_WORKERS", 2)
+        self.trabajos_ttl = _int("JOBS_RESULT_TTL", 3600)  # segundos que se conserva/reutiliza un resultado
+        self.trabajos_limpieza = _int("JOBS_CLEANUP_INTERVAL", 60)  # segundos entre barridos de vencidos (0 = solo al arrancar)
+
+        # Group commit de los POST de una fila (ver app/escrituras.py)
+        self.group_commit = _bool("WRITE_GROUP_COMMIT", False)
+        self.group_commit_max_filas = _int("WRITE_GROUP_MAX_ROWS", 64)
+        self.group_commit_espera_ms = _int("WRITE_GROUP_MAX_WAIT_MS", 2)
+
+        # Historial frío (ver app/archivo.py); sin ARCHIVE_DATABASE no se archiva nada
+        self.archivo_db = os.getenv("ARCHIVE_DATABASE") or None
+        self.archivo_dias = _int("ARCHIVE_AFTER_DAYS", 365)  # antigüedad a partir de la cual se archiva
+        self.archivo_lote = _int("ARCHIVE_BATCH", 500)  # inspecciones por transacción
+        self.archivo_cache_size = _int("ARCHIVE_CACHE_SIZE", -8 * 1024)  # caché chica: no desplaza al historial caliente
+
+        # gzip de respuestas de al menos RESPONSE_GZIP_MIN_BYTES (0 = sin compresión)
+        self.gzip_min_bytes = _int("RESPONSE_GZIP_MIN_BYTES", 1024)
+        self.gzip_nivel = _int("RESPONSE_GZIP_LEVEL", 6)
+
+settings = Settings()
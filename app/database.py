@@ -1,13 +1,116 @@
-from sqlalchemy import create_engine
-from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
+import os
+from typing import Callable, Iterator
 
-DATABASE_URL = "sqlite:///./fastapidb.db"
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import make_url
+from sqlalchemy.orm import declarative_base, sessionmaker
 
-engine = create_engine(DATABASE_URL, connect_args={"check_same_thread": False})
+from .config import settings
+
+DATABASE_URL = settings.database_url
+
+def _es_sqlite(url) -> bool:
+    return url.get_backend_name() == "sqlite"
+
+def _crear_engine(url, pool_size: int, solo_lectura: bool = False):
+    url = make_url(url)
+    kwargs = {}
+    if _es_sqlite(url):
+        kwargs["connect_args"] = {
+            "check_same_thread": False,
+            "timeout": settings.sqlite_busy_timeout_ms / 1000,
+        }
+        if url.database in (None, "", ":memory:"):
+            # SQLite en memoria: una sola conexión compartida, sin dimensionar el pool
+            return create_engine(url, **kwargs)
+    kwargs.update(
+        pool_size=pool_size,
+        max_overflow=settings.pool_max_overflow,
+        pool_timeout=settings.pool_timeout,
+        pool_pre_ping=not _es_sqlite(url),
+    )
+    eng = create_engine(url, **kwargs)
+    if _es_sqlite(url):
+        event.listen(eng, "connect", lambda conn, _: _aplicar_pragmas(conn, solo_lectura))
+    return eng
+
+def _aplicar_pragmas(dbapi_conn, solo_lectura: bool):
+    cur = dbapi_conn.cursor()
+    try:
+        cur.execute(f"PRAGMA busy_timeout={int(settings.sqlite_busy_timeout_ms)}")
+        if not solo_lectura:
+            # journal_mode es persistente en el archivo; basta con que lo fije un escritor
+            cur.execute(f"PRAGMA journal_mode={settings.sqlite_journal_mode}")
+        cur.execute(f"PRAGMA synchronous={settings.sqlite_synchronous}")
+        cur.execute(f"PRAGMA mmap_size={int(settings.sqlite_mmap_size)}")
+        cur.execute(f"PRAGMA cache_size={int(settings.sqlite_cache_size)}")
+        cur.execute(f"PRAGMA foreign_keys={'ON' if settings.sqlite_foreign_keys else 'OFF'}")
+        if solo_lectura:
+            cur.execute("PRAGMA query_only=ON")
+        if settings.archivo_db:
+            _adjuntar_archivo(cur, solo_lectura)
+    finally:
+        cur.close()
+
+def _adjuntar_archivo(cur, solo_lectura: bool):
+    # Historial frío (app/archivo.py) como esquema `archivo`, con su propia caché más chica
+    if solo_lectura:
+        if not os.path.exists(settings.archivo_db):
+            return  # lo crea el primer escritor al arrancar
+        cur.execute("ATTACH DATABASE ? AS archivo", (f"file:{settings.archivo_db}?mode=ro",))
+    else:
+        cur.execute("ATTACH DATABASE ? AS archivo", (settings.archivo_db,))
+        cur.execute(f"PRAGMA archivo.journal_mode={settings.sqlite_journal_mode}")
+    cur.execute(f"PRAGMA archivo.synchronous={settings.sqlite_synchronous}")
+    cur.execute(f"PRAGMA archivo.cache_size={int(settings.archivo_cache_size)}")
+
+def _url_lectura(url):
+    url = make_url(url)
+    if not _es_sqlite(url) or url.database in (None, "", ":memory:"):
+        return None
+    return url.set(database=f"file:{url.database}", query={**url.query, "mode": "ro", "uri": "true"})
+
+engine = _crear_engine(DATABASE_URL, settings.pool_size)
+
+def engine_para_proceso(pool_size: int = 1):
+    # Engine propio para procesos hijos (pool de trabajos): no heredan conexiones del padre
+    return _crear_engine(DATABASE_URL, pool_size)
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Pool opcional de solo lectura (DB_READ_POOL=1) para rutas GET
+engine_lectura = None
+if settings.pool_lectura and _url_lectura(DATABASE_URL) is not None:
+    engine_lectura = _crear_engine(_url_lectura(DATABASE_URL), settings.pool_lectura_size, solo_lectura=True)
+
+SessionLectura = sessionmaker(autocommit=False, autoflush=False, bind=engine_lectura or engine)
+
+def en_sesion_propia(generar: Callable[..., Iterator], *args) -> Iterator:
+    """Recorre `generar(db, *args)` con una sesión propia: el StreamingResponse sigue después del handler."""
+    with SessionLectura() as db:
+        yield from generar(db, *args)
+
+# Engine async (DB_ASYNC=1): aiosqlite en local, mismo perfil de pragmas
+async_engine = None
+AsyncSessionLocal = None
+if settings.db_async:
+    from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+    _url_db_async = make_url(settings.async_database_url)
+    _kwargs_async = {}
+    if _es_sqlite(_url_db_async):
+        _kwargs_async["connect_args"] = {"timeout": settings.sqlite_busy_timeout_ms / 1000}
+    async_engine = create_async_engine(
+        _url_db_async,
+        pool_size=settings.pool_size,
+        max_overflow=settings.pool_max_overflow,
+        pool_timeout=settings.pool_timeout,
+        **_kwargs_async,
+    )
+    if _es_sqlite(_url_db_async):
+        event.listen(async_engine.sync_engine, "connect", lambda conn, _: _aplicar_pragmas(conn, False))
+    AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+
 Base = declarative_base()
 
 def get_db():
@@ -15,4 +118,15 @@ def get_db():
     try:
         yield db
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
+
+def get_db_lectura():
+    db = SessionLectura()
+    try:
+        yield db
+    finally:
+        db.close()
+
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
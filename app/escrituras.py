@@ -0,0 +1,123 @@
+import logging
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from contextlib import contextmanager
+from typing import Any, Callable, List, Optional, Tuple, Type
+
+from pydantic import BaseModel
+from sqlalchemy.orm import Session
+
+from .config import settings
+from .database import SessionLocal, engine
+
+logger = logging.getLogger(__name__)
+
+# -------------------------
+# Group commit (WRITE_GROUP_COMMIT=1): un hilo escritor confirma las escrituras concurrentes por lote
+# -------------------------
+Operacion = Tuple[Callable[[Session], Any], Type[BaseModel], Future]
+
+class Coordinador:
+    def __init__(self, max_filas: int, espera_ms: float):
+        self.max_filas = max_filas
+        self.espera = espera_ms / 1000
+        self._cola: "queue.Queue[Optional[Operacion]]" = queue.Queue()
+        self._lock = threading.Lock()
+        self._hilo: Optional[threading.Thread] = None
+
+    def enviar(self, crear: Callable[[Session], Any], schema: Type[BaseModel]) -> BaseModel:
+        """Encola `crear` y espera el COMMIT de su lote. Devuelve `schema` validado o relanza su error."""
+        futuro: Future = Future()
+        with self._lock:
+            # Con el lock: la operación entra en la cola de un hilo vivo, nunca detrás de la marca de fin de detener()
+            if self._hilo is None or not self._hilo.is_alive():
+                self._cola = queue.Queue()
+                self._hilo = threading.Thread(target=self._bucle, args=(self._cola,), name="group-commit", daemon=True)
+                self._hilo.start()
+            self._cola.put((crear, schema, futuro))
+        return futuro.result()
+
+    def detener(self):
+        with self._lock:
+            hilo, self._hilo = self._hilo, None
+            if hilo is not None:
+                self._cola.put(None)
+        if hilo is not None:
+            hilo.join()
+
+    def _bucle(self, cola: "queue.Queue[Optional[Operacion]]"):
+        while True:
+            primera = cola.get()
+            if primera is None:
+                return
+            lote, fin = [primera], False
+            limite = time.monotonic() + self.espera
+            while len(lote) < self.max_filas:
+                try:
+                    # Lo que ya esté en cola entra sin esperar; luego, hasta agotar la ventana
+                    op = cola.get(timeout=max(limite - time.monotonic(), 0)) if self.espera else cola.get_nowait()
+                except queue.Empty:
+                    break
+                if op is None:
+                    fin = True
+                    break
+                lote.append(op)
+            self._confirmar(lote)
+            if fin:
+                return
+
+    def _confirmar(self, lote: List[Operacion]):
+        resultados = []
+        try:
+            with engine.connect() as conn, _durable(conn), SessionLocal(bind=conn) as db:
+                if conn.dialect.name == "sqlite":
+                    # Tomar el lock de escritura al empezar: sin esperas por upgrade de lectura a escritura
+                    db.connection().exec_driver_sql("BEGIN IMMEDIATE")
+                for crear, schema, futuro in lote:
+                    try:
+                        with db.begin_nested():
+                            obj = crear(db)
+                            db.flush()
+                            resultados.append((futuro, schema.model_validate(obj), None))
+                    except Exception as e:  # solo esta operación se descarta (ROLLBACK TO SAVEPOINT)
+                        resultados.append((futuro, None, e))
+                db.commit()
+        except Exception as e:
+            logger.exception("Group commit de %s escrituras falló", len(lote))
+            for _, _, futuro in lote:
+                if not futuro.done():
+                    futuro.set_exception(e)
+            return
+        for futuro, valor, error in resultados:
+            if error is not None:
+                futuro.set_exception(error)
+            else:
+                futuro.set_result(valor)
+
+@contextmanager
+def _durable(conn):
+    # synchronous=FULL mientras confirma el lote (en WAL, NORMAL no hace fsync al confirmar)
+    if conn.dialect.name != "sqlite":
+        yield
+        return
+    conn.exec_driver_sql("PRAGMA synchronous=FULL")
+    conn.commit()
+    try:
+        yield
+    finally:
+        conn.rollback()
+        conn.exec_driver_sql(f"PRAGMA synchronous={settings.sqlite_synchronous}")
+        conn.commit()
+
+coordinador = Coordinador(settings.group_commit_max_filas, settings.group_commit_espera_ms)
+
+def escribir(db: Session, crear: Callable[[Session], Any], schema: Type[BaseModel]):
+    """Confirma lo que arme `crear(session)`: en la sesión de la solicitud o vía el coordinador."""
+    if settings.group_commit:
+        return coordinador.enviar(crear, schema)
+    obj = crear(db)
+    db.commit()
+    db.refresh(obj)
+    return obj
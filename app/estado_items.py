@@ -0,0 +1,129 @@
+import argparse
+import sys
+from collections import Counter, defaultdict
+from typing import Any, Iterable, Tuple
+
+from sqlalchemy import func, select, update
+from sqlalchemy.orm import Session
+
+from . import models
+from .cargadores import LOTE_IN
+from .resumenes import aplicar_deltas, reconstruir
+
+# -------------------------
+# Estado actual de cada item, del detalle más reciente por (Inspeccion.fecha, InspeccionDetalle.id)
+# -------------------------
+def _valor(detalle, campo: str):
+    return detalle[campo] if isinstance(detalle, dict) else getattr(detalle, campo)
+
+def registrar_detalles(db: Session, ins: models.Inspeccion, detalles: Iterable) -> None:
+    """Proyecta en los items y resúmenes los detalles recién insertados de `ins` (antes del commit)."""
+    registrar_lote(db, [(ins, d) for d in detalles])
+
+def registrar_lote(db: Session, pares: Iterable[Tuple[Any, Any]]) -> None:
+    """Como registrar_detalles, para pares (inspección, detalle) de varias inspecciones a la vez."""
+    D = models.InspeccionDetalle
+
+    # Por item, el más reciente de los nuevos por (fecha de la inspección, id del detalle)
+    nuevos = {}
+    for ins, d in pares:
+        Item, campo = (models.UnidadItem, "unidad_item_id") if ins.unidad_id else (models.ZonaItem, "zona_item_id")
+        item = _valor(d, campo)
+        if item is None:
+            continue
+        orden = (ins.fecha, _valor(d, "id"))
+        if (Item, item) not in nuevos or orden > nuevos[(Item, item)][0]:
+            nuevos[(Item, item)] = (orden, ins, _valor(d, "estado_id"))
+    if not nuevos:
+        return
+
+    # Lecturas por clave primaria: los items y el estado de su detalle vigente
+    actuales = {}
+    for Item in {m for m, _ in nuevos}:
+        ids = [i for m, i in nuevos if m is Item]
+        for k in range(0, len(ids), LOTE_IN):
+            actuales.update(((Item, f.id), f) for f in db.execute(
+                select(Item.id, Item.ultima_inspeccion_fecha, Item.ultimo_detalle_id).where(Item.id.in_(ids[k:k + LOTE_IN]))
+            ))
+    ids_previos = [f.ultimo_detalle_id for f in actuales.values() if f.ultimo_detalle_id is not None]
+    estado_previo = {}
+    for k in range(0, len(ids_previos), LOTE_IN):
+        estado_previo.update(db.execute(select(D.id, D.estado_id).where(D.id.in_(ids_previos[k:k + LOTE_IN]))).all())
+
+    cambios, deltas = defaultdict(list), defaultdict(Counter)
+    for (Item, item), ((fecha, det_id), ins, estado_id) in nuevos.items():
+        actual = actuales.get((Item, item))
+        if actual is None:
+            continue
+        delta = deltas[(ins.unidad_id, ins.zona_id)]
+        if actual.ultimo_detalle_id is not None:
+            if (actual.ultima_inspeccion_fecha, actual.ultimo_detalle_id) > (fecha, det_id):
+                continue
+            delta[estado_previo.get(actual.ultimo_detalle_id)] -= 1
+        delta[estado_id] += 1
+        cambios[Item].append({
+            "id": item,
+            "estado_id": estado_id,
+            "ultima_inspeccion_id": ins.id,
+            "ultima_inspeccion_fecha": fecha,
+            "ultimo_detalle_id": det_id,
+        })
+    for Item, filas in cambios.items():
+        # UPDATE masivo por clave primaria (un executemany)
+        db.execute(update(Item), filas)
+    aplicar_deltas(db, {
+        clave: Counter({e: n for e, n in delta.items() if n and e is not None})
+        for clave, delta in deltas.items()
+    })
+
+def backfill(db) -> dict:
+    """Recalcula la proyección de todos los items desde el historial (Session o Connection)."""
+    D, I = models.InspeccionDetalle, models.Inspeccion
+    actualizados = {}
+    for Item, columna in ((models.UnidadItem, D.unidad_item_id), (models.ZonaItem, D.zona_item_id)):
+        rn = func.row_number().over(partition_by=columna, order_by=(I.fecha.desc(), D.id.desc()))
+        ranking = (
+            select(
+                columna.label("item"),
+                D.id.label("detalle_id"),
+                D.estado_id,
+                I.id.label("inspeccion_id"),
+                I.fecha,
+                rn.label("rn"),
+            )
+            .join(I, I.id == D.inspeccion_id)
+            .where(columna.is_not(None))
+            .subquery()
+        )
+        vigentes = select(ranking).where(ranking.c.rn == 1).subquery()
+        resultado = db.execute(
+            update(Item)
+            .where(Item.id == vigentes.c.item)
+            .values(
+                estado_id=vigentes.c.estado_id,
+                ultima_inspeccion_id=vigentes.c.inspeccion_id,
+                ultima_inspeccion_fecha=vigentes.c.fecha,
+                ultimo_detalle_id=vigentes.c.detalle_id,
+            )
+            .execution_options(synchronize_session=False)
+        )
+        actualizados[Item.__tablename__] = resultado.rowcount
+    return actualizados
+
+# -------------------------
+# CLI: python -m app.estado_items (backfill de la proyección y de los resúmenes)
+# -------------------------
+def main(argv=None):
+    from .database import engine
+    from .migraciones import migrar
+
+    argparse.ArgumentParser(description="Recalcula el estado actual de los items y los resúmenes desde el historial.").parse_args(argv)
+    migrar(engine)
+    with engine.begin() as conn:
+        items = backfill(conn)
+        resumenes = reconstruir(conn)
+    print(f"Items proyectados: {items}; filas de resumen: {resumenes}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
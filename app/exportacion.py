@@ -0,0 +1,149 @@
+import csv
+import io
+import zlib
+from datetime import datetime
+from typing import Iterator, Literal, Optional
+
+from fastapi import Query
+from fastapi.responses import StreamingResponse
+from sqlalchemy import case, func, select
+
+from . import models
+from .archivo import almacenes
+from .catalogos import get_catalogos
+from .database import en_sesion_propia
+from .serializacion import a_json
+
+LOTE_EXPORT = 5000
+
+# -------------------------
+# Exportación del historial Inspeccion x InspeccionDetalle, por lotes (memoria constante)
+# -------------------------
+COLUMNAS = [
+    "detalle_id", "inspeccion_id", "fecha", "inspector", "checklist_id", "ambito",
+    "unidad_id", "torre", "piso", "numero", "zona_id", "zona_nombre",
+    "item_id", "item_nombre", "estado_id", "observacion", "estado", "orden_severidad",
+]
+
+class FiltrosExport:
+    def __init__(
+        self,
+        desde: Optional[datetime] = None,
+        hasta: Optional[datetime] = None,
+        ambito: Optional[models.AmbitoEnum] = None,
+        torre: Optional[str] = None,
+        piso: Optional[int] = None,
+        unidad_id: Optional[int] = None,
+        zona_id: Optional[int] = None,
+        inspector: Optional[str] = None,
+        checklist_id: Optional[int] = None,
+        formato: Literal["csv", "ndjson"] = "csv",
+        comprimir: bool = Query(False, description="gzip mientras se transmite (archivo .gz)"),
+    ):
+        self.desde = desde
+        self.hasta = hasta
+        self.ambito = ambito
+        self.torre = torre
+        self.piso = piso
+        self.unidad_id = unidad_id
+        self.zona_id = zona_id
+        self.inspector = inspector
+        self.checklist_id = checklist_id
+        self.formato = formato
+        self.comprimir = comprimir
+
+def consulta_export(filtros: FiltrosExport, I=models.Inspeccion, D=models.InspeccionDetalle):
+    # I, D: modelos del almacén a leer (caliente o archivo, ver app/archivo.py)
+    UI, U, ZI, Z = models.UnidadItem, models.Unidad, models.ZonaItem, models.ZonaComun
+    q = (
+        select(
+            D.id.label("detalle_id"),
+            D.inspeccion_id,
+            I.fecha,
+            I.inspector,
+            I.checklist_id,
+            case((D.unidad_item_id.is_not(None), "UNIDAD"), else_="ZONA").label("ambito"),
+            U.id.label("unidad_id"),
+            U.torre,
+            U.piso,
+            U.numero,
+            Z.id.label("zona_id"),
+            Z.nombre.label("zona_nombre"),
+            func.coalesce(D.unidad_item_id, D.zona_item_id).label("item_id"),
+            func.coalesce(UI.nombre, ZI.nombre).label("item_nombre"),
+            D.estado_id,
+            D.observacion,
+        )
+        .select_from(D)
+        .join(I, I.id == D.inspeccion_id)
+        .outerjoin(UI, UI.id == D.unidad_item_id)
+        .outerjoin(U, U.id == UI.unidad_id)
+        .outerjoin(ZI, ZI.id == D.zona_item_id)
+        .outerjoin(Z, Z.id == ZI.zona_id)
+    )
+    if filtros.desde:
+        q = q.where(I.fecha >= filtros.desde)
+    if filtros.hasta:
+        q = q.where(I.fecha <= filtros.hasta)
+    if filtros.ambito == models.AmbitoEnum.UNIDAD:
+        q = q.where(I.unidad_id.is_not(None))
+    elif filtros.ambito == models.AmbitoEnum.ZONA:
+        q = q.where(I.zona_id.is_not(None))
+    if filtros.torre:
+        q = q.where(U.torre == filtros.torre)
+    if filtros.piso is not None:
+        q = q.where(U.piso == filtros.piso)
+    if filtros.unidad_id is not None:
+        q = q.where(I.unidad_id == filtros.unidad_id)
+    if filtros.zona_id is not None:
+        q = q.where(I.zona_id == filtros.zona_id)
+    if filtros.inspector:
+        q = q.where(I.inspector == filtros.inspector)
+    if filtros.checklist_id is not None:
+        q = q.where(I.checklist_id == filtros.checklist_id)
+    # Orden del índice de inspeccion_detalles.inspeccion_id: sin ordenar todo el resultado antes de la primera fila
+    return q.order_by(D.inspeccion_id, D.id)
+
+def _lotes(db, filtros: FiltrosExport) -> Iterator[list]:
+    # Tuplas en el orden de COLUMNAS. En WAL la lectura larga no bloquea a los escritores
+    cat = get_catalogos(db)
+    nombres = {e.id: (e.nombre, e.orden_severidad) for e in cat.estados}
+    # Primero el historial archivado (si el rango lo alcanza) y después el caliente
+    for I, D in almacenes(db, filtros.desde):
+        resultado = db.execute(consulta_export(filtros, I, D).execution_options(yield_per=LOTE_EXPORT, stream_results=True))
+        for particion in resultado.partitions():
+            yield [(*f, *nombres.get(f.estado_id, (None, None))) for f in particion]
+
+def _csv(lotes: Iterator[list]) -> Iterator[bytes]:
+    buffer = io.StringIO()
+    escritor = csv.writer(buffer)
+    escritor.writerow(COLUMNAS)
+    for lote in lotes:
+        escritor.writerows(lote)
+        yield buffer.getvalue().encode()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode()
+
+def _ndjson(lotes: Iterator[list]) -> Iterator[bytes]:
+    for lote in lotes:
+        yield b"".join(a_json(dict(zip(COLUMNAS, f))) + b"\n" for f in lote)
+
+def _gzip(partes: Iterator[bytes]) -> Iterator[bytes]:
+    compresor = zlib.compressobj(6, zlib.DEFLATED, 31)  # wbits=31: contenedor gzip
+    for parte in partes:
+        comprimido = compresor.compress(parte)
+        if comprimido:
+            yield comprimido
+    yield compresor.flush()
+
+def exportar_inspecciones(filtros: FiltrosExport) -> StreamingResponse:
+    lotes = en_sesion_propia(_lotes, filtros)
+    if filtros.formato == "ndjson":
+        partes, media_type, nombre = _ndjson(lotes), "application/x-ndjson", "inspecciones.ndjson"
+    else:
+        partes, media_type, nombre = _csv(lotes), "text/csv; charset=utf-8", "inspecciones.csv"
+    if filtros.comprimir:
+        partes, media_type, nombre = _gzip(partes), "application/gzip", nombre + ".gz"
+    return StreamingResponse(partes, media_type=media_type, headers={"Content-Disposition": f'attachment; filename="{nombre}"'})
@@ -0,0 +1,67 @@
+from typing import Dict, List, Optional, Set, Tuple, Type, get_args
+
+from fastapi import HTTPException, Query, status
+from pydantic import BaseModel
+from sqlalchemy import inspect as sa_inspect
+from sqlalchemy.orm import load_only, raiseload, selectinload
+
+from .serializacion import adaptador
+
+# -------------------------
+# Campos dispersos (?fields=) e inclusión de relaciones (?include=)
+# -------------------------
+def _lista(valor: Optional[str]) -> Set[str]:
+    return {v.strip() for v in (valor or "").split(",") if v.strip()}
+
+class ParametrosCampos:
+    def __init__(
+        self,
+        fields: Optional[str] = Query(None, description="Campos escalares separados por coma, p.ej. 'id,numero'"),
+        include: Optional[str] = Query(None, description="Relaciones a incluir, p.ej. 'items'"),
+    ):
+        self.fields = _lista(fields)
+        self.include = _lista(include)
+
+class Proyeccion:
+    """Resuelve qué columnas y relaciones cargar de `modelo` para un listado."""
+
+    def __init__(self, modelo, schema: Type[BaseModel], params: ParametrosCampos):
+        mapper = sa_inspect(modelo)
+        relaciones = set(mapper.relationships.keys())
+        escalares = [c for c in schema.model_fields if c not in relaciones]
+
+        desconocidos = params.fields - set(escalares)
+        if desconocidos:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Campos desconocidos: {', '.join(sorted(desconocidos))}")
+        incluibles = relaciones & set(schema.model_fields)
+        desconocidas = params.include - incluibles
+        if desconocidas:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Relaciones desconocidas: {', '.join(sorted(desconocidas))}")
+
+        self.modelo = modelo
+        self.schema = schema
+        # id siempre se carga: lo necesita el cursor keyset
+        self.campos = [c for c in escalares if not params.fields or c in params.fields or c == "id"]
+        self.incluir = sorted(params.include)
+        self._visibles = set(params.fields or escalares)
+        self._ocultas = incluibles - params.include
+        self._adaptadores = {r: adaptador(schema.model_fields[r].annotation) for r in self.incluir}
+        # Campos de cada relación incluida (List[Schema]) para la salida columnar
+        self._campos_relacion = {r: list(get_args(schema.model_fields[r].annotation)[0].model_fields) for r in self.incluir}
+
+    def opciones(self) -> list:
+        opts = [load_only(*[getattr(self.modelo, c) for c in self.campos])]
+        opts += [selectinload(getattr(self.modelo, r)) for r in self.incluir]
+        opts += [raiseload(getattr(self.modelo, r)) for r in self._ocultas]
+        return opts
+
+    def serializar(self, fila) -> dict:
+        # Columnas tal cual vienen de la BD; RespuestaJSON/a_json las escriben sin otro recorrido
+        salida = {c: getattr(fila, c) for c in self.campos if c in self._visibles}
+        for r, ta in self._adaptadores.items():
+            salida[r] = ta.dump_python(ta.validate_python(getattr(fila, r), from_attributes=True))
+        return salida
+
+    def columnas(self) -> Tuple[List[str], Dict[str, List[str]]]:
+        """(campos visibles, {relación incluida: sus campos}) para app/columnar.py."""
+        return [c for c in self.campos if c in self._visibles], self._campos_relacion
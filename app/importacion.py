@@ -0,0 +1,282 @@
+import argparse
+import codecs
+import csv
+import io
+import json
+import sys
+from itertools import islice
+from typing import Dict, Iterable, Iterator, List, Tuple
+
+from pydantic import ValidationError
+from sqlalchemy import func, select, tuple_, update
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import Session
+
+from . import models, schemas
+from .catalogos import get_catalogos
+
+TAM_LOTE = 1000
+MAX_ERRORES = 100
+TIPOS = ("unidades", "zonas")
+FORMATOS = ("csv", "ndjson")
+
+# -------------------------
+# Lectura incremental
+# -------------------------
+def lineas(bloques: Iterable[bytes], encoding: str = "utf-8") -> Iterator[str]:
+    """Líneas de texto (con su fin de línea) a medida que llegan los bloques de bytes del cuerpo."""
+    decodificador = codecs.getincrementaldecoder(encoding)()
+    resto = ""
+    for bloque in bloques:
+        resto += decodificador.decode(bloque)
+        *completas, resto = resto.split("\n")
+        for linea in completas:
+            yield linea + "\n"
+    resto += decodificador.decode(b"", final=True)
+    if resto:
+        yield resto
+
+def leer_registros(archivo: Iterable[str], formato: str) -> Iterator[Tuple[int, dict]]:
+    """Devuelve (número de línea, registro) sin cargar el archivo completo."""
+    if formato == "csv":
+        lector = csv.DictReader(archivo)
+        for registro in lector:
+            # Celdas vacías en CSV equivalen a null
+            yield lector.line_num, {k: (v if v != "" else None) for k, v in registro.items() if k}
+    elif formato == "ndjson":
+        for n, linea in enumerate(archivo, start=1):
+            if linea.strip():
+                try:
+                    registro = json.loads(linea)
+                except ValueError:
+                    registro = None
+                yield n, registro
+    else:
+        raise ValueError(f"Formato no soportado: {formato}")
+
+def _lotes(registros: Iterable, tam: int) -> Iterator[list]:
+    it = iter(registros)
+    while lote := list(islice(it, tam)):
+        yield lote
+
+# -------------------------
+# Importador por lotes (una transacción por lote)
+# -------------------------
+class Importador:
+    def __init__(self, db: Session, tipo: str, tam_lote: int = TAM_LOTE):
+        if tipo not in TIPOS:
+            raise ValueError(f"Tipo no soportado: {tipo}")
+        self.db = db
+        self.tipo = tipo
+        self.tam_lote = tam_lote
+        self.resumen = {
+            "procesados": 0,
+            "insertados": 0,
+            "actualizados": 0,
+            "items_insertados": 0,
+            "items_actualizados": 0,
+            "rechazados": 0,
+            "errores": [],
+        }
+        # Unidades/zonas distintas tocadas, aunque aparezcan en varios lotes
+        self._insertados: set = set()
+        self._actualizados: set = set()
+
+    def importar(self, registros: Iterable[Tuple[int, dict]]) -> dict:
+        for lote in _lotes(registros, self.tam_lote):
+            try:
+                self._procesar_lote(lote)
+                self.db.commit()
+            except Exception:
+                self.db.rollback()
+                raise
+            self.resumen["actualizados"] = len(self._actualizados)
+        return self.resumen
+
+    def _rechazar(self, linea: int, detalle: str):
+        self.resumen["rechazados"] += 1
+        if len(self.resumen["errores"]) < MAX_ERRORES:
+            self.resumen["errores"].append({"indice": linea, "detalle": detalle})
+
+    def _validar(self, lote) -> List[Tuple[int, object, object]]:
+        if self.tipo == "unidades":
+            schema_padre, schema_item = schemas.UnidadCreate, schemas.UnidadItemCreate
+        else:
+            schema_padre, schema_item = schemas.ZonaCreate, schemas.ZonaItemCreate
+        validos = []
+        for linea, registro in lote:
+            self.resumen["procesados"] += 1
+            if not isinstance(registro, dict):
+                self._rechazar(linea, "Registro inválido")
+                continue
+            try:
+                padre = schema_padre.model_validate(registro)
+                item = None
+                if registro.get("item"):
+                    item = schema_item.model_validate({**registro, "nombre": registro["item"]})
+            except ValidationError as e:
+                self._rechazar(linea, "; ".join(f"{'.'.join(map(str, err['loc']))}: {err['msg']}" for err in e.errors()))
+                continue
+            validos.append((linea, padre, item))
+        return self._validar_catalogos(validos)
+
+    def _validar_catalogos(self, validos):
+        cat = get_catalogos(self.db)
+        salida = []
+        for linea, padre, item in validos:
+            if item and item.estado_id is not None and not cat.estado(item.estado_id):
+                self._rechazar(linea, "Estado inválido")
+            elif item and item.categoria_id is not None and not cat.categoria(item.categoria_id):
+                self._rechazar(linea, "Categoría inválida")
+            else:
+                salida.append((linea, padre, item))
+        return salida
+
+    def _procesar_lote(self, lote):
+        validos = self._validar(lote)
+        if self.tipo == "zonas":
+            validos = self._sin_zonas_ambiguas(validos)
+        if not validos:
+            return
+        if self.tipo == "unidades":
+            ids = self._upsert_unidades([p for _, p, _ in validos])
+            clave = lambda p: (p.torre, p.piso, p.numero)
+            Item, fk = models.UnidadItem, "unidad_id"
+        else:
+            ids = self._upsert_zonas([p for _, p, _ in validos])
+            clave = lambda p: p.nombre
+            Item, fk = models.ZonaItem, "zona_id"
+        # Último valor gana; a un item existente solo se le cambian las columnas que trajo el archivo
+        items: Dict[Tuple[int, str], Tuple[dict, set]] = {}
+        for _, padre, item in validos:
+            if item:
+                padre_id = ids[clave(padre)]
+                items[(padre_id, item.nombre)] = ({fk: padre_id, **item.model_dump()}, item.model_fields_set - {"nombre"})
+        if items:
+            self._actualizados |= self._upsert_items(Item, fk, items) - self._insertados
+
+    def _upsert_unidades(self, unidades) -> Dict[tuple, int]:
+        U = models.Unidad
+        claves = list(dict.fromkeys((u.torre, u.piso, u.numero) for u in unidades))
+        existentes = {
+            (t, p, n): i for i, t, p, n in
+            self.db.query(U.id, U.torre, U.piso, U.numero).filter(tuple_(U.torre, U.piso, U.numero).in_(claves))
+        }
+        nuevas = [dict(torre=t, piso=p, numero=n) for (t, p, n) in claves if (t, p, n) not in existentes]
+        if nuevas:
+            stmt = sqlite_insert(U).on_conflict_do_nothing(index_elements=["torre", "piso", "numero"])
+            filas = self.db.execute(stmt.returning(U.id, U.torre, U.piso, U.numero), nuevas).all()
+            for i, t, p, n in filas:
+                existentes[(t, p, n)] = i
+                self._insertados.add(i)
+            self.resumen["insertados"] += len(filas)
+            # Filas que otro proceso insertó entre la consulta y el INSERT (on conflict do nothing)
+            faltantes = [c for c in claves if c not in existentes]
+            if faltantes:
+                existentes.update({
+                    (t, p, n): i for i, t, p, n in
+                    self.db.query(U.id, U.torre, U.piso, U.numero).filter(tuple_(U.torre, U.piso, U.numero).in_(faltantes))
+                })
+        return existentes
+
+    def _sin_zonas_ambiguas(self, validos):
+        # Zonas por nombre (sin clave única): un nombre repetido en la BD no identifica a ninguna
+        Z = models.ZonaComun
+        nombres = {p.nombre for _, p, _ in validos}
+        repetidos = set(self.db.scalars(
+            select(Z.nombre).where(Z.nombre.in_(nombres)).group_by(Z.nombre).having(func.count() > 1)
+        ))
+        salida = []
+        for linea, padre, item in validos:
+            if padre.nombre in repetidos:
+                self._rechazar(linea, f"Nombre de zona ambiguo: hay varias zonas '{padre.nombre}'")
+            else:
+                salida.append((linea, padre, item))
+        return salida
+
+    def _upsert_zonas(self, zonas) -> Dict[str, int]:
+        Z = models.ZonaComun
+        por_nombre = {z.nombre: z for z in zonas}
+        existentes = {
+            n: (i, u, t) for i, n, u, t in
+            self.db.query(Z.id, Z.nombre, Z.ubicacion, Z.tipo).filter(Z.nombre.in_(list(por_nombre)))
+        }
+        ids = {n: v[0] for n, v in existentes.items()}
+        cambios = [
+            {"id": i, "ubicacion": por_nombre[n].ubicacion, "tipo": por_nombre[n].tipo}
+            for n, (i, u, t) in existentes.items()
+            if (por_nombre[n].ubicacion, por_nombre[n].tipo) != (u, t)
+        ]
+        if cambios:
+            self.db.execute(update(Z), cambios)
+            self._actualizados |= {c["id"] for c in cambios} - self._insertados
+        nuevas = [z.model_dump() for n, z in por_nombre.items() if n not in existentes]
+        if nuevas:
+            filas = self.db.execute(sqlite_insert(Z).returning(Z.id, Z.nombre), nuevas).all()
+            ids.update({n: i for i, n in filas})
+            self._insertados.update(i for i, _ in filas)
+            self.resumen["insertados"] += len(filas)
+        return ids
+
+    def _upsert_items(self, Item, fk: str, items: Dict[Tuple[int, str], Tuple[dict, set]]) -> set:
+        """Inserta/actualiza los items. -> ids de los padres con algún item nuevo o cambiado."""
+        padre_col = getattr(Item, fk)
+        columnas = ("categoria_id", "estado_id", "observacion")
+        existentes = {
+            (f[1], f[2]): f for f in
+            self.db.query(Item.id, padre_col, Item.nombre, Item.ultimo_detalle_id, *[getattr(Item, c) for c in columnas])
+            .filter(tuple_(padre_col, Item.nombre).in_(list(items)))
+        }
+        cambios, cambiados, nuevos = [], [], []
+        for k, (valores, provistas) in items.items():
+            actual = existentes.get(k)
+            if actual is None:
+                nuevos.append(valores)
+                continue
+            # El estado_id de un item ya inspeccionado viene de app/estado_items.py: no se pisa
+            editables = provistas - {"estado_id"} if actual.ultimo_detalle_id is not None else provistas
+            diferencias = {c: valores[c] for c in columnas if c in editables and valores[c] != getattr(actual, c)}
+            if diferencias:
+                cambios.append({"id": actual.id, **diferencias})
+                cambiados.append(k)
+        tocados = {padre for padre, _ in cambiados} | {v[fk] for v in nuevos}
+        if cambios:
+            self.db.execute(update(Item), cambios)
+            self.resumen["items_actualizados"] += len(cambios)
+        if nuevos:
+            self.db.execute(sqlite_insert(Item), nuevos)
+            self.resumen["items_insertados"] += len(nuevos)
+        return tocados
+
+def importar_archivo(db: Session, archivo: Iterable[str], tipo: str, formato: str, tam_lote: int = TAM_LOTE) -> dict:
+    return Importador(db, tipo, tam_lote).importar(leer_registros(archivo, formato))
+
+# -------------------------
+# CLI: python -m app.importacion unidades edificio.csv
+# -------------------------
+def main(argv=None):
+    from .database import SessionLocal, engine
+    from .migraciones import migrar
+
+    parser = argparse.ArgumentParser(description="Importa unidades o zonas (con sus items) desde CSV/NDJSON.")
+    parser.add_argument("tipo", choices=TIPOS)
+    parser.add_argument("archivo", help="Ruta del archivo, o '-' para stdin")
+    parser.add_argument("--formato", choices=FORMATOS, help="Por defecto se deduce de la extensión")
+    parser.add_argument("--lote", type=int, default=TAM_LOTE, help="Filas por transacción")
+    args = parser.parse_args(argv)
+
+    formato = args.formato or ("ndjson" if args.archivo.endswith((".ndjson", ".jsonl")) else "csv")
+    migrar(engine)
+    archivo = io.TextIOWrapper(sys.stdin.buffer, encoding="utf-8") if args.archivo == "-" else open(args.archivo, encoding="utf-8", newline="")
+    db = SessionLocal()
+    try:
+        with archivo:
+            resumen = importar_archivo(db, archivo, args.tipo, formato, args.lote)
+    finally:
+        db.close()
+    json.dump(resumen, sys.stdout, ensure_ascii=False, indent=2)
+    sys.stdout.write("\n")
+    return 1 if resumen["rechazados"] else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,197 @@
+from collections import Counter
+from datetime import datetime
+from typing import List, Optional, Set, Tuple
+
+from fastapi import HTTPException, Query, status
+from sqlalchemy import func, insert, literal, select
+from sqlalchemy.orm import Session
+
+from . import models, schemas
+from .cargadores import Cargadores
+from .catalogos import Catalogos, get_catalogos
+from .estado_items import registrar_lote
+
+# -------------------------
+# Validación de lotes de detalles (compartida por las rutas sync y async)
+# -------------------------
+def clasificar_detalles(
+    inspeccion_id: int,
+    detalles: List[schemas.InspeccionDetalleCreate],
+    ui_validos: Set[int],
+    zi_validos: Set[int],
+    cat: Catalogos,
+) -> Tuple[List[dict], List[int], List[dict]]:
+    """Separa las filas insertables (con su índice original) de los errores por fila."""
+    filas, indices, errores = [], [], []
+    for i, d in enumerate(detalles):
+        if bool(d.unidad_item_id) == bool(d.zona_item_id):
+            error = "El detalle debe referir a UN item de UNIDAD o de ZONA."
+        elif d.unidad_item_id and d.unidad_item_id not in ui_validos:
+            error = "El item de unidad no corresponde a la inspección."
+        elif d.zona_item_id and d.zona_item_id not in zi_validos:
+            error = "El item de zona no corresponde a la inspección."
+        elif not cat.estado(d.estado_id):
+            error = "Estado inválido"
+        else:
+            filas.append({"inspeccion_id": inspeccion_id, **d.model_dump()})
+            indices.append(i)
+            continue
+        errores.append({"indice": i, "detalle": error})
+    return filas, indices, errores
+
+def items_validos(db: Session, ins: models.Inspeccion, detalles: List[schemas.InspeccionDetalleCreate]) -> Tuple[Set[int], Set[int]]:
+    # Validación por conjuntos: una consulta IN por tipo de item, acotada a la unidad/zona de la inspección
+    ids_ui = {d.unidad_item_id for d in detalles if d.unidad_item_id}
+    ids_zi = {d.zona_item_id for d in detalles if d.zona_item_id}
+    ui_validos = set()
+    if ids_ui and ins.unidad_id:
+        ui_validos = {i for (i,) in db.query(models.UnidadItem.id).filter(
+            models.UnidadItem.id.in_(ids_ui), models.UnidadItem.unidad_id == ins.unidad_id)}
+    zi_validos = set()
+    if ids_zi and ins.zona_id:
+        zi_validos = {i for (i,) in db.query(models.ZonaItem.id).filter(
+            models.ZonaItem.id.in_(ids_zi), models.ZonaItem.zona_id == ins.zona_id)}
+    return ui_validos, zi_validos
+
+# -------------------------
+# Documento compuesto de inspección (?expand=)
+# -------------------------
+EXPANSIONES = ("checklist", "items", "estados")
+_CAMPOS_DETALLE = list(schemas.InspeccionDetalleOut.model_fields)
+_CAMPOS_CHECKLIST = [c for c in schemas.ChecklistOut.model_fields if c != "items"]
+
+class ParametrosExpand:
+    def __init__(
+        self,
+        expand: Optional[str] = Query(None, description="Relaciones a resolver, separadas por coma: checklist, items, estados"),
+    ):
+        self.campos = {v.strip() for v in (expand or "").split(",") if v.strip()}
+        desconocidas = self.campos - set(EXPANSIONES)
+        if desconocidas:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Expansiones desconocidas: {', '.join(sorted(desconocidas))}")
+
+def documentos(db: Session, inspecciones: List[models.Inspeccion], expand: Set[str], Detalle=models.InspeccionDetalle) -> List[dict]:
+    """Arma {inspeccion, checklist, detalles} para todas las inspecciones con un IN por tipo."""
+    cargar = Cargadores(db)
+    detalles = cargar(Detalle.inspeccion_id, muchos=True)
+    detalles.pedir(i.id for i in inspecciones)
+    if "checklist" in expand:
+        checklists = cargar(models.Checklist.id)
+        items_checklist = cargar(models.ChecklistItem.checklist_id, muchos=True)
+        checklists.pedir(i.checklist_id for i in inspecciones)
+        items_checklist.pedir(i.checklist_id for i in inspecciones)
+    if "items" in expand:
+        unidad_items = cargar(models.UnidadItem.id)
+        zona_items = cargar(models.ZonaItem.id)
+        for i in inspecciones:
+            for d in detalles.obtener(i.id):
+                unidad_items.pedir((d.unidad_item_id,))
+                zona_items.pedir((d.zona_item_id,))
+    cat = get_catalogos(db) if "estados" in expand else None
+
+    salida = []
+    for ins in inspecciones:
+        filas = []
+        for d in detalles.obtener(ins.id):
+            fila = {c: getattr(d, c) for c in _CAMPOS_DETALLE}
+            if "items" in expand:
+                fila["unidad_item"] = unidad_items.obtener(d.unidad_item_id)
+                fila["zona_item"] = zona_items.obtener(d.zona_item_id)
+            if cat is not None:
+                fila["estado"] = cat.estado(d.estado_id)
+            filas.append(fila)
+        doc = {"inspeccion": ins, "detalles": filas}
+        if "checklist" in expand:
+            c = checklists.obtener(ins.checklist_id)
+            if c is not None:
+                doc["checklist"] = {
+                    **{k: getattr(c, k) for k in _CAMPOS_CHECKLIST},
+                    "items": items_checklist.obtener(ins.checklist_id),
+                }
+        salida.append(doc)
+    return salida
+
+# -------------------------
+# Instanciar inspecciones desde un checklist (INSERT ... SELECT, una transacción)
+# -------------------------
+LIMITE_INSTANCIAS = 1000
+
+def instanciar(db: Session, p: schemas.InspeccionInstanciar) -> dict:
+    I, D = models.Inspeccion, models.InspeccionDetalle
+    ch = db.query(models.Checklist).filter(models.Checklist.id == p.checklist_id).first()
+    if not ch:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Checklist no encontrado")
+    if ch.ambito == models.AmbitoEnum.UNIDAD:
+        if p.zona_ids:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="El checklist es de UNIDAD: no admite zona_ids.")
+        if not (p.unidad_ids or p.torre or p.piso is not None):
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Indique unidad_ids, torre o piso.")
+        Destino, Item, columna, campo = models.Unidad, models.UnidadItem, I.unidad_id, D.unidad_item_id
+        filtros, pedidos = [], p.unidad_ids
+        if p.unidad_ids:
+            filtros.append(Destino.id.in_(p.unidad_ids))
+        if p.torre:
+            filtros.append(Destino.torre == p.torre)
+        if p.piso is not None:
+            filtros.append(Destino.piso == p.piso)
+        propietario = Item.unidad_id
+    else:
+        if p.unidad_ids or p.torre or p.piso is not None:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="El checklist es de ZONA: solo admite zona_ids.")
+        if not p.zona_ids:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Indique zona_ids.")
+        Destino, Item, columna, campo = models.ZonaComun, models.ZonaItem, I.zona_id, D.zona_item_id
+        filtros, pedidos = [Destino.id.in_(p.zona_ids)], p.zona_ids
+        propietario = Item.zona_id
+
+    cat = get_catalogos(db)
+    if p.estado_id is not None and not cat.estado(p.estado_id):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Estado inválido")
+
+    # 1) Una inspección por destino
+    fecha, ahora = p.fecha or datetime.utcnow(), datetime.utcnow()
+    destinos = (
+        select(
+            literal(fecha, I.fecha.type), literal(p.inspector), literal(p.checklist_id),
+            Destino.id, literal(1), literal(ahora, I.actualizado_en.type),
+        )
+        .where(*filtros)
+        .order_by(Destino.id)
+        .limit(LIMITE_INSTANCIAS + 1)
+    )
+    inspecciones = db.execute(
+        insert(I)
+        .from_select(["fecha", "inspector", "checklist_id", columna.key, "version", "actualizado_en"], destinos)
+        .returning(I.id, I.fecha, I.inspector, I.checklist_id, I.unidad_id, I.zona_id, I.clave_cliente)
+    ).all()
+    if len(inspecciones) > LIMITE_INSTANCIAS:
+        db.rollback()
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Más de {LIMITE_INSTANCIAS} destinos: divida la solicitud.")
+
+    # 2) Un detalle por item con su estado actual; los items sin estado solo si se pidió estado_id
+    detalles = []
+    if inspecciones:
+        estado = func.coalesce(Item.estado_id, p.estado_id) if p.estado_id is not None else Item.estado_id
+        items = (
+            select(I.id, Item.id, estado)
+            .join(Item, propietario == columna)
+            .where(I.id.in_([f.id for f in inspecciones]))
+        )
+        if p.estado_id is None:
+            items = items.where(Item.estado_id.is_not(None))
+        detalles = db.execute(
+            insert(D)
+            .from_select(["inspeccion_id", campo.key, "estado_id"], items)
+            .returning(D.id, D.inspeccion_id, campo, D.estado_id)
+        ).all()
+        por_id = {f.id: f for f in inspecciones}
+        registrar_lote(db, [(por_id[d.inspeccion_id], d) for d in detalles])
+    db.commit()
+
+    conteo = Counter(d.inspeccion_id for d in detalles)
+    creados = {getattr(f, columna.key) for f in inspecciones}
+    return {
+        "inspecciones": [{**f._mapping, "detalles": conteo[f.id]} for f in sorted(inspecciones, key=lambda f: f.id)],
+        "detalles": len(detalles),
+        "no_encontradas": sorted(set(pedidos) - creados),
+    }
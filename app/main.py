@@ -1,25 +1,94 @@
-from fastapi import FastAPI, Depends, HTTPException, status
+from fastapi import FastAPI, Depends, HTTPException, Query, Request, Response, status
+from fastapi.concurrency import run_in_threadpool
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import FileResponse, PlainTextResponse
+from sqlalchemy import insert
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
-from typing import List, Optional
+from typing import List, Literal, Optional, Union
+from contextlib import asynccontextmanager
+from datetime import datetime
+import anyio
+import os
 
 from . import models, schemas
-from .database import Base, engine, get_db
-
-Base.metadata.create_all(bind=engine)
-
-app = FastAPI(title="ERP – Inventarios (Unidades y Zonas) • v1")
+from .config import settings
+from .database import SessionLocal, async_engine, engine, engine_lectura, get_db, get_db_lectura
+from .archivo import modelos_archivo, por_clave_cliente, preparar as preparar_archivo
+from .busqueda import FiltrosBusqueda, buscar
+from .catalogos import get_catalogos, listar_catalogo
+from .columnar import formato_columnar, responder_columnar
+from .exportacion import FiltrosExport, exportar_inspecciones
+from .importacion import importar_archivo, lineas
+from .inspecciones import ParametrosExpand, clasificar_detalles, documentos, instanciar, items_validos
+from .metricas import MiddlewareMetricas, RutaInstrumentada, instrumentar_engine, registro
+from .migraciones import migrar
+from .fieldsets import ParametrosCampos, Proyeccion
+from .pagination import VARIA, ParametrosPagina, listar, paginar
+from .reportes import FiltrosPendientes, consultar_pendientes, pendientes_columnar
+from .escrituras import coordinador, escribir
+from .estado_items import registrar_detalles
+from .resumenes import resumen_general, resumen_unidades, resumen_zonas
+from .serializacion import RespuestaJSON, responder
+from .sincronizacion import ParametrosSync, cambios_desde, recibir_inspecciones
+from .trabajos import ejecutor, enviar, limpieza, reanudar, resultado
+from .versiones import consulta_version, no_modificada, validadores
+
+def _reanudar_trabajos():
+    with SessionLocal() as db:
+        reanudar(db)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # El pool de conexiones se dimensiona con el mismo número de hilos (ver app/config.py)
+    anyio.to_thread.current_default_thread_limiter().total_tokens = settings.threadpool
+    if settings.auto_migrar:
+        await run_in_threadpool(migrar, engine)
+    await run_in_threadpool(preparar_archivo, engine)
+    await run_in_threadpool(_reanudar_trabajos)
+    limpieza.iniciar()
+    yield
+    limpieza.detener()
+    ejecutor.detener()
+    coordinador.detener()
+    if async_engine is not None:
+        await async_engine.dispose()
+
+app = FastAPI(title="ERP – Inventarios (Unidades y Zonas) • v1", lifespan=lifespan)
+
+# Instrumentación: conteo/tiempo de SQL por ruta, Server-Timing y /metrics
+if settings.metricas:
+    app.router.route_class = RutaInstrumentada
+    app.add_middleware(MiddlewareMetricas)
+    for _eng in (engine, engine_lectura, async_engine.sync_engine if async_engine else None):
+        if _eng is not None:
+            instrumentar_engine(_eng)
+
+# Compresión por fuera de las métricas: Server-Timing mide la ruta, no el gzip
+if settings.gzip_min_bytes:
+    app.add_middleware(GZipMiddleware, minimum_size=settings.gzip_min_bytes, compresslevel=settings.gzip_nivel)
+
+# Rutas async (DB_ASYNC=1): registradas primero, tienen prioridad sobre las sync
+if settings.db_async:
+    from .rutas_async import router as router_async
+    app.include_router(router_async)
 
 # -------------------------------
 # Root
 # -------------------------------
 @app.get("/")
-def home():
+async def home():
     return {
         "mensaje": "Inventarios | Propiedad privada y Zonas comunes",
         "docs": "/docs",
         "version": "v1"
     }
 
+@app.get("/metrics", include_in_schema=False)
+def metrics():
+    # Formato de texto Prometheus; cada worker expone sus propios contadores
+    return PlainTextResponse(registro.exponer(), media_type="text/plain; version=0.0.4")
+
 # -------------------------------
 # SEED de catálogos (para probar rápido)
 # -------------------------------
@@ -48,23 +117,25 @@ def seed_catalogos(db: Session = Depends(get_db)):
     db.commit()
     return {"ok": True, "detalle": "Catálogos cargados (idempotente)."}
 
-@app.get("/api/v1/catalogos/estados", response_model=List[schemas.CatalogoEstadoOut], tags=["Catálogos"])
-def listar_estados(db: Session = Depends(get_db)):
-    return db.query(models.CatalogoEstado).order_by(models.CatalogoEstado.orden_severidad.asc()).all()
+@app.get("/api/v1/catalogos/estados", response_model=schemas.Pagina[schemas.CatalogoEstadoOut], tags=["Catálogos"])
+def listar_estados(request: Request, pagina: ParametrosPagina = Depends(), db: Session = Depends(get_db_lectura)):
+    cat = get_catalogos(db)
+    return listar_catalogo(request, cat.estados, ("orden_severidad", "id"), pagina, schemas.CatalogoEstadoOut, cat)
 
-@app.get("/api/v1/catalogos/categorias", response_model=List[schemas.CatalogoCategoriaOut], tags=["Catálogos"])
-def listar_categorias(db: Session = Depends(get_db)):
-    return db.query(models.CatalogoCategoria).order_by(models.CatalogoCategoria.nombre.asc()).all()
+@app.get("/api/v1/catalogos/categorias", response_model=schemas.Pagina[schemas.CatalogoCategoriaOut], tags=["Catálogos"])
+def listar_categorias(request: Request, pagina: ParametrosPagina = Depends(), db: Session = Depends(get_db_lectura)):
+    cat = get_catalogos(db)
+    return listar_catalogo(request, cat.categorias, ("nombre", "id"), pagina, schemas.CatalogoCategoriaOut, cat)
 
 # -------------------------------
 # ARTÍCULOS (ejemplo)
 # -------------------------------
-@app.get("/api/v1/articulos", response_model=List[schemas.Articulo], tags=["Artículos"])
-def leer_articulos(db: Session = Depends(get_db)):
-    return db.query(models.Articulo).all()
+@app.get("/api/v1/articulos", response_model=schemas.Pagina[schemas.Articulo], tags=["Artículos"])
+def leer_articulos(request: Request, pagina: ParametrosPagina = Depends(), db: Session = Depends(get_db_lectura)):
+    return listar(request, db.query(models.Articulo), (models.Articulo.id,), pagina, schemas.Articulo)
 
 @app.get("/api/v1/articulos/{articulo_id}", response_model=schemas.Articulo, tags=["Artículos"])
-def leer_articulo(articulo_id: int, db: Session = Depends(get_db)):
+def leer_articulo(articulo_id: int, db: Session = Depends(get_db_lectura)):
     articulo = db.query(models.Articulo).filter(models.Articulo.id == articulo_id).first()
     if not articulo:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Artículo no encontrado")
@@ -103,30 +174,48 @@ def eliminar_articulo(articulo_id: int, db: Session = Depends(get_db)):
 # -------------------------
 @app.post("/api/v1/unidades", response_model=schemas.UnidadOut, status_code=status.HTTP_201_CREATED, tags=["Unidades"])
 def crear_unidad(payload: schemas.UnidadCreate, db: Session = Depends(get_db)):
-    unidad = models.Unidad(**payload.model_dump())
-    db.add(unidad)
-    db.commit()
-    db.refresh(unidad)
-    return unidad
-
-@app.get("/api/v1/unidades", response_model=List[schemas.UnidadOut], tags=["Unidades"])
+    def crear(s: Session):
+        unidad = models.Unidad(**payload.model_dump())
+        s.add(unidad)
+        return unidad
+    try:
+        return escribir(db, crear, schemas.UnidadOut)
+    except IntegrityError:
+        # uq_unidad_ref: ya hay una unidad con esa torre, piso y número
+        db.rollback()
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="La unidad ya existe (torre, piso, número).")
+
+@app.get("/api/v1/unidades", response_model=schemas.Pagina[schemas.UnidadOut], tags=["Unidades"])
 def listar_unidades(
+    request: Request,
     torre: Optional[str] = None,
     piso: Optional[int] = None,
-    db: Session = Depends(get_db)
+    pagina: ParametrosPagina = Depends(),
+    campos: ParametrosCampos = Depends(),
+    db: Session = Depends(get_db_lectura)
 ):
+    # Sin include=items solo se leen las columnas escalares (1 query); con include=items, 2 queries
     q = db.query(models.Unidad)
     if torre:
         q = q.filter(models.Unidad.torre == torre)
     if piso is not None:
         q = q.filter(models.Unidad.piso == piso)
-    return q.all()
+    proyeccion = Proyeccion(models.Unidad, schemas.UnidadOut, campos)
+    return listar(request, q, (models.Unidad.id,), pagina, schemas.UnidadOut, proyeccion)
 
 @app.get("/api/v1/unidades/{unidad_id}", response_model=schemas.UnidadOut, tags=["Unidades"])
-def obtener_unidad(unidad_id: int, db: Session = Depends(get_db)):
+def obtener_unidad(unidad_id: int, request: Request, response: Response, db: Session = Depends(get_db_lectura)):
+    fila = db.execute(consulta_version(models.Unidad, unidad_id)).first()
+    if not fila:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Unidad no encontrada")
+    cabeceras = validadores(models.Unidad, unidad_id, fila)
+    if (r := no_modificada(request, cabeceras)) is not None:
+        return r
+    # Versión leída antes que el grafo: el contenido nunca es más viejo que su ETag
     u = db.query(models.Unidad).filter(models.Unidad.id == unidad_id).first()
     if not u:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Unidad no encontrada")
+    response.headers.update(cabeceras)
     return u
 
 @app.post("/api/v1/unidades/{unidad_id}/items", response_model=schemas.UnidadItemOut, status_code=status.HTTP_201_CREATED, tags=["Unidades"])
@@ -134,45 +223,57 @@ def agregar_item_unidad(unidad_id: int, payload: schemas.UnidadItemCreate, db: S
     u = db.query(models.Unidad).filter(models.Unidad.id == unidad_id).first()
     if not u:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Unidad no encontrada")
-    item = models.UnidadItem(unidad_id=unidad_id, **payload.model_dump())
-    db.add(item)
-    db.commit()
-    db.refresh(item)
-    return item
-
-@app.get("/api/v1/unidades/{unidad_id}/items", response_model=List[schemas.UnidadItemOut], tags=["Unidades"])
-def listar_items_unidad(unidad_id: int, db: Session = Depends(get_db)):
+    def crear(s: Session):
+        item = models.UnidadItem(unidad_id=unidad_id, **payload.model_dump())
+        s.add(item)
+        return item
+    return escribir(db, crear, schemas.UnidadItemOut)
+
+@app.get("/api/v1/unidades/{unidad_id}/items", response_model=schemas.Pagina[schemas.UnidadItemOut], tags=["Unidades"])
+def listar_items_unidad(unidad_id: int, request: Request, pagina: ParametrosPagina = Depends(), db: Session = Depends(get_db_lectura)):
     u = db.query(models.Unidad).filter(models.Unidad.id == unidad_id).first()
     if not u:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Unidad no encontrada")
-    return u.items
+    q = db.query(models.UnidadItem).filter(models.UnidadItem.unidad_id == unidad_id)
+    return listar(request, q, (models.UnidadItem.id,), pagina, schemas.UnidadItemOut)
 
 # -------------------------
 # ZONAS COMUNES
 # -------------------------
 @app.post("/api/v1/zonas", response_model=schemas.ZonaOut, status_code=status.HTTP_201_CREATED, tags=["Zonas"])
 def crear_zona(payload: schemas.ZonaCreate, db: Session = Depends(get_db)):
-    z = models.ZonaComun(**payload.model_dump())
-    db.add(z)
-    db.commit()
-    db.refresh(z)
-    return z
+    def crear(s: Session):
+        z = models.ZonaComun(**payload.model_dump())
+        s.add(z)
+        return z
+    return escribir(db, crear, schemas.ZonaOut)
 
-@app.get("/api/v1/zonas", response_model=List[schemas.ZonaOut], tags=["Zonas"])
+@app.get("/api/v1/zonas", response_model=schemas.Pagina[schemas.ZonaOut], tags=["Zonas"])
 def listar_zonas(
+    request: Request,
     tipo: Optional[str] = None,
-    db: Session = Depends(get_db)
+    pagina: ParametrosPagina = Depends(),
+    campos: ParametrosCampos = Depends(),
+    db: Session = Depends(get_db_lectura)
 ):
     q = db.query(models.ZonaComun)
     if tipo:
         q = q.filter(models.ZonaComun.tipo == tipo)
-    return q.all()
+    proyeccion = Proyeccion(models.ZonaComun, schemas.ZonaOut, campos)
+    return listar(request, q, (models.ZonaComun.id,), pagina, schemas.ZonaOut, proyeccion)
 
 @app.get("/api/v1/zonas/{zona_id}", response_model=schemas.ZonaOut, tags=["Zonas"])
-def obtener_zona(zona_id: int, db: Session = Depends(get_db)):
+def obtener_zona(zona_id: int, request: Request, response: Response, db: Session = Depends(get_db_lectura)):
+    fila = db.execute(consulta_version(models.ZonaComun, zona_id)).first()
+    if not fila:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Zona no encontrada")
+    cabeceras = validadores(models.ZonaComun, zona_id, fila)
+    if (r := no_modificada(request, cabeceras)) is not None:
+        return r
     z = db.query(models.ZonaComun).filter(models.ZonaComun.id == zona_id).first()
     if not z:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Zona no encontrada")
+    response.headers.update(cabeceras)
     return z
 
 @app.post("/api/v1/zonas/{zona_id}/items", response_model=schemas.ZonaItemOut, status_code=status.HTTP_201_CREATED, tags=["Zonas"])
@@ -180,63 +281,80 @@ def agregar_item_zona(zona_id: int, payload: schemas.ZonaItemCreate, db: Session
     z = db.query(models.ZonaComun).filter(models.ZonaComun.id == zona_id).first()
     if not z:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Zona no encontrada")
-    item = models.ZonaItem(zona_id=zona_id, **payload.model_dump())
-    db.add(item)
-    db.commit()
-    db.refresh(item)
-    return item
-
-@app.get("/api/v1/zonas/{zona_id}/items", response_model=List[schemas.ZonaItemOut], tags=["Zonas"])
-def listar_items_zona(zona_id: int, db: Session = Depends(get_db)):
+    def crear(s: Session):
+        item = models.ZonaItem(zona_id=zona_id, **payload.model_dump())
+        s.add(item)
+        return item
+    return escribir(db, crear, schemas.ZonaItemOut)
+
+@app.get("/api/v1/zonas/{zona_id}/items", response_model=schemas.Pagina[schemas.ZonaItemOut], tags=["Zonas"])
+def listar_items_zona(zona_id: int, request: Request, pagina: ParametrosPagina = Depends(), db: Session = Depends(get_db_lectura)):
     z = db.query(models.ZonaComun).filter(models.ZonaComun.id == zona_id).first()
     if not z:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Zona no encontrada")
-    return z.items
+    q = db.query(models.ZonaItem).filter(models.ZonaItem.zona_id == zona_id)
+    return listar(request, q, (models.ZonaItem.id,), pagina, schemas.ZonaItemOut)
 
 # -------------------------
 # CHECKLISTS
 # -------------------------
 @app.post("/api/v1/checklists", response_model=schemas.ChecklistOut, status_code=status.HTTP_201_CREATED, tags=["Checklists"])
 def crear_checklist(payload: schemas.ChecklistCreate, db: Session = Depends(get_db)):
-    ch = models.Checklist(**payload.model_dump())
-    db.add(ch)
-    db.commit()
-    db.refresh(ch)
-    return ch
+    def crear(s: Session):
+        ch = models.Checklist(**payload.model_dump())
+        s.add(ch)
+        return ch
+    return escribir(db, crear, schemas.ChecklistOut)
 
 @app.post("/api/v1/checklists/{checklist_id}/items", response_model=schemas.ChecklistItemOut, status_code=status.HTTP_201_CREATED, tags=["Checklists"])
 def agregar_item_checklist(checklist_id: int, payload: schemas.ChecklistItemCreate, db: Session = Depends(get_db)):
     ch = db.query(models.Checklist).filter(models.Checklist.id == checklist_id).first()
     if not ch:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Checklist no encontrado")
-    it = models.ChecklistItem(checklist_id=checklist_id, **payload.model_dump())
-    db.add(it)
-    db.commit()
-    db.refresh(it)
-    return it
+    def crear(s: Session):
+        it = models.ChecklistItem(checklist_id=checklist_id, **payload.model_dump())
+        s.add(it)
+        return it
+    return escribir(db, crear, schemas.ChecklistItemOut)
 
 # -------------------------
 # INSPECCIONES
 # -------------------------
 @app.post("/api/v1/inspecciones", response_model=schemas.InspeccionOut, status_code=status.HTTP_201_CREATED, tags=["Inspecciones"])
-def crear_inspeccion(payload: schemas.InspeccionCreate, db: Session = Depends(get_db)):
+def crear_inspeccion(payload: schemas.InspeccionCreate, response: Response, db: Session = Depends(get_db)):
+    # Reintento con la misma clave del cliente: se devuelve la inspección ya creada (aunque esté archivada)
+    if payload.clave_cliente:
+        previa = por_clave_cliente(db, payload.clave_cliente)
+        if previa:
+            response.status_code = status.HTTP_200_OK
+            return previa
     # Validar que exista solo unidad o zona (no ambos, no ninguno)
     if bool(payload.unidad_id) == bool(payload.zona_id):
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="La inspección debe referir a UNA unidad O UNA zona.")
     ch = db.query(models.Checklist).filter(models.Checklist.id == payload.checklist_id).first()
     if not ch:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Checklist no encontrado")
-    ins = models.Inspeccion(
-        fecha=payload.fecha,
-        inspector=payload.inspector,
-        checklist_id=payload.checklist_id,
-        unidad_id=payload.unidad_id,
-        zona_id=payload.zona_id
-    )
-    db.add(ins)
-    db.commit()
-    db.refresh(ins)
-    return ins
+    def crear(s: Session):
+        ins = models.Inspeccion(
+            fecha=payload.fecha,
+            inspector=payload.inspector,
+            checklist_id=payload.checklist_id,
+            unidad_id=payload.unidad_id,
+            zona_id=payload.zona_id,
+            clave_cliente=payload.clave_cliente
+        )
+        s.add(ins)
+        return ins
+    try:
+        return escribir(db, crear, schemas.InspeccionOut)
+    except IntegrityError:
+        # Dos envíos simultáneos con la misma clave: gana el primero
+        db.rollback()
+        previa = por_clave_cliente(db, payload.clave_cliente) if payload.clave_cliente else None
+        if not previa:
+            raise
+        response.status_code = status.HTTP_200_OK
+        return previa
 
 @app.post("/api/v1/inspecciones/{inspeccion_id}/detalles", response_model=schemas.InspeccionDetalleOut, status_code=status.HTTP_201_CREATED, tags=["Inspecciones"])
 def agregar_detalle_inspeccion(inspeccion_id: int, payload: schemas.InspeccionDetalleCreate, db: Session = Depends(get_db)):
@@ -256,63 +374,222 @@ def agregar_detalle_inspeccion(inspeccion_id: int, payload: schemas.InspeccionDe
             raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="El item de zona no corresponde a la inspección.")
 
     # Validar estado existente
-    est = db.query(models.CatalogoEstado).filter(models.CatalogoEstado.id == payload.estado_id).first()
-    if not est:
+    if not get_catalogos(db).estado(payload.estado_id):
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Estado inválido")
 
-    det = models.InspeccionDetalle(
-        inspeccion_id=inspeccion_id,
-        unidad_item_id=payload.unidad_item_id,
-        zona_item_id=payload.zona_item_id,
-        estado_id=payload.estado_id,
-        observacion=payload.observacion
-    )
-    db.add(det)
-    db.commit()
-    db.refresh(det)
-    return det
-
-@app.get("/api/v1/inspecciones/{inspeccion_id}", tags=["Inspecciones"])
-def obtener_inspeccion(inspeccion_id: int, db: Session = Depends(get_db)):
+    def crear(s: Session):
+        det = models.InspeccionDetalle(
+            inspeccion_id=inspeccion_id,
+            unidad_item_id=payload.unidad_item_id,
+            zona_item_id=payload.zona_item_id,
+            estado_id=payload.estado_id,
+            observacion=payload.observacion
+        )
+        s.add(det)
+        s.flush()
+        # Proyección de estado en la misma transacción (y el mismo SAVEPOINT con group commit)
+        registrar_detalles(s, ins, [det])
+        return det
+    return escribir(db, crear, schemas.InspeccionDetalleOut)
+
+@app.post("/api/v1/inspecciones/{inspeccion_id}/detalles:batch", response_model=schemas.InspeccionDetalleBatchOut, status_code=status.HTTP_201_CREATED, tags=["Inspecciones"])
+def agregar_detalles_inspeccion_batch(inspeccion_id: int, payload: schemas.InspeccionDetalleBatch, db: Session = Depends(get_db)):
     ins = db.query(models.Inspeccion).filter(models.Inspeccion.id == inspeccion_id).first()
     if not ins:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Inspección no encontrada")
-    # Devolver con detalles:
-    detalles = db.query(models.InspeccionDetalle).filter(models.InspeccionDetalle.inspeccion_id == inspeccion_id).all()
-    return {
-        "inspeccion": schemas.InspeccionOut.model_validate(ins).model_dump(),
-        "detalles": [schemas.InspeccionDetalleOut.model_validate(d).model_dump() for d in detalles]
-    }
+    detalles = payload.detalles
+
+    # Validación por conjuntos: una consulta IN por tipo de item; estados desde la caché de catálogos
+    ui_validos, zi_validos = items_validos(db, ins, detalles)
+    filas, indices, errores = clasificar_detalles(inspeccion_id, detalles, ui_validos, zi_validos, get_catalogos(db))
+
+    insertados = []
+    if filas:
+        # Un solo executemany y un solo commit para todo el lote
+        ids = db.scalars(
+            insert(models.InspeccionDetalle).returning(models.InspeccionDetalle.id, sort_by_parameter_order=True),
+            filas
+        ).all()
+        insertados = [{"indice": i, "id": det_id, **f} for i, det_id, f in zip(indices, ids, filas)]
+        registrar_detalles(db, ins, insertados)
+        db.commit()
+    return {"insertados": insertados, "errores": errores}
+
+@app.post("/api/v1/inspecciones:instanciar", response_model=schemas.InstanciarOut, status_code=status.HTTP_201_CREATED, tags=["Inspecciones"])
+def instanciar_inspecciones(payload: schemas.InspeccionInstanciar, db: Session = Depends(get_db)):
+    # Inspección + un detalle prellenado por item para cada unidad/zona destino, en una transacción
+    return instanciar(db, payload)
+
+@app.get("/api/v1/inspecciones", response_model=schemas.Pagina[schemas.InspeccionExpandida], tags=["Inspecciones"])
+def listar_inspecciones(
+    unidad_id: Optional[int] = None,
+    zona_id: Optional[int] = None,
+    checklist_id: Optional[int] = None,
+    desde: Optional[datetime] = None,
+    hasta: Optional[datetime] = None,
+    pagina: ParametrosPagina = Depends(),
+    expand: ParametrosExpand = Depends(),
+    db: Session = Depends(get_db_lectura)
+):
+    # 1 query por la página + 1 IN por cada tipo expandido, sin importar cuántas inspecciones traiga
+    I = models.Inspeccion
+    q = db.query(I)
+    if unidad_id is not None:
+        q = q.filter(I.unidad_id == unidad_id)
+    if zona_id is not None:
+        q = q.filter(I.zona_id == zona_id)
+    if checklist_id is not None:
+        q = q.filter(I.checklist_id == checklist_id)
+    if desde:
+        q = q.filter(I.fecha >= desde)
+    if hasta:
+        q = q.filter(I.fecha <= hasta)
+    resultado = paginar(q, (I.id,), pagina)
+    return responder(schemas.Pagina[schemas.InspeccionExpandida], {
+        "items": documentos(db, resultado["items"], expand.campos),
+        "next_cursor": resultado["next_cursor"],
+    })
+
+@app.get("/api/v1/inspecciones/{inspeccion_id}", response_model=Union[schemas.InspeccionExpandida, schemas.InspeccionConDetalles], tags=["Inspecciones"])
+def obtener_inspeccion(inspeccion_id: int, request: Request, expand: ParametrosExpand = Depends(), db: Session = Depends(get_db_lectura)):
+    I, D = models.Inspeccion, models.InspeccionDetalle
+    if expand.campos:
+        # Con expand el documento depende de checklist e items, que no mueven la versión: sin ETag
+        ins = db.get(I, inspeccion_id)
+        if not ins and (archivo := modelos_archivo()):
+            I, D = archivo
+            ins = db.get(I, inspeccion_id)
+        if not ins:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Inspección no encontrada")
+        return responder(schemas.InspeccionExpandida, documentos(db, [ins], expand.campos, D)[0])
+    fila = db.execute(consulta_version(I, inspeccion_id)).first()
+    if not fila and (archivo := modelos_archivo()):
+        # Fuera del almacén caliente: se busca en el historial archivado (mismo ETag que antes de moverla)
+        I, D = archivo
+        fila = db.execute(consulta_version(I, inspeccion_id)).first()
+    if not fila:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Inspección no encontrada")
+    cabeceras = validadores(I, inspeccion_id, fila)
+    if (r := no_modificada(request, cabeceras)) is not None:
+        return r
+    ins = db.query(I).filter(I.id == inspeccion_id).first()
+    if not ins:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Inspección no encontrada")
+    # Devolver con detalles (una sola pasada de validación, directo a bytes JSON)
+    detalles = db.query(D).filter(D.inspeccion_id == inspeccion_id).all()
+    return responder(schemas.InspeccionConDetalles, {"inspeccion": ins, "detalles": detalles}, headers=cabeceras)
+
+# -------------------------
+# IMPORTACIÓN MASIVA (CSV / NDJSON)
+# -------------------------
+@app.post("/api/v1/importar/{tipo}", response_model=schemas.ImportacionOut, tags=["Importación"])
+async def importar(
+    tipo: Literal["unidades", "zonas"],
+    request: Request,
+    formato: Optional[Literal["csv", "ndjson"]] = None,
+    db: Session = Depends(get_db)
+):
+    formato = formato or ("ndjson" if "ndjson" in request.headers.get("content-type", "") else "csv")
+    cuerpo = request.stream()
+
+    def bloques():
+        # El importador (en el threadpool) pide el cuerpo a medida que arma cada lote
+        while True:
+            try:
+                yield anyio.from_thread.run(cuerpo.__anext__)
+            except StopAsyncIteration:
+                return
+
+    return await run_in_threadpool(importar_archivo, db, lineas(bloques()), tipo, formato)
 
 # -------------------------
-# PENDIENTES (simple: todo lo que NO está 'Bueno')
+# PENDIENTES (todo lo que NO está 'Bueno', última inspección de cada item)
 # -------------------------
 @app.get("/api/v1/pendientes", tags=["Reportes"])
-def listar_pendientes(db: Session = Depends(get_db)):
-    # Estados cuyo nombre != "Bueno"
-    estados_no_ok = db.query(models.CatalogoEstado.id).filter(models.CatalogoEstado.nombre != "Bueno").subquery()
-    detalles = db.query(models.InspeccionDetalle).filter(models.InspeccionDetalle.estado_id.in_(estados_no_ok)).all()
-    salida = []
-    for d in detalles:
-        ref = {}
-        if d.unidad_item:
-            ref = {
-                "ambito": "UNIDAD",
-                "unidad_id": d.unidad_item.unidad_id,
-                "unidad_item_id": d.unidad_item.id,
-                "item_nombre": d.unidad_item.nombre
-            }
-        elif d.zona_item:
-            ref = {
-                "ambito": "ZONA",
-                "zona_id": d.zona_item.zona_id,
-                "zona_item_id": d.zona_item.id,
-                "item_nombre": d.zona_item.nombre
-            }
-        salida.append({
-            "inspeccion_id": d.inspeccion_id,
-            "estado_id": d.estado_id,
-            "observacion": d.observacion,
-            **ref
-        })
-    return {"total": len(salida), "pendientes": salida}
+def listar_pendientes(
+    request: Request,
+    filtros: FiltrosPendientes = Depends(),
+    pagina: ParametrosPagina = Depends(),
+    contar: bool = Query(False, description="Incluir en `total` el número de pendientes que cumplen los filtros (una consulta más)"),
+    db: Session = Depends(get_db_lectura)
+):
+    # `en_pagina` = filas de esta página; `total` solo se calcula con contar=true (si no, null)
+    if formato := formato_columnar(request):
+        return responder_columnar(formato, pendientes_columnar(db, filtros, pagina, contar))
+    # Filas armadas por nosotros (escalares y fechas): sin re-validar ni jsonable_encoder
+    return RespuestaJSON(consultar_pendientes(db, filtros, pagina, contar), headers=VARIA)
+
+# -------------------------
+# RESÚMENES (tablas mantenidas al insertar detalles; no recorren el historial)
+# -------------------------
+@app.get("/api/v1/reportes/resumen", response_model=schemas.ResumenGeneralOut, tags=["Reportes"])
+def obtener_resumen(db: Session = Depends(get_db_lectura)):
+    return resumen_general(db)
+
+@app.get("/api/v1/reportes/resumen/unidades", response_model=List[schemas.ResumenUnidadOut], tags=["Reportes"])
+def obtener_resumen_unidades(
+    torre: Optional[str] = None,
+    piso: Optional[int] = None,
+    severidad_min: Optional[int] = Query(None, ge=1),
+    db: Session = Depends(get_db_lectura)
+):
+    return resumen_unidades(db, torre, piso, severidad_min)
+
+@app.get("/api/v1/reportes/resumen/zonas", response_model=List[schemas.ResumenZonaOut], tags=["Reportes"])
+def obtener_resumen_zonas(
+    zona_id: Optional[int] = None,
+    severidad_min: Optional[int] = Query(None, ge=1, description="p.ej. la severidad de 'No operativo' para zonas con items fuera de servicio"),
+    db: Session = Depends(get_db_lectura)
+):
+    return resumen_zonas(db, zona_id, severidad_min)
+
+# -------------------------
+# BÚSQUEDA (FTS5: nombres de items, textos de checklist y observaciones)
+# -------------------------
+@app.get("/api/v1/buscar", response_model=schemas.BusquedaOut, tags=["Búsqueda"])
+def buscar_texto(filtros: FiltrosBusqueda = Depends(), db: Session = Depends(get_db_lectura)):
+    return buscar(db, filtros)
+
+# -------------------------
+# SINCRONIZACIÓN DELTA (clientes offline)
+# -------------------------
+@app.get("/api/v1/sync", response_model=schemas.SyncOut, tags=["Sincronización"])
+def sincronizar(params: ParametrosSync = Depends(), db: Session = Depends(get_db_lectura)):
+    return RespuestaJSON(cambios_desde(db, params))
+
+@app.post("/api/v1/sync/inspecciones", response_model=schemas.SyncPushOut, tags=["Sincronización"])
+def sincronizar_inspecciones(payload: schemas.SyncPush, db: Session = Depends(get_db)):
+    return recibir_inspecciones(db, payload)
+
+# -------------------------
+# EXPORTACIÓN (CSV / NDJSON en streaming, opcionalmente gzip)
+# -------------------------
+@app.get("/api/v1/export/inspecciones", tags=["Exportación"])
+def exportar_historial(filtros: FiltrosExport = Depends()):
+    return exportar_inspecciones(filtros)
+
+# -------------------------
+# TRABAJOS EN SEGUNDO PLANO (exportaciones y reportes pesados)
+# -------------------------
+@app.post("/api/v1/trabajos", response_model=schemas.TrabajoOut, status_code=status.HTTP_202_ACCEPTED, tags=["Trabajos"])
+def crear_trabajo(payload: schemas.TrabajoCreate, response: Response, db: Session = Depends(get_db)):
+    trabajo, reutilizado = enviar(db, payload.tipo, payload.parametros)
+    response.headers["Location"] = f"/api/v1/trabajos/{trabajo.id}"
+    if reutilizado and trabajo.estado == "terminado":
+        response.status_code = status.HTTP_200_OK
+    return trabajo
+
+@app.get("/api/v1/trabajos/{trabajo_id}", response_model=schemas.TrabajoOut, tags=["Trabajos"])
+def obtener_trabajo(trabajo_id: str, db: Session = Depends(get_db_lectura)):
+    trabajo = db.get(models.Trabajo, trabajo_id)
+    if not trabajo:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Trabajo no encontrado")
+    return trabajo
+
+@app.get("/api/v1/trabajos/{trabajo_id}/resultado", tags=["Trabajos"])
+def descargar_trabajo(trabajo_id: str, db: Session = Depends(get_db_lectura)):
+    trabajo = db.get(models.Trabajo, trabajo_id)
+    if not trabajo:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Trabajo no encontrado")
+    ruta = resultado(trabajo)
+    return FileResponse(ruta, media_type=trabajo.media_type, filename=f"{trabajo.tipo}-{trabajo.id}{os.path.splitext(ruta)[1]}")
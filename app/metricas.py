@@ -0,0 +1,236 @@
+import asyncio
+import contextvars
+import logging
+import re
+import threading
+import time
+from collections import Counter, defaultdict
+from functools import wraps
+from typing import Callable, Dict, Optional, Tuple
+
+from fastapi.routing import APIRoute
+from sqlalchemy import event
+
+from .config import settings
+
+logger = logging.getLogger(__name__)
+
+# -------------------------
+# Estadísticas de la solicitud en curso
+# -------------------------
+class EstadisticasSolicitud:
+    def __init__(self):
+        self.consultas = 0
+        self.tiempo_db = 0.0
+        self.tiempo_endpoint = 0.0
+        self.tiempo_handler = 0.0
+        self.formas: Counter = Counter()
+
+    @property
+    def tiempo_serializacion(self) -> float:
+        # El handler de FastAPI = dependencias + endpoint + validación/serialización de la respuesta
+        return max(self.tiempo_handler - self.tiempo_endpoint, 0.0)
+
+_solicitud: contextvars.ContextVar[Optional[EstadisticasSolicitud]] = contextvars.ContextVar("solicitud_metricas", default=None)
+
+_IN_LISTA = re.compile(r"\((?:\s*\?\s*,)+\s*\?\s*\)")
+_ESPACIOS = re.compile(r"\s+")
+
+def forma_sentencia(sentencia: str) -> str:
+    # Misma forma aunque cambien los parámetros o el largo de las listas IN
+    return _IN_LISTA.sub("(?)", _ESPACIOS.sub(" ", sentencia).strip())
+
+# -------------------------
+# Hooks de SQLAlchemy
+# -------------------------
+def _antes(conn, cursor, sentencia, parametros, context, executemany):
+    # En el contexto de la sentencia: si falla no hay after_cursor_execute que desapilar
+    context._metricas_inicio = time.perf_counter()
+
+def _despues(conn, cursor, sentencia, parametros, context, executemany):
+    inicio = getattr(context, "_metricas_inicio", None)
+    stats = _solicitud.get()
+    if stats is not None and inicio is not None:
+        stats.consultas += 1
+        stats.tiempo_db += time.perf_counter() - inicio
+        stats.formas[forma_sentencia(sentencia)] += 1
+
+def instrumentar_engine(engine):
+    if not event.contains(engine, "before_cursor_execute", _antes):
+        event.listen(engine, "before_cursor_execute", _antes)
+        event.listen(engine, "after_cursor_execute", _despues)
+
+# -------------------------
+# Registro Prometheus (formato de texto 0.0.4, sin dependencias externas)
+# -------------------------
+BUCKETS_SEGUNDOS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+BUCKETS_CONSULTAS = (1, 2, 3, 5, 10, 20, 50, 100, 250)
+
+Etiquetas = Tuple[Tuple[str, str], ...]
+
+class _Histograma:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.conteos = [0] * len(buckets)
+        self.suma = 0.0
+        self.total = 0
+
+    def observar(self, valor: float):
+        self.suma += valor
+        self.total += 1
+        for i, limite in enumerate(self.buckets):
+            if valor <= limite:
+                self.conteos[i] += 1
+
+class Registro:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._contadores: Dict[str, Dict[Etiquetas, float]] = defaultdict(dict)
+        self._histogramas: Dict[str, Dict[Etiquetas, _Histograma]] = defaultdict(dict)
+        self._buckets: Dict[str, tuple] = {}
+        self._ayuda: Dict[str, Tuple[str, str]] = {}
+
+    def contador(self, nombre: str, ayuda: str):
+        self._ayuda[nombre] = ("counter", ayuda)
+
+    def histograma(self, nombre: str, ayuda: str, buckets=BUCKETS_SEGUNDOS):
+        self._ayuda[nombre] = ("histogram", ayuda)
+        self._buckets[nombre] = buckets
+
+    def incrementar(self, nombre: str, valor: float = 1.0, **etiquetas):
+        clave = tuple(sorted(etiquetas.items()))
+        with self._lock:
+            serie = self._contadores[nombre]
+            serie[clave] = serie.get(clave, 0.0) + valor
+
+    def observar(self, nombre: str, valor: float, **etiquetas):
+        clave = tuple(sorted(etiquetas.items()))
+        with self._lock:
+            serie = self._histogramas[nombre]
+            if clave not in serie:
+                serie[clave] = _Histograma(self._buckets[nombre])
+            serie[clave].observar(valor)
+
+    def exponer(self) -> str:
+        lineas = []
+        with self._lock:
+            for nombre, (tipo, ayuda) in self._ayuda.items():
+                lineas.append(f"# HELP {nombre} {ayuda}")
+                lineas.append(f"# TYPE {nombre} {tipo}")
+                if tipo == "counter":
+                    for clave, valor in self._contadores[nombre].items():
+                        lineas.append(f"{nombre}{_etiquetas(clave)} {valor}")
+                    continue
+                for clave, h in self._histogramas[nombre].items():
+                    for limite, conteo in zip(h.buckets, h.conteos):
+                        lineas.append(f"{nombre}_bucket{_etiquetas(clave + (('le', str(limite)),))} {conteo}")
+                    lineas.append(f"{nombre}_bucket{_etiquetas(clave + (('le', '+Inf'),))} {h.total}")
+                    lineas.append(f"{nombre}_sum{_etiquetas(clave)} {h.suma}")
+                    lineas.append(f"{nombre}_count{_etiquetas(clave)} {h.total}")
+        return "\n".join(lineas) + "\n"
+
+def _etiquetas(clave: Etiquetas) -> str:
+    if not clave:
+        return ""
+    pares = ",".join('%s="%s"' % (k, str(v).replace("\\", "\\\\").replace('"', '\\"')) for k, v in clave)
+    return "{" + pares + "}"
+
+registro = Registro()
+registro.contador("http_solicitudes_total", "Solicitudes HTTP atendidas")
+registro.contador("db_consultas_total", "Sentencias SQL ejecutadas")
+registro.contador("n_mas_1_detectados_total", "Solicitudes con una misma forma de sentencia repetida sobre el umbral")
+registro.histograma("http_duracion_segundos", "Duración de la solicitud hasta el inicio de la respuesta")
+registro.histograma("db_tiempo_segundos", "Tiempo en base de datos por solicitud")
+registro.histograma("serializacion_segundos", "Tiempo de validación/serialización de la respuesta")
+registro.histograma("db_consultas_por_solicitud", "Sentencias SQL por solicitud", BUCKETS_CONSULTAS)
+
+# -------------------------
+# Ruta instrumentada: separa el tiempo del endpoint del de serialización
+# -------------------------
+def _cronometrar(endpoint: Callable) -> Callable:
+    if asyncio.iscoroutinefunction(endpoint):
+        @wraps(endpoint)
+        async def envoltura(*args, **kwargs):
+            inicio = time.perf_counter()
+            try:
+                return await endpoint(*args, **kwargs)
+            finally:
+                if (stats := _solicitud.get()) is not None:
+                    stats.tiempo_endpoint += time.perf_counter() - inicio
+    else:
+        @wraps(endpoint)
+        def envoltura(*args, **kwargs):
+            inicio = time.perf_counter()
+            try:
+                return endpoint(*args, **kwargs)
+            finally:
+                if (stats := _solicitud.get()) is not None:
+                    stats.tiempo_endpoint += time.perf_counter() - inicio
+    return envoltura
+
+class RutaInstrumentada(APIRoute):
+    def __init__(self, path: str, endpoint: Callable, **kwargs):
+        super().__init__(path, _cronometrar(endpoint), **kwargs)
+
+    def get_route_handler(self):
+        handler = super().get_route_handler()
+
+        async def handler_instrumentado(request):
+            inicio = time.perf_counter()
+            try:
+                return await handler(request)
+            finally:
+                if (stats := _solicitud.get()) is not None:
+                    stats.tiempo_handler += time.perf_counter() - inicio
+
+        return handler_instrumentado
+
+# -------------------------
+# Middleware ASGI: contexto por solicitud, Server-Timing, detector N+1 y registro
+# -------------------------
+class MiddlewareMetricas:
+    def __init__(self, app, umbral_n_mas_1: int = None):
+        self.app = app
+        self.umbral = umbral_n_mas_1 if umbral_n_mas_1 is not None else settings.umbral_n_mas_1
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        stats = EstadisticasSolicitud()
+        token = _solicitud.set(stats)
+        inicio = time.perf_counter()
+        estado = {"codigo": 500, "duracion": None}
+
+        async def send_instrumentado(mensaje):
+            if mensaje["type"] == "http.response.start":
+                estado["codigo"] = mensaje["status"]
+                estado["duracion"] = time.perf_counter() - inicio
+                valor = "db;dur=%.2f;desc=\"%d consultas\", ser;dur=%.2f, app;dur=%.2f" % (
+                    stats.tiempo_db * 1000, stats.consultas, stats.tiempo_serializacion * 1000, estado["duracion"] * 1000,
+                )
+                mensaje = {**mensaje, "headers": [*mensaje.get("headers", []), (b"server-timing", valor.encode())]}
+            await send(mensaje)
+
+        try:
+            await self.app(scope, receive, send_instrumentado)
+        finally:
+            _solicitud.reset(token)
+            self._registrar(scope, stats, estado, inicio)
+
+    def _registrar(self, scope, stats: EstadisticasSolicitud, estado: dict, inicio: float):
+        ruta = getattr(scope.get("route"), "path", None) or "sin_ruta"
+        metodo = scope.get("method", "")
+        duracion = estado["duracion"] if estado["duracion"] is not None else time.perf_counter() - inicio
+        registro.incrementar("http_solicitudes_total", metodo=metodo, ruta=ruta, estado=estado["codigo"])
+        registro.incrementar("db_consultas_total", stats.consultas, ruta=ruta)
+        registro.observar("http_duracion_segundos", duracion, metodo=metodo, ruta=ruta)
+        registro.observar("db_tiempo_segundos", stats.tiempo_db, ruta=ruta)
+        registro.observar("serializacion_segundos", stats.tiempo_serializacion, ruta=ruta)
+        registro.observar("db_consultas_por_solicitud", stats.consultas, ruta=ruta)
+
+        repetidas = [(forma, n) for forma, n in stats.formas.items() if n > self.umbral]
+        if repetidas:
+            registro.incrementar("n_mas_1_detectados_total", ruta=ruta)
+            for forma, n in repetidas:
+                logger.warning("Posible N+1 en %s %s: %d ejecuciones de %s", metodo, ruta, n, forma[:200])
@@ -0,0 +1,349 @@
+import argparse
+import logging
+import re
+import sys
+from datetime import datetime
+from typing import Callable, List, Tuple
+
+from sqlalchemy import UniqueConstraint, event, inspect, text
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.exc import IntegrityError
+
+from . import models  # noqa: F401  (registra las tablas en Base.metadata)
+from .database import Base
+
+logger = logging.getLogger(__name__)
+
+# -------------------------
+# Migraciones versionadas
+# -------------------------
+def _m001_tablas(conn: Connection):
+    # Crea solo las tablas que falten; no toca las existentes
+    Base.metadata.create_all(bind=conn, checkfirst=True)
+
+def _columnas(conn: Connection, tabla: str) -> set:
+    return {c["name"] for c in inspect(conn).get_columns(tabla)}
+
+def _m002_columnas_modelo(conn: Connection):
+    # Agrega las columnas del modelo que falten (p.ej. unidad_items.categoria_id/estado_id)
+    insp = inspect(conn)
+    for tabla in Base.metadata.sorted_tables:
+        if not insp.has_table(tabla.name):
+            continue
+        existentes = _columnas(conn, tabla.name)
+        for col in tabla.columns:
+            if col.name in existentes:
+                continue
+            tipo = col.type.compile(dialect=conn.dialect)
+            # ALTER TABLE ADD COLUMN no admite NOT NULL sin default: se agrega como nullable
+            conn.exec_driver_sql(f'ALTER TABLE "{tabla.name}" ADD COLUMN "{col.name}" {tipo}')
+            logger.info("Columna agregada: %s.%s", tabla.name, col.name)
+
+    # Datos heredados: categoria/estado como texto -> ids de catálogo
+    for tabla in ("unidad_items", "zona_items"):
+        cols = _columnas(conn, tabla)
+        if "estado" in cols:
+            conn.exec_driver_sql(
+                f"UPDATE {tabla} SET estado_id = (SELECT id FROM catalogo_estado WHERE nombre = {tabla}.estado) "
+                f"WHERE estado_id IS NULL AND estado IS NOT NULL"
+            )
+        if "categoria" in cols:
+            conn.exec_driver_sql(
+                f"UPDATE {tabla} SET categoria_id = (SELECT id FROM catalogo_categoria WHERE nombre = {tabla}.categoria) "
+                f"WHERE categoria_id IS NULL AND categoria IS NOT NULL"
+            )
+    if "categoria" in _columnas(conn, "zonas_comunes"):
+        conn.exec_driver_sql("UPDATE zonas_comunes SET tipo = categoria WHERE tipo IS NULL AND categoria IS NOT NULL")
+
+def _m003_indices(conn: Connection):
+    # Índices declarados en el modelo (filtros calientes)
+    for tabla in Base.metadata.sorted_tables:
+        for indice in tabla.indexes:
+            indice.create(bind=conn, checkfirst=True)
+
+def _m004_resumenes(conn: Connection):
+    from .resumenes import reconstruir
+
+    for modelo in (models.ResumenUnidad, models.ResumenZona):
+        modelo.__table__.create(bind=conn, checkfirst=True)
+    reconstruir(conn)
+
+def _m005_estado_items(conn: Connection):
+    from .estado_items import backfill
+
+    # unidad_items/zona_items: ultima_inspeccion_id/_fecha, ultimo_detalle_id e índice de estado_id
+    _m002_columnas_modelo(conn)
+    _m003_indices(conn)
+    backfill(conn)
+
+def _m006_busqueda(conn: Connection):
+    from .busqueda import crear_indice, reconstruir_indice
+
+    crear_indice(conn)
+    reconstruir_indice(conn)
+
+def _m007_versiones(conn: Connection):
+    from .versiones import crear_triggers
+
+    # unidades/zonas_comunes/inspecciones: version y actualizado_en, con triggers que las incrementan
+    _m002_columnas_modelo(conn)
+    crear_triggers(conn)
+
+def _m008_trabajos(conn: Connection):
+    models.Trabajo.__table__.create(bind=conn, checkfirst=True)
+
+def _m009_cambios(conn: Connection):
+    from .sincronizacion import crear_triggers, registrar_existentes
+
+    # inspecciones.clave_cliente (+ índice único), tabla cambios y sus triggers
+    _m002_columnas_modelo(conn)
+    _m003_indices(conn)
+    models.Cambio.__table__.create(bind=conn, checkfirst=True)
+    crear_triggers(conn)
+    registrar_existentes(conn)
+
+def _m010_indices_archivo(conn: Connection):
+    # ultima_inspeccion_id: sin índice, archivar una inspección recorre todos los items por la FK
+    _m003_indices(conn)
+
+def _unicas_existentes(insp, tabla: str) -> set:
+    # Por columnas: SQLite nombra los UNIQUE en línea sqlite_autoindex_*
+    unicas = {tuple(u["column_names"]) for u in insp.get_unique_constraints(tabla)}
+    return unicas | {tuple(i["column_names"]) for i in insp.get_indexes(tabla) if i["unique"]}
+
+def _unicas_modelo(tabla) -> List[UniqueConstraint]:
+    return [c for c in tabla.constraints if isinstance(c, UniqueConstraint) and len(c.columns)]
+
+def _deduplicar_unidades(conn: Connection):
+    # Se conserva la de menor id; las referencias pasan a ella antes de borrar las demás
+    duplicadas = conn.exec_driver_sql(
+        "SELECT id, conservar FROM (SELECT id, MIN(id) OVER (PARTITION BY torre, piso, numero) AS conservar FROM unidades) "
+        "WHERE id <> conservar"
+    ).all()
+    if not duplicadas:
+        return
+    pares = [{"id": i, "conservar": c} for i, c in duplicadas]
+    for tabla in Base.metadata.sorted_tables:
+        for fk in tabla.foreign_keys:
+            if fk.column.table.name == "unidades" and fk.column.name == "id" and inspect(conn).has_table(tabla.name):
+                conn.execute(text(f'UPDATE "{tabla.name}" SET "{fk.parent.name}" = :conservar WHERE "{fk.parent.name}" = :id'), pares)
+    conn.execute(text("DELETE FROM unidades WHERE id = :id"), pares)
+    logger.warning("Unidades duplicadas fusionadas: %s", len(pares))
+
+def _m011_restricciones_unicas(conn: Connection):
+    # SQLite no agrega UNIQUE con ALTER TABLE: las que falten se crean como índices únicos
+    _deduplicar_unidades(conn)
+    insp = inspect(conn)
+    for tabla in Base.metadata.sorted_tables:
+        if not insp.has_table(tabla.name):
+            continue
+        existentes = _unicas_existentes(insp, tabla.name)
+        for unica in _unicas_modelo(tabla):
+            columnas = tuple(c.name for c in unica.columns)
+            if columnas in existentes:
+                continue
+            nombre = unica.name or f"uq_{tabla.name}_{'_'.join(columnas)}"
+            lista = ", ".join(f'"{c}"' for c in columnas)
+            try:
+                with conn.begin_nested():
+                    conn.exec_driver_sql(f'CREATE UNIQUE INDEX "{nombre}" ON "{tabla.name}" ({lista})')
+            except IntegrityError:
+                # Datos repetidos sin regla de fusión: queda reportado como drift
+                logger.warning("No se pudo crear %s: hay filas repetidas en %s%s", nombre, tabla.name, columnas)
+            else:
+                logger.info("Índice único creado: %s", nombre)
+
+def _m012_borrados_archivo(conn: Connection):
+    from . import archivo, busqueda, sincronizacion, versiones
+
+    # Los triggers de borrado de inspecciones/detalles se recrean con la condición de archivo.SIN_MOVER
+    archivo.crear_marca(conn)
+    for trigger in ("inspecciones_cambios_ad", "inspeccion_detalles_cambios_ad",
+                    "inspeccion_detalles_busqueda_ad", "inspeccion_detalles_version_ad"):
+        conn.exec_driver_sql(f"DROP TRIGGER IF EXISTS {trigger}")
+    busqueda.crear_indice(conn)
+    versiones.crear_triggers(conn)
+    sincronizacion.crear_triggers(conn)
+
+def _m013_cambios_solo_datos(conn: Connection):
+    from .sincronizacion import TABLAS_SYNC, crear_triggers
+
+    # Los triggers de UPDATE se recrean con UPDATE OF <columnas de datos> (sin version/actualizado_en)
+    for tabla in TABLAS_SYNC:
+        conn.exec_driver_sql(f"DROP TRIGGER IF EXISTS {tabla}_cambios_au")
+    crear_triggers(conn)
+
+MIGRACIONES: List[Tuple[int, str, Callable[[Connection], None]]] = [
+    (1, "tablas iniciales", _m001_tablas),
+    (2, "columnas faltantes del modelo", _m002_columnas_modelo),
+    (3, "índices de filtros calientes", _m003_indices),
+    (4, "resúmenes de estado por torre/piso y zona", _m004_resumenes),
+    (5, "estado actual proyectado en los items", _m005_estado_items),
+    (6, "índice de búsqueda FTS5 con triggers", _m006_busqueda),
+    (7, "versiones de unidades, zonas e inspecciones (ETag)", _m007_versiones),
+    (8, "cola persistente de trabajos en segundo plano", _m008_trabajos),
+    (9, "registro de cambios para sincronización delta", _m009_cambios),
+    (10, "índices de ultima_inspeccion_id para archivar", _m010_indices_archivo),
+    (11, "restricciones únicas faltantes (uq_unidad_ref)", _m011_restricciones_unicas),
+    (12, "archivar no cuenta como borrado en sync, búsqueda ni versiones", _m012_borrados_archivo),
+    (13, "sync: subir la versión no reenvía la fila padre", _m013_cambios_solo_datos),
+]
+VERSION_ACTUAL = MIGRACIONES[-1][0]
+
+def _asegurar_tabla_version(conn: Connection):
+    conn.exec_driver_sql(
+        "CREATE TABLE IF NOT EXISTS schema_version ("
+        "version INTEGER PRIMARY KEY, nombre VARCHAR NOT NULL, aplicada_en DATETIME NOT NULL)"
+    )
+
+def version_actual(conn: Connection) -> int:
+    if not inspect(conn).has_table("schema_version"):
+        return 0
+    return conn.exec_driver_sql("SELECT COALESCE(MAX(version), 0) FROM schema_version").scalar()
+
+def _tipo(tipo, dialecto) -> str:
+    # Nombre del tipo tal como lo guarda la BD (String -> VARCHAR, Enum -> VARCHAR(n), ...)
+    return tipo.compile(dialect=dialecto).upper()
+
+def detectar_drift(conn: Connection) -> List[str]:
+    """Compara el modelo con el esquema real sin modificar nada."""
+    insp = inspect(conn)
+    hallazgos = []
+    for tabla in Base.metadata.sorted_tables:
+        if not insp.has_table(tabla.name):
+            hallazgos.append(f"Falta la tabla {tabla.name}")
+            continue
+        reales = {c["name"]: c for c in insp.get_columns(tabla.name)}
+        for col in tabla.columns:
+            if col.name not in reales:
+                hallazgos.append(f"Falta la columna {tabla.name}.{col.name}")
+                continue
+            esperado, real = _tipo(col.type, conn.dialect), _tipo(reales[col.name]["type"], conn.dialect)
+            if esperado != real:
+                hallazgos.append(f"Tipo distinto en {tabla.name}.{col.name}: {real} (modelo: {esperado})")
+        sobrantes = set(reales) - {c.name for c in tabla.columns}
+        hallazgos += [f"Columna fuera del modelo: {tabla.name}.{c}" for c in sorted(sobrantes)]
+        indices = {i["name"] for i in insp.get_indexes(tabla.name)}
+        hallazgos += [f"Falta el índice {i.name}" for i in tabla.indexes if i.name not in indices]
+        unicas = _unicas_existentes(insp, tabla.name)
+        for unica in _unicas_modelo(tabla):
+            columnas = tuple(c.name for c in unica.columns)
+            if columnas not in unicas:
+                hallazgos.append(f"Falta la restricción única {tabla.name}({', '.join(columnas)}) {unica.name or ''}".rstrip())
+    return hallazgos
+
+def migrar(engine: Engine) -> int:
+    """Aplica las migraciones pendientes, cada una en su propia transacción. Devuelve la versión final."""
+    with engine.begin() as conn:
+        _asegurar_tabla_version(conn)
+        version = version_actual(conn)
+    for numero, nombre, aplicar in MIGRACIONES:
+        if numero <= version:
+            continue
+        try:
+            with engine.begin() as conn:
+                # Registrar primero toma el lock de escritura: si otro worker ya la aplicó, PK duplicada
+                conn.execute(
+                    text("INSERT INTO schema_version (version, nombre, aplicada_en) VALUES (:v, :n, :f)"),
+                    {"v": numero, "n": nombre, "f": datetime.utcnow()},
+                )
+                aplicar(conn)
+        except IntegrityError:
+            logger.info("Migración %s ya aplicada por otro proceso", numero)
+        else:
+            logger.info("Migración %s aplicada: %s", numero, nombre)
+        version = numero
+    with engine.connect() as conn:
+        for hallazgo in detectar_drift(conn):
+            logger.warning("Drift de esquema: %s", hallazgo)
+    return version
+
+# -------------------------
+# Asesor de índices (EXPLAIN QUERY PLAN)
+# -------------------------
+_SCAN = re.compile(r"^SCAN (\w+)(?: AS \w+)?$")
+
+def explicar(conn: Connection, sentencia: str, parametros=()) -> List[str]:
+    filas = conn.exec_driver_sql("EXPLAIN QUERY PLAN " + sentencia, parametros).all()
+    return [f[-1] for f in filas]
+
+def hallazgos_plan(plan: List[str]) -> List[str]:
+    # SCAN <tabla> sin índice = recorrido completo de la tabla
+    return [linea for linea in plan if _SCAN.match(linea.strip())]
+
+def capturar_sentencias_rutas(app, engines, id_muestra: int = 1) -> List[Tuple[str, str, tuple]]:
+    """Ejecuta en proceso cada ruta GET de `app` y registra las sentencias SQL que emite."""
+    from fastapi.routing import APIRoute
+    from fastapi.testclient import TestClient
+
+    capturadas = []
+    ruta_actual = {"valor": None}
+
+    def registrar(conn, cursor, sentencia, parametros, context, executemany):
+        if not executemany and sentencia.lstrip().upper().startswith("SELECT"):
+            capturadas.append((ruta_actual["valor"], sentencia, tuple(parametros or ())))
+
+    for eng in engines:
+        event.listen(eng, "before_cursor_execute", registrar)
+    try:
+        with TestClient(app) as cliente:
+            for ruta in app.routes:
+                if not isinstance(ruta, APIRoute) or "GET" not in ruta.methods:
+                    continue
+                path = re.sub(r"\{[^}]+\}", str(id_muestra), ruta.path)
+                ruta_actual["valor"] = ruta.path
+                cliente.get(path)
+    finally:
+        for eng in engines:
+            event.remove(eng, "before_cursor_execute", registrar)
+    return capturadas
+
+def asesorar(app, engine: Engine, engines_captura=None) -> List[dict]:
+    informe, vistas = [], set()
+    capturadas = capturar_sentencias_rutas(app, engines_captura or [engine])
+    with engine.connect() as conn:
+        for ruta, sentencia, parametros in capturadas:
+            if sentencia in vistas:
+                continue
+            vistas.add(sentencia)
+            scans = hallazgos_plan(explicar(conn, sentencia, parametros))
+            if scans:
+                informe.append({"ruta": ruta, "sentencia": " ".join(sentencia.split()), "scans": scans})
+    return informe
+
+# -------------------------
+# CLI: python -m app.migraciones [--drift] [--asesor]
+# -------------------------
+def main(argv=None):
+    from .database import engine, engine_lectura
+
+    parser = argparse.ArgumentParser(description="Migraciones de esquema y asesor de índices.")
+    parser.add_argument("--drift", action="store_true", help="Solo reporta diferencias modelo/BD, sin migrar")
+    parser.add_argument("--asesor", action="store_true", help="Migra y luego reporta full scans de las rutas GET")
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format="%(levelname)s %(message)s")
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+
+    if args.drift:
+        with engine.connect() as conn:
+            print(f"Versión de esquema: {version_actual(conn)} (actual: {VERSION_ACTUAL})")
+            hallazgos = detectar_drift(conn)
+        for h in hallazgos:
+            print(" -", h)
+        return 1 if hallazgos else 0
+
+    print(f"Esquema en versión {migrar(engine)}")
+    if args.asesor:
+        from .main import app
+
+        informe = asesorar(app, engine, [e for e in (engine, engine_lectura) if e is not None])
+        for h in informe:
+            print(f"\n[{h['ruta']}] {h['sentencia'][:160]}")
+            for s in h["scans"]:
+                print("   ", s)
+        if not informe:
+            print("Sin full scans en las consultas de las rutas GET.")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
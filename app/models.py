@@ -41,6 +41,9 @@ class Unidad(Base):
     torre = Column(String, nullable=False)
     piso = Column(Integer, nullable=False)
     numero = Column(String, nullable=False)
+    # Versión para ETag/Last-Modified; la incrementan los triggers de app/versiones.py
+    version = Column(Integer, nullable=False, default=1)
+    actualizado_en = Column(DateTime, nullable=False, default=datetime.utcnow)
 
     __table_args__ = (UniqueConstraint("torre", "piso", "numero", name="uq_unidad_ref"),)
 
@@ -52,8 +55,12 @@ class UnidadItem(Base):
     unidad_id = Column(Integer, ForeignKey("unidades.id", ondelete="CASCADE"), nullable=False, index=True)
     nombre = Column(String, nullable=False)  # "Cocina", "Baño", "Kit limpieza"
     categoria_id = Column(Integer, ForeignKey("catalogo_categoria.id"), nullable=True)
-    estado_id = Column(Integer, ForeignKey("catalogo_estado.id"), nullable=True)
+    estado_id = Column(Integer, ForeignKey("catalogo_estado.id"), nullable=True, index=True)
     observacion = Column(String, nullable=True)
+    # Estado actual proyectado desde la inspección más reciente (ver app/estado_items.py)
+    ultima_inspeccion_id = Column(Integer, ForeignKey("inspecciones.id"), nullable=True, index=True)
+    ultima_inspeccion_fecha = Column(DateTime, nullable=True)
+    ultimo_detalle_id = Column(Integer, nullable=True)
 
     unidad = relationship("Unidad", back_populates="items")
     categoria = relationship("CatalogoCategoria")
@@ -65,6 +72,9 @@ class ZonaComun(Base):
     nombre = Column(String, nullable=False)     # "Terraza BBQ", "Sala de juegos"
     ubicacion = Column(String, nullable=True)   # "Piso 15"
     tipo = Column(String, nullable=True)        # "Recreación", "Servicios"
+    # Versión para ETag/Last-Modified; la incrementan los triggers de app/versiones.py
+    version = Column(Integer, nullable=False, default=1)
+    actualizado_en = Column(DateTime, nullable=False, default=datetime.utcnow)
     items = relationship("ZonaItem", back_populates="zona", cascade="all, delete-orphan")
 
 class ZonaItem(Base):
@@ -73,8 +83,12 @@ class ZonaItem(Base):
     zona_id = Column(Integer, ForeignKey("zonas_comunes.id", ondelete="CASCADE"), nullable=False, index=True)
     nombre = Column(String, nullable=False)     # "BBQ", "Caneca", "Futbolito"
     categoria_id = Column(Integer, ForeignKey("catalogo_categoria.id"), nullable=True)
-    estado_id = Column(Integer, ForeignKey("catalogo_estado.id"), nullable=True)
+    estado_id = Column(Integer, ForeignKey("catalogo_estado.id"), nullable=True, index=True)
     observacion = Column(String, nullable=True)
+    # Estado actual proyectado desde la inspección más reciente (ver app/estado_items.py)
+    ultima_inspeccion_id = Column(Integer, ForeignKey("inspecciones.id"), nullable=True, index=True)
+    ultima_inspeccion_fecha = Column(DateTime, nullable=True)
+    ultimo_detalle_id = Column(Integer, nullable=True)
 
     zona = relationship("ZonaComun", back_populates="items")
     categoria = relationship("CatalogoCategoria")
@@ -115,13 +129,18 @@ class ChecklistItem(Base):
 class Inspeccion(Base):
     __tablename__ = "inspecciones"
     id = Column(Integer, primary_key=True)
-    fecha = Column(DateTime, default=datetime.utcnow, nullable=False)
+    fecha = Column(DateTime, default=datetime.utcnow, nullable=False, index=True)
     inspector = Column(String, nullable=False)
     checklist_id = Column(Integer, ForeignKey("checklists.id"), nullable=False)
 
     # Polimorfismo simple: una inspección es sobre UNA unidad O UNA zona
-    unidad_id = Column(Integer, ForeignKey("unidades.id"), nullable=True)
-    zona_id = Column(Integer, ForeignKey("zonas_comunes.id"), nullable=True)
+    unidad_id = Column(Integer, ForeignKey("unidades.id"), nullable=True, index=True)
+    zona_id = Column(Integer, ForeignKey("zonas_comunes.id"), nullable=True, index=True)
+    # Clave generada por el cliente (sincronización offline): reenviar no duplica la inspección
+    clave_cliente = Column(String, nullable=True, unique=True, index=True)
+    # Versión para ETag/Last-Modified; la incrementan los triggers de app/versiones.py
+    version = Column(Integer, nullable=False, default=1)
+    actualizado_en = Column(DateTime, nullable=False, default=datetime.utcnow)
 
     checklist = relationship("Checklist")
     detalles = relationship("InspeccionDetalle", back_populates="inspeccion", cascade="all, delete-orphan")
@@ -129,12 +148,12 @@ class Inspeccion(Base):
 class InspeccionDetalle(Base):
     __tablename__ = "inspeccion_detalles"
     id = Column(Integer, primary_key=True)
-    inspeccion_id = Column(Integer, ForeignKey("inspecciones.id", ondelete="CASCADE"), nullable=False)
+    inspeccion_id = Column(Integer, ForeignKey("inspecciones.id", ondelete="CASCADE"), nullable=False, index=True)
     # El detalle refiere a UN item de UNIDAD o de ZONA (no ambos)
-    unidad_item_id = Column(Integer, ForeignKey("unidad_items.id"), nullable=True)
-    zona_item_id = Column(Integer, ForeignKey("zona_items.id"), nullable=True)
+    unidad_item_id = Column(Integer, ForeignKey("unidad_items.id"), nullable=True, index=True)
+    zona_item_id = Column(Integer, ForeignKey("zona_items.id"), nullable=True, index=True)
 
-    estado_id = Column(Integer, ForeignKey("catalogo_estado.id"), nullable=False)  # resultado observado
+    estado_id = Column(Integer, ForeignKey("catalogo_estado.id"), nullable=False, index=True)  # resultado observado
     observacion = Column(Text, nullable=True)
     valor_json = Column(JSON, nullable=True)  # si quieres guardar respuesta compleja
 
@@ -142,3 +161,53 @@ class InspeccionDetalle(Base):
     estado = relationship("CatalogoEstado")
     unidad_item = relationship("UnidadItem")
     zona_item = relationship("ZonaItem")
+
+# -------------------------
+# RESÚMENES (estado actual de los items, mantenidos al insertar detalles; ver app/resumenes.py)
+# -------------------------
+class ResumenUnidad(Base):
+    __tablename__ = "resumen_unidades"
+    torre = Column(String, primary_key=True)
+    piso = Column(Integer, primary_key=True)
+    estado_id = Column(Integer, ForeignKey("catalogo_estado.id"), primary_key=True)
+    items = Column(Integer, nullable=False, default=0)  # items cuya última inspección dio este estado
+
+class ResumenZona(Base):
+    __tablename__ = "resumen_zonas"
+    zona_id = Column(Integer, ForeignKey("zonas_comunes.id", ondelete="CASCADE"), primary_key=True)
+    estado_id = Column(Integer, ForeignKey("catalogo_estado.id"), primary_key=True)
+    items = Column(Integer, nullable=False, default=0)
+
+# -------------------------
+# TRABAJOS EN SEGUNDO PLANO (ver app/trabajos.py)
+# -------------------------
+class Trabajo(Base):
+    __tablename__ = "trabajos"
+    id = Column(String, primary_key=True)  # uuid4 hex
+    tipo = Column(String, nullable=False)
+    parametros = Column(JSON, nullable=False)
+    clave = Column(String, nullable=False, index=True)  # hash de (tipo, parámetros): reutilizar resultados
+    estado = Column(String, nullable=False, default="pendiente", index=True)  # pendiente, en_curso, terminado, error, expirado
+    propietario = Column(Integer, nullable=True)  # pid del servidor que lo encoló
+    creado_en = Column(DateTime, nullable=False, default=datetime.utcnow)
+    iniciado_en = Column(DateTime, nullable=True)
+    terminado_en = Column(DateTime, nullable=True)
+    expira_en = Column(DateTime, nullable=True)
+    archivo = Column(String, nullable=True)
+    media_type = Column(String, nullable=True)
+    filas = Column(Integer, nullable=True)
+    bytes = Column(Integer, nullable=True)
+    error = Column(Text, nullable=True)
+
+# -------------------------
+# REGISTRO DE CAMBIOS (sincronización delta, ver app/sincronizacion.py)
+# -------------------------
+class Cambio(Base):
+    __tablename__ = "cambios"
+    seq = Column(Integer, primary_key=True)  # AUTOINCREMENT: nunca se reutiliza
+    tabla = Column(String, nullable=False)
+    entidad_id = Column(Integer, nullable=False)
+    operacion = Column(String, nullable=False)  # "upsert" | "delete"
+
+    # Una fila por entidad (compactado): cada escritura la reemplaza con un seq nuevo
+    __table_args__ = (UniqueConstraint("tabla", "entidad_id", name="uq_cambio_entidad"), {"sqlite_autoincrement": True})
@@ -0,0 +1,126 @@
+import base64
+import json
+from typing import Optional, Sequence, Type
+
+from fastapi import HTTPException, Query, Request, status
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel
+from sqlalchemy import tuple_
+
+from .columnar import formato_columnar, responder_columnar, tabla
+from .database import en_sesion_propia
+from .schemas import Pagina
+from .serializacion import RespuestaJSON, a_json, responder, volcar_json
+
+NDJSON = "application/x-ndjson"
+# El formato sale de Accept: toda respuesta de listado lo declara
+VARIA = {"Vary": "Accept"}
+LIMITE_DEFECTO = 100
+LIMITE_MAXIMO = 1000
+LOTE_STREAMING = 500
+
+# -------------------------
+# Cursor opaco (keyset)
+# -------------------------
+def codificar_cursor(valores: Sequence) -> str:
+    crudo = json.dumps(list(valores), separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(crudo).decode().rstrip("=")
+
+def decodificar_cursor(cursor: str, n: int) -> list:
+    try:
+        relleno = "=" * (-len(cursor) % 4)
+        valores = json.loads(base64.urlsafe_b64decode(cursor + relleno))
+    except (ValueError, TypeError):
+        valores = None
+    if not isinstance(valores, list) or len(valores) != n:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Cursor inválido")
+    return valores
+
+class ParametrosPagina:
+    def __init__(
+        self,
+        limit: Optional[int] = Query(None, ge=1, le=LIMITE_MAXIMO),
+        after: Optional[str] = None,
+    ):
+        self.limit = limit
+        self.after = after
+
+def quiere_ndjson(request: Request) -> bool:
+    return NDJSON in request.headers.get("accept", "")
+
+# -------------------------
+# Paginación y streaming
+# -------------------------
+def aplicar_keyset(q, columnas: Sequence, after: Optional[str]):
+    # Orden estable por las columnas del keyset (la última debe ser única, p.ej. id)
+    if after:
+        valores = decodificar_cursor(after, len(columnas))
+        if len(columnas) == 1:
+            q = q.filter(columnas[0] > valores[0])
+        else:
+            q = q.filter(tuple_(*columnas) > tuple_(*valores))
+    return q.order_by(*columnas)
+
+def _valores_keyset(fila, columnas: Sequence) -> list:
+    return [getattr(fila, c.key) for c in columnas]
+
+def paginar(q, columnas: Sequence, params: ParametrosPagina) -> dict:
+    limite = params.limit or LIMITE_DEFECTO
+    filas = aplicar_keyset(q, columnas, params.after).limit(limite + 1).all()
+    siguiente = None
+    if len(filas) > limite:
+        filas = filas[:limite]
+        siguiente = codificar_cursor(_valores_keyset(filas[-1], columnas))
+    return {"items": filas, "next_cursor": siguiente}
+
+def stream_ndjson(q, columnas: Sequence, params: ParametrosPagina, schema: Type[BaseModel], proyeccion=None) -> StreamingResponse:
+    q = aplicar_keyset(q, columnas, params.after)
+    if params.limit:
+        q = q.limit(params.limit)
+
+    def generar(db):
+        for fila in q.with_session(db).yield_per(LOTE_STREAMING):
+            if proyeccion is not None:
+                yield a_json(proyeccion.serializar(fila)) + b"\n"
+            else:
+                yield volcar_json(schema, fila) + b"\n"
+
+    return StreamingResponse(en_sesion_propia(generar), media_type=NDJSON, headers=VARIA)
+
+def listar(request: Request, q, columnas: Sequence, params: ParametrosPagina, schema: Type[BaseModel], proyeccion=None):
+    # proyeccion (app/fieldsets.py): solo carga/serializa los campos y relaciones pedidos
+    if proyeccion is not None:
+        q = q.options(*proyeccion.opciones())
+    if formato := formato_columnar(request):
+        pagina = paginar(q, columnas, params)
+        # Sin proyección (listados de items) el schema es plano: todos sus campos son columnas
+        campos, anidadas = proyeccion.columnas() if proyeccion is not None else (list(schema.model_fields), {})
+        return responder_columnar(formato, {
+            "items": tabla(pagina["items"], campos, anidadas),
+            "next_cursor": pagina["next_cursor"],
+        })
+    if quiere_ndjson(request):
+        return stream_ndjson(q, columnas, params, schema, proyeccion)
+    pagina = paginar(q, columnas, params)
+    if proyeccion is None:
+        return responder(Pagina[schema], pagina, headers=VARIA)
+    return RespuestaJSON({
+        "items": [proyeccion.serializar(f) for f in pagina["items"]],
+        "next_cursor": pagina["next_cursor"],
+    }, headers=VARIA)
+
+def listar_en_memoria(request: Request, filas: Sequence, claves: Sequence[str], params: ParametrosPagina, schema: Type[BaseModel]):
+    # Mismo contrato que listar() para colecciones ya cargadas (p.ej. catálogos en caché)
+    if params.after:
+        desde = decodificar_cursor(params.after, len(claves))
+        filas = [f for f in filas if [getattr(f, k) for k in claves] > desde]
+    if quiere_ndjson(request):
+        if params.limit:
+            filas = filas[:params.limit]
+        return StreamingResponse((volcar_json(schema, f) + b"\n" for f in filas), media_type=NDJSON, headers=VARIA)
+    limite = params.limit or LIMITE_DEFECTO
+    siguiente = None
+    if len(filas) > limite:
+        filas = filas[:limite]
+        siguiente = codificar_cursor([getattr(filas[-1], k) for k in claves])
+    return responder(Pagina[schema], {"items": filas, "next_cursor": siguiente}, headers=VARIA)
@@ -0,0 +1,157 @@
+from datetime import datetime
+from typing import Optional, Tuple
+
+from fastapi import Query
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from . import models
+from .catalogos import get_catalogos
+from .columnar import columna, tabla
+from .pagination import LIMITE_DEFECTO, ParametrosPagina, aplicar_keyset, codificar_cursor
+
+# -------------------------
+# PENDIENTES: una sola consulta (sin N+1)
+# -------------------------
+class FiltrosPendientes:
+    def __init__(
+        self,
+        severidad_min: Optional[int] = Query(None, ge=1, description="orden_severidad mínimo; por defecto todo lo que no es 'Bueno'"),
+        torre: Optional[str] = None,
+        piso: Optional[int] = None,
+        zona_id: Optional[int] = None,
+        desde: Optional[datetime] = None,
+        hasta: Optional[datetime] = None,
+        inspector: Optional[str] = None,
+        historico: bool = Query(False, description="Incluir fallas históricas, no solo la última inspección de cada item"),
+    ):
+        self.severidad_min = severidad_min
+        self.torre = torre
+        self.piso = piso
+        self.zona_id = zona_id
+        self.desde = desde
+        self.hasta = hasta
+        self.inspector = inspector
+        self.historico = historico
+
+def _ultimos_detalles(db: Session):
+    # Último detalle por item, ya proyectado en los items (app/estado_items.py): sin recorrer el historial
+    UI, ZI = models.UnidadItem, models.ZonaItem
+    return (
+        db.query(UI.ultimo_detalle_id).filter(UI.ultimo_detalle_id.is_not(None))
+        .union_all(db.query(ZI.ultimo_detalle_id).filter(ZI.ultimo_detalle_id.is_not(None)))
+    )
+
+def _consulta(db: Session, filtros: FiltrosPendientes):
+    D, I = models.InspeccionDetalle, models.Inspeccion
+    UI, U, ZI, Z = models.UnidadItem, models.Unidad, models.ZonaItem, models.ZonaComun
+
+    q = (
+        db.query(
+            D.id.label("detalle_id"),
+            D.inspeccion_id,
+            D.estado_id,
+            D.observacion,
+            I.fecha,
+            I.inspector,
+            UI.id.label("unidad_item_id"),
+            UI.unidad_id,
+            U.torre,
+            U.piso,
+            U.numero,
+            ZI.id.label("zona_item_id"),
+            ZI.zona_id,
+            Z.nombre.label("zona_nombre"),
+            func.coalesce(UI.nombre, ZI.nombre).label("item_nombre"),
+        )
+        .join(I, I.id == D.inspeccion_id)
+        .outerjoin(UI, UI.id == D.unidad_item_id)
+        .outerjoin(U, U.id == UI.unidad_id)
+        .outerjoin(ZI, ZI.id == D.zona_item_id)
+        .outerjoin(Z, Z.id == ZI.zona_id)
+    )
+
+    # Los estados pendientes se resuelven desde la caché de catálogos (sin join a catalogo_estado)
+    cat = get_catalogos(db)
+    q = q.filter(D.estado_id.in_(cat.ids_estado_pendiente(filtros.severidad_min)))
+    if filtros.torre:
+        q = q.filter(U.torre == filtros.torre)
+    if filtros.piso is not None:
+        q = q.filter(U.piso == filtros.piso)
+    if filtros.zona_id is not None:
+        q = q.filter(ZI.zona_id == filtros.zona_id)
+    if filtros.desde:
+        q = q.filter(I.fecha >= filtros.desde)
+    if filtros.hasta:
+        q = q.filter(I.fecha <= filtros.hasta)
+    if filtros.inspector:
+        q = q.filter(I.inspector == filtros.inspector)
+    if not filtros.historico:
+        q = q.filter(D.id.in_(_ultimos_detalles(db)))
+    return q, cat
+
+def _pagina(q, pagina: ParametrosPagina) -> Tuple[list, Optional[str]]:
+    limite = pagina.limit or LIMITE_DEFECTO
+    filas = aplicar_keyset(q, (models.InspeccionDetalle.id,), pagina.after).limit(limite + 1).all()
+    siguiente = None
+    if len(filas) > limite:
+        filas = filas[:limite]
+        siguiente = codificar_cursor([filas[-1].detalle_id])
+    return filas, siguiente
+
+def _total(q, contar: bool) -> Optional[int]:
+    # COUNT(*) de todo lo que cumple los filtros (no solo la página): solo si se pide, cuesta otra consulta
+    return q.order_by(None).count() if contar else None
+
+def consultar_pendientes(db: Session, filtros: FiltrosPendientes, pagina: ParametrosPagina, contar: bool = False) -> dict:
+    q, cat = _consulta(db, filtros)
+    filas, siguiente = _pagina(q, pagina)
+
+    salida = []
+    for f in filas:
+        estado = cat.estado(f.estado_id)
+        if f.unidad_item_id is not None:
+            ref = {
+                "ambito": "UNIDAD",
+                "unidad_id": f.unidad_id,
+                "torre": f.torre,
+                "piso": f.piso,
+                "numero": f.numero,
+                "unidad_item_id": f.unidad_item_id,
+                "item_nombre": f.item_nombre,
+            }
+        elif f.zona_item_id is not None:
+            ref = {
+                "ambito": "ZONA",
+                "zona_id": f.zona_id,
+                "zona_nombre": f.zona_nombre,
+                "zona_item_id": f.zona_item_id,
+                "item_nombre": f.item_nombre,
+            }
+        else:
+            ref = {}
+        salida.append({
+            "detalle_id": f.detalle_id,
+            "inspeccion_id": f.inspeccion_id,
+            "fecha": f.fecha,
+            "inspector": f.inspector,
+            "estado_id": f.estado_id,
+            "estado": estado.nombre if estado else None,
+            "orden_severidad": estado.orden_severidad if estado else None,
+            "observacion": f.observacion,
+            **ref
+        })
+    return {"total": _total(q, contar), "en_pagina": len(salida), "pendientes": salida, "next_cursor": siguiente}
+
+def pendientes_columnar(db: Session, filtros: FiltrosPendientes, pagina: ParametrosPagina, contar: bool = False) -> dict:
+    """Misma página que consultar_pendientes en forma columnar (app/columnar.py)."""
+    q, cat = _consulta(db, filtros)
+    filas, siguiente = _pagina(q, pagina)
+    estados = [cat.estado(f.estado_id) for f in filas]
+    salida = tabla(filas, [c["name"] for c in q.column_descriptions])
+    salida["columnas"].update({
+        "ambito": columna(["UNIDAD" if f.unidad_item_id is not None else "ZONA" if f.zona_item_id is not None else None for f in filas]),
+        "estado": columna([e.nombre if e else None for e in estados]),
+        "orden_severidad": [e.orden_severidad if e else None for e in estados],
+    })
+    return {"total": _total(q, contar), "en_pagina": len(filas), "pendientes": salida, "next_cursor": siguiente}
@@ -0,0 +1,220 @@
+import argparse
+import sys
+from collections import Counter
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import case, delete, func, insert, select
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import Session
+
+from . import models
+from .catalogos import get_catalogos
+
+# -------------------------
+# Resúmenes de estado por (torre, piso) y por zona, por estado_id (deltas en app/estado_items.py)
+# -------------------------
+def aplicar_deltas(db: Session, deltas: Dict[Tuple[Optional[int], Optional[int]], Counter]):
+    # deltas: {(unidad_id, zona_id): {estado_id: +/- items}}; un upsert por tabla de resumen
+    por_unidad, por_zona = Counter(), Counter()
+    unidades = {u for (u, _), delta in deltas.items() if u and delta}
+    ubicacion = {}
+    if unidades:
+        U = models.Unidad
+        ubicacion = {f.id: (f.torre, f.piso) for f in db.execute(select(U.id, U.torre, U.piso).where(U.id.in_(unidades)))}
+    for (unidad_id, zona_id), delta in deltas.items():
+        for estado_id, n in delta.items():
+            if unidad_id:
+                por_unidad[(*ubicacion[unidad_id], estado_id)] += n
+            else:
+                por_zona[(zona_id, estado_id)] += n
+    for modelo, claves, totales in (
+        (models.ResumenUnidad, ("torre", "piso"), por_unidad),
+        (models.ResumenZona, ("zona_id",), por_zona),
+    ):
+        filas = [{**dict(zip(claves, c[:-1])), "estado_id": c[-1], "items": n} for c, n in totales.items() if n]
+        if not filas:
+            continue
+        stmt = sqlite_insert(modelo).values(filas)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[*claves, "estado_id"],
+            set_={"items": modelo.items + stmt.excluded["items"]},
+        )
+        db.execute(stmt)
+
+def reconstruir(db) -> dict:
+    """Recalcula ambos resúmenes desde el historial completo (Session o Connection)."""
+    D, I = models.InspeccionDetalle, models.Inspeccion
+    UI, U, ZI = models.UnidadItem, models.Unidad, models.ZonaItem
+    RU, RZ = models.ResumenUnidad, models.ResumenZona
+    rn = func.row_number().over(
+        partition_by=(D.unidad_item_id, D.zona_item_id),
+        order_by=(I.fecha.desc(), D.id.desc()),
+    )
+    ultimos = (
+        select(D.unidad_item_id, D.zona_item_id, D.estado_id, rn.label("rn"))
+        .join(I, I.id == D.inspeccion_id)
+        .subquery()
+    )
+    db.execute(delete(RU))
+    db.execute(delete(RZ))
+    db.execute(insert(RU).from_select(
+        ["torre", "piso", "estado_id", "items"],
+        select(U.torre, U.piso, ultimos.c.estado_id, func.count())
+        .select_from(ultimos)
+        .join(UI, UI.id == ultimos.c.unidad_item_id)
+        .join(U, U.id == UI.unidad_id)
+        .where(ultimos.c.rn == 1)
+        .group_by(U.torre, U.piso, ultimos.c.estado_id),
+    ))
+    db.execute(insert(RZ).from_select(
+        ["zona_id", "estado_id", "items"],
+        select(ZI.zona_id, ultimos.c.estado_id, func.count())
+        .select_from(ultimos)
+        .join(ZI, ZI.id == ultimos.c.zona_item_id)
+        .where(ultimos.c.rn == 1)
+        .group_by(ZI.zona_id, ultimos.c.estado_id),
+    ))
+    return {
+        "unidades": db.execute(select(func.count()).select_from(RU)).scalar(),
+        "zonas": db.execute(select(func.count()).select_from(RZ)).scalar(),
+    }
+
+# -------------------------
+# Consultas (solo leen las tablas de resumen)
+# -------------------------
+def _con_severidad(filas, cat) -> List[dict]:
+    salida = []
+    for f in filas:
+        estado = cat.estado(f["estado_id"])
+        salida.append({
+            **f,
+            "estado": estado.nombre if estado else None,
+            "orden_severidad": estado.orden_severidad if estado else None,
+        })
+    return salida
+
+def resumen_unidades(db: Session, torre: Optional[str] = None, piso: Optional[int] = None, severidad_min: Optional[int] = None) -> List[dict]:
+    RU = models.ResumenUnidad
+    cat = get_catalogos(db)
+    q = select(RU.torre, RU.piso, RU.estado_id, RU.items).where(RU.items > 0)
+    if torre:
+        q = q.where(RU.torre == torre)
+    if piso is not None:
+        q = q.where(RU.piso == piso)
+    if severidad_min is not None:
+        q = q.where(RU.estado_id.in_(cat.ids_estado_pendiente(severidad_min)))
+    filas = _con_severidad([dict(f._mapping) for f in db.execute(q)], cat)
+    return sorted(filas, key=lambda f: (f["torre"], f["piso"], f["orden_severidad"] or 0))
+
+def resumen_zonas(db: Session, zona_id: Optional[int] = None, severidad_min: Optional[int] = None) -> List[dict]:
+    RZ, Z = models.ResumenZona, models.ZonaComun
+    cat = get_catalogos(db)
+    q = (
+        select(RZ.zona_id, Z.nombre.label("zona_nombre"), RZ.estado_id, RZ.items)
+        .join(Z, Z.id == RZ.zona_id)
+        .where(RZ.items > 0)
+    )
+    if zona_id is not None:
+        q = q.where(RZ.zona_id == zona_id)
+    if severidad_min is not None:
+        q = q.where(RZ.estado_id.in_(cat.ids_estado_pendiente(severidad_min)))
+    filas = _con_severidad([dict(f._mapping) for f in db.execute(q)], cat)
+    return sorted(filas, key=lambda f: (f["zona_id"], f["orden_severidad"] or 0))
+
+def resumen_general(db: Session) -> dict:
+    # Totales por estado de todo el conjunto: un GROUP BY sobre cada tabla de resumen
+    cat = get_catalogos(db)
+    salida = {}
+    for ambito, modelo in (("unidades", models.ResumenUnidad), ("zonas", models.ResumenZona)):
+        q = select(modelo.estado_id, func.sum(modelo.items).label("items")).group_by(modelo.estado_id)
+        filas = _con_severidad([dict(f._mapping) for f in db.execute(q) if f.items], cat)
+        salida[ambito] = sorted(filas, key=lambda f: f["orden_severidad"] or 0)
+    return salida
+
+# -------------------------
+# Reporte anual (historial; lo genera el trabajo "reporte_anual" de app/trabajos.py)
+# -------------------------
+def reporte_anual(db: Session, anio: int) -> dict:
+    """Actividad por mes y estado de los items al cierre de `anio` (su último detalle dentro del año)."""
+    D, I = models.InspeccionDetalle, models.Inspeccion
+    UI, U, ZI, Z = models.UnidadItem, models.Unidad, models.ZonaItem, models.ZonaComun
+    cat = get_catalogos(db)
+    en_anio = (I.fecha >= datetime(anio, 1, 1), I.fecha < datetime(anio + 1, 1, 1))
+
+    mes = func.strftime("%m", I.fecha)
+    pendiente = case((D.estado_id.in_(cat.ids_estado_pendiente()), 1), else_=0)
+    por_mes = [
+        {"mes": int(f.mes), "inspecciones": f.inspecciones, "detalles": f.detalles, "pendientes": f.pendientes or 0}
+        for f in db.execute(
+            select(
+                mes.label("mes"),
+                func.count(func.distinct(I.id)).label("inspecciones"),
+                func.count(D.id).label("detalles"),
+                func.sum(pendiente).label("pendientes"),
+            )
+            .select_from(I)
+            .outerjoin(D, D.inspeccion_id == I.id)
+            .where(*en_anio)
+            .group_by(mes)
+            .order_by(mes)
+        )
+    ]
+
+    rn = func.row_number().over(
+        partition_by=(D.unidad_item_id, D.zona_item_id),
+        order_by=(I.fecha.desc(), D.id.desc()),
+    )
+    ultimos = (
+        select(D.unidad_item_id, D.zona_item_id, D.estado_id, rn.label("rn"))
+        .join(I, I.id == D.inspeccion_id)
+        .where(*en_anio)
+        .subquery()
+    )
+    unidades = db.execute(
+        select(U.torre, U.piso, ultimos.c.estado_id, func.count().label("items"))
+        .select_from(ultimos)
+        .join(UI, UI.id == ultimos.c.unidad_item_id)
+        .join(U, U.id == UI.unidad_id)
+        .where(ultimos.c.rn == 1)
+        .group_by(U.torre, U.piso, ultimos.c.estado_id)
+    )
+    zonas = db.execute(
+        select(ZI.zona_id, Z.nombre.label("zona_nombre"), ultimos.c.estado_id, func.count().label("items"))
+        .select_from(ultimos)
+        .join(ZI, ZI.id == ultimos.c.zona_item_id)
+        .join(Z, Z.id == ZI.zona_id)
+        .where(ultimos.c.rn == 1)
+        .group_by(ZI.zona_id, Z.nombre, ultimos.c.estado_id)
+    )
+    return {
+        "anio": anio,
+        "inspecciones": sum(m["inspecciones"] for m in por_mes),
+        "detalles": sum(m["detalles"] for m in por_mes),
+        "por_mes": por_mes,
+        "unidades": sorted(
+            _con_severidad([dict(f._mapping) for f in unidades], cat),
+            key=lambda f: (f["torre"], f["piso"], f["orden_severidad"] or 0),
+        ),
+        "zonas": sorted(
+            _con_severidad([dict(f._mapping) for f in zonas], cat),
+            key=lambda f: (f["zona_id"], f["orden_severidad"] or 0),
+        ),
+    }
+
+# -------------------------
+# CLI: python -m app.resumenes (reconstruye desde el historial)
+# -------------------------
+def main(argv=None):
+    from .database import engine
+    from .migraciones import migrar
+
+    argparse.ArgumentParser(description="Reconstruye los resúmenes de estado desde el historial de inspecciones.").parse_args(argv)
+    migrar(engine)
+    with engine.begin() as conn:
+        filas = reconstruir(conn)
+    print(f"Resúmenes reconstruidos: {filas['unidades']} filas (torre, piso, estado), {filas['zonas']} filas (zona, estado)")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,126 @@
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, status
+from sqlalchemy import insert, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload
+
+from . import models, schemas
+from .archivo import modelos_archivo
+from .catalogos import get_catalogos
+from .config import settings
+from .database import get_async_db
+from .inspecciones import ParametrosExpand, clasificar_detalles, documentos, items_validos
+from .metricas import RutaInstrumentada
+from .estado_items import registrar_detalles
+from .serializacion import responder
+from .versiones import consulta_version, no_modificada, validadores
+
+# -------------------------
+# Versiones async (DB_ASYNC=1) de las rutas más concurridas
+# -------------------------
+router = APIRouter(route_class=RutaInstrumentada) if settings.metricas else APIRouter()
+
+@router.get("/api/v1/unidades/{unidad_id}", response_model=schemas.UnidadOut, tags=["Unidades"])
+async def obtener_unidad(unidad_id: int, request: Request, response: Response, db: AsyncSession = Depends(get_async_db)):
+    fila = (await db.execute(consulta_version(models.Unidad, unidad_id))).first()
+    if not fila:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Unidad no encontrada")
+    cabeceras = validadores(models.Unidad, unidad_id, fila)
+    if (r := no_modificada(request, cabeceras)) is not None:
+        return r
+    u = await db.scalar(
+        select(models.Unidad).options(selectinload(models.Unidad.items)).where(models.Unidad.id == unidad_id)
+    )
+    if not u:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Unidad no encontrada")
+    response.headers.update(cabeceras)
+    return u
+
+@router.get("/api/v1/zonas/{zona_id}", response_model=schemas.ZonaOut, tags=["Zonas"])
+async def obtener_zona(zona_id: int, request: Request, response: Response, db: AsyncSession = Depends(get_async_db)):
+    fila = (await db.execute(consulta_version(models.ZonaComun, zona_id))).first()
+    if not fila:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Zona no encontrada")
+    cabeceras = validadores(models.ZonaComun, zona_id, fila)
+    if (r := no_modificada(request, cabeceras)) is not None:
+        return r
+    z = await db.scalar(
+        select(models.ZonaComun).options(selectinload(models.ZonaComun.items)).where(models.ZonaComun.id == zona_id)
+    )
+    if not z:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Zona no encontrada")
+    response.headers.update(cabeceras)
+    return z
+
+@router.get("/api/v1/inspecciones/{inspeccion_id}", response_model=schemas.InspeccionExpandida, tags=["Inspecciones"])
+async def obtener_inspeccion(inspeccion_id: int, request: Request, expand: ParametrosExpand = Depends(), db: AsyncSession = Depends(get_async_db)):
+    I, D = models.Inspeccion, models.InspeccionDetalle
+    if expand.campos:
+        ins = await db.get(I, inspeccion_id)
+        if not ins and (archivo := modelos_archivo()):
+            I, D = archivo
+            ins = await db.get(I, inspeccion_id)
+        if not ins:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Inspección no encontrada")
+        docs = await db.run_sync(documentos, [ins], expand.campos, D)
+        return responder(schemas.InspeccionExpandida, docs[0])
+    fila = (await db.execute(consulta_version(I, inspeccion_id))).first()
+    if not fila and (archivo := modelos_archivo()):
+        I, D = archivo
+        fila = (await db.execute(consulta_version(I, inspeccion_id))).first()
+    if not fila:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Inspección no encontrada")
+    cabeceras = validadores(I, inspeccion_id, fila)
+    if (r := no_modificada(request, cabeceras)) is not None:
+        return r
+    ins = await db.get(I, inspeccion_id)
+    if not ins:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Inspección no encontrada")
+    detalles = (await db.scalars(select(D).where(D.inspeccion_id == inspeccion_id))).all()
+    return responder(schemas.InspeccionConDetalles, {"inspeccion": ins, "detalles": detalles}, headers=cabeceras)
+
+@router.post("/api/v1/inspecciones/{inspeccion_id}/detalles", response_model=schemas.InspeccionDetalleOut, status_code=status.HTTP_201_CREATED, tags=["Inspecciones"])
+async def agregar_detalle_inspeccion(inspeccion_id: int, payload: schemas.InspeccionDetalleCreate, db: AsyncSession = Depends(get_async_db)):
+    ins = await db.get(models.Inspeccion, inspeccion_id)
+    if not ins:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Inspección no encontrada")
+    if bool(payload.unidad_item_id) == bool(payload.zona_item_id):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="El detalle debe referir a UN item de UNIDAD o de ZONA.")
+    if payload.unidad_item_id:
+        ui = await db.get(models.UnidadItem, payload.unidad_item_id)
+        if not ui or ins.unidad_id != ui.unidad_id:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="El item de unidad no corresponde a la inspección.")
+    if payload.zona_item_id:
+        zi = await db.get(models.ZonaItem, payload.zona_item_id)
+        if not zi or ins.zona_id != zi.zona_id:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="El item de zona no corresponde a la inspección.")
+    if not (await db.run_sync(get_catalogos)).estado(payload.estado_id):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Estado inválido")
+
+    det = models.InspeccionDetalle(inspeccion_id=inspeccion_id, **payload.model_dump())
+    db.add(det)
+    await db.flush()
+    await db.run_sync(registrar_detalles, ins, [det])
+    await db.commit()
+    return det
+
+@router.post("/api/v1/inspecciones/{inspeccion_id}/detalles:batch", response_model=schemas.InspeccionDetalleBatchOut, status_code=status.HTTP_201_CREATED, tags=["Inspecciones"])
+async def agregar_detalles_inspeccion_batch(inspeccion_id: int, payload: schemas.InspeccionDetalleBatch, db: AsyncSession = Depends(get_async_db)):
+    ins = await db.get(models.Inspeccion, inspeccion_id)
+    if not ins:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Inspección no encontrada")
+    detalles = payload.detalles
+
+    # Misma validación por conjuntos que la ruta sync (app/inspecciones.py)
+    ui_validos, zi_validos = await db.run_sync(items_validos, ins, detalles)
+    filas, indices, errores = clasificar_detalles(inspeccion_id, detalles, ui_validos, zi_validos, await db.run_sync(get_catalogos))
+
+    insertados = []
+    if filas:
+        ids = (await db.scalars(
+            insert(models.InspeccionDetalle).returning(models.InspeccionDetalle.id, sort_by_parameter_order=True),
+            filas
+        )).all()
+        insertados = [{"indice": i, "id": det_id, **f} for i, det_id, f in zip(indices, ids, filas)]
+        await db.run_sync(registrar_detalles, ins, insertados)
+        await db.commit()
+    return {"insertados": insertados, "errores": errores}
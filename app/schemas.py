@@ -1,12 +1,19 @@
 from pydantic import BaseModel, Field, ConfigDict
-from typing import Optional, List, Literal
-from datetime import datetime
+from typing import Any, Dict, Optional, List, Literal, Generic, TypeVar
+from datetime import date, datetime
 from .models import AmbitoEnum, TipoRespuestaEnum
 
 # Config Pydantic v2
 class ORMModel(BaseModel):
     model_config = ConfigDict(from_attributes=True)
 
+T = TypeVar("T")
+
+# Página de resultados con cursor keyset (ver app/pagination.py)
+class Pagina(ORMModel, Generic[T]):
+    items: List[T]
+    next_cursor: Optional[str] = None
+
 # -------------------------
 # ARTICULOS (ejemplo)
 # -------------------------
@@ -57,6 +64,8 @@ class UnidadItemOut(UnidadItemBase):
     id: int
     categoria_id: Optional[int] = None
     estado_id: Optional[int] = None
+    ultima_inspeccion_id: Optional[int] = None
+    ultima_inspeccion_fecha: Optional[datetime] = None
 
 class UnidadBase(ORMModel):
     torre: str
@@ -81,6 +90,8 @@ class ZonaItemCreate(ZonaItemBase):
 
 class ZonaItemOut(ZonaItemBase):
     id: int
+    ultima_inspeccion_id: Optional[int] = None
+    ultima_inspeccion_fecha: Optional[datetime] = None
 
 class ZonaBase(ORMModel):
     nombre: str
@@ -120,6 +131,7 @@ class InspeccionCreate(ORMModel):
     checklist_id: int
     unidad_id: Optional[int] = None
     zona_id: Optional[int] = None
+    clave_cliente: Optional[str] = Field(None, max_length=64, description="Clave idempotente generada por el cliente (p.ej. UUID)")
 
 class InspeccionOut(InspeccionCreate):
     id: int
@@ -132,3 +144,177 @@ class InspeccionDetalleCreate(ORMModel):
 
 class InspeccionDetalleOut(InspeccionDetalleCreate):
     id: int
+
+class InspeccionConDetalles(ORMModel):
+    inspeccion: InspeccionOut
+    detalles: List[InspeccionDetalleOut] = []
+
+# Documento compuesto (?expand=checklist,items,estados; ver app/inspecciones.py)
+class ItemReferencia(ORMModel):
+    id: int
+    nombre: str
+    categoria_id: Optional[int] = None
+
+class InspeccionDetalleExpandido(InspeccionDetalleOut):
+    unidad_item: Optional[ItemReferencia] = None
+    zona_item: Optional[ItemReferencia] = None
+    estado: Optional[CatalogoEstadoOut] = None
+
+class InspeccionExpandida(ORMModel):
+    inspeccion: InspeccionOut
+    checklist: Optional[ChecklistOut] = None
+    detalles: List[InspeccionDetalleExpandido] = []
+
+class InspeccionDetalleBatch(ORMModel):
+    detalles: List[InspeccionDetalleCreate] = Field(..., min_length=1, max_length=1000)
+
+class ErrorFila(BaseModel):
+    indice: int
+    detalle: str
+
+class InspeccionDetalleBatchFila(InspeccionDetalleOut):
+    indice: int
+
+class InspeccionDetalleBatchOut(BaseModel):
+    insertados: List[InspeccionDetalleBatchFila] = []
+    errores: List[ErrorFila] = []
+
+# Instanciar inspecciones desde un checklist (ver app/inspecciones.py)
+class InspeccionInstanciar(ORMModel):
+    checklist_id: int
+    inspector: str
+    fecha: Optional[datetime] = None
+    # Destinos según el ámbito del checklist: unidades (por id y/o torre/piso) o zonas por id
+    unidad_ids: List[int] = Field([], max_length=1000)
+    torre: Optional[str] = None
+    piso: Optional[int] = None
+    zona_ids: List[int] = Field([], max_length=1000)
+    estado_id: Optional[int] = Field(None, description="Estado para los items sin estado actual; sin él, esos items no reciben detalle")
+
+class InspeccionInstanciada(InspeccionOut):
+    detalles: int
+
+class InstanciarOut(BaseModel):
+    inspecciones: List[InspeccionInstanciada] = []
+    detalles: int = 0
+    no_encontradas: List[int] = []
+
+# -------------------------
+# IMPORTACIÓN MASIVA
+# -------------------------
+class ImportacionOut(BaseModel):
+    procesados: int
+    insertados: int
+    actualizados: int  # unidades/zonas que ya existían y el archivo cambió (columnas o items)
+    items_insertados: int
+    items_actualizados: int
+    rechazados: int
+    errores: List[ErrorFila] = []
+
+# -------------------------
+# RESÚMENES DE ESTADO
+# -------------------------
+class ResumenEstado(BaseModel):
+    estado_id: int
+    estado: Optional[str] = None
+    orden_severidad: Optional[int] = None
+    items: int
+
+class ResumenUnidadOut(ResumenEstado):
+    torre: str
+    piso: int
+
+class ResumenZonaOut(ResumenEstado):
+    zona_id: int
+    zona_nombre: Optional[str] = None
+
+class ResumenGeneralOut(BaseModel):
+    unidades: List[ResumenEstado] = []
+    zonas: List[ResumenEstado] = []
+
+# -------------------------
+# BÚSQUEDA
+# -------------------------
+class ResultadoBusqueda(BaseModel):
+    tipo: str
+    id: int
+    unidad_id: Optional[int] = None
+    zona_id: Optional[int] = None
+    inspeccion_id: Optional[int] = None
+    texto: str
+    snippet: str  # HTML: texto escapado, coincidencias entre <mark>…</mark>
+    rank: float
+
+class BusquedaOut(BaseModel):
+    total: int
+    resultados: List[ResultadoBusqueda] = []
+
+# -------------------------
+# TRABAJOS EN SEGUNDO PLANO
+# -------------------------
+class ParametrosTrabajoPendientes(BaseModel):
+    severidad_min: Optional[int] = Field(None, ge=1)
+    torre: Optional[str] = None
+    piso: Optional[int] = None
+    zona_id: Optional[int] = None
+    desde: Optional[datetime] = None
+    hasta: Optional[datetime] = None
+    inspector: Optional[str] = None
+    historico: bool = False
+
+class ParametrosTrabajoHistorialTorre(BaseModel):
+    torre: str
+    desde: Optional[datetime] = None
+    hasta: Optional[datetime] = None
+
+class ParametrosTrabajoReporteAnual(BaseModel):
+    anio: int = Field(..., ge=1900, le=2100)
+
+class ParametrosTrabajoArchivar(BaseModel):
+    antes_de: Optional[date] = Field(None, description="Fecha de corte (por defecto hoy - ARCHIVE_AFTER_DAYS)")
+
+class TrabajoCreate(BaseModel):
+    tipo: Literal["pendientes", "historial_torre", "reporte_anual", "archivar"]
+    parametros: dict = {}
+
+class TrabajoOut(ORMModel):
+    id: str
+    tipo: str
+    parametros: dict
+    estado: str
+    creado_en: datetime
+    iniciado_en: Optional[datetime] = None
+    terminado_en: Optional[datetime] = None
+    expira_en: Optional[datetime] = None
+    filas: Optional[int] = None
+    bytes: Optional[int] = None
+    error: Optional[str] = None
+
+# -------------------------
+# SINCRONIZACIÓN DELTA (clientes offline)
+# -------------------------
+class CambiosTabla(BaseModel):
+    upserts: List[Dict[str, Any]] = []  # filas completas, columnas tal cual la tabla
+    deletes: List[int] = []
+
+class SyncOut(BaseModel):
+    token: str
+    mas: bool  # quedan cambios: volver a pedir con el token devuelto
+    cambios: Dict[str, CambiosTabla] = {}
+
+class InspeccionOffline(InspeccionCreate):
+    clave_cliente: str = Field(..., min_length=1, max_length=64)
+    detalles: List[InspeccionDetalleCreate] = Field([], max_length=1000)
+
+class SyncPush(BaseModel):
+    inspecciones: List[InspeccionOffline] = Field(..., min_length=1, max_length=200)
+
+class ResultadoPush(BaseModel):
+    clave_cliente: str
+    inspeccion_id: Optional[int] = None
+    creada: bool  # False: ya existía (reintento) o fue rechazada
+    errores: List[ErrorFila] = []
+    error: Optional[str] = None
+
+class SyncPushOut(BaseModel):
+    resultados: List[ResultadoPush]
@@ -0,0 +1,43 @@
+from functools import lru_cache
+from typing import Any
+
+import pydantic_core
+from fastapi.responses import Response
+from pydantic import TypeAdapter
+
+try:
+    import orjson
+except ImportError:  # opcional: sin orjson se usa el serializador de pydantic-core
+    orjson = None
+
+# -------------------------
+# Serialización directa a bytes JSON
+# -------------------------
+@lru_cache(maxsize=None)
+def adaptador(tipo) -> TypeAdapter:
+    # Construir un TypeAdapter compila el esquema: se hace una sola vez por tipo
+    return TypeAdapter(tipo)
+
+def volcar_json(tipo, valor: Any) -> bytes:
+    """Valida `valor` (objetos ORM incluidos) contra `tipo` una sola vez y lo escribe como JSON."""
+    ta = adaptador(tipo)
+    return ta.dump_json(ta.validate_python(valor, from_attributes=True))
+
+def a_json(valor: Any) -> bytes:
+    # Datos ya confiables (dicts/listas de escalares, datetime, enums): sin pasar por jsonable_encoder
+    if orjson is not None:
+        return orjson.dumps(valor, default=pydantic_core.to_jsonable_python, option=orjson.OPT_NON_STR_KEYS)
+    return pydantic_core.to_json(valor)
+
+class RespuestaJSON(Response):
+    """Respuesta JSON sin jsonable_encoder: bytes tal cual o estructuras simples vía orjson."""
+
+    media_type = "application/json"
+
+    def render(self, content: Any) -> bytes:
+        if isinstance(content, (bytes, bytearray)):
+            return bytes(content)
+        return a_json(content)
+
+def responder(tipo, valor: Any, status_code: int = 200, headers=None) -> RespuestaJSON:
+    return RespuestaJSON(volcar_json(tipo, valor), status_code=status_code, headers=headers)
@@ -0,0 +1,160 @@
+from collections import defaultdict
+from typing import List, Optional
+
+from fastapi import HTTPException, Query, status
+from sqlalchemy import insert, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from . import archivo, models, schemas
+from .catalogos import get_catalogos
+from .database import Base
+from .estado_items import registrar_detalles
+from .inspecciones import clasificar_detalles, items_validos
+from .pagination import codificar_cursor, decodificar_cursor
+
+# -------------------------
+# Registro de cambios para clientes offline: triggers, una fila por entidad con seq AUTOINCREMENT
+# -------------------------
+TABLAS_SYNC = [
+    "catalogo_estado",
+    "catalogo_categoria",
+    "unidades",
+    "unidad_items",
+    "zonas_comunes",
+    "zona_items",
+    "checklists",
+    "checklist_items",
+    "inspecciones",
+    "inspeccion_detalles",
+]
+# Metadatos del ETag: los mueven los triggers de versiones ante cualquier escritura de un hijo
+_SIN_DATOS = {"version", "actualizado_en"}
+LIMITE_SYNC = 1000
+LIMITE_SYNC_MAXIMO = 10000
+
+def _registrar(tabla: str, fila: str, operacion: str) -> str:
+    return f"REPLACE INTO cambios (tabla, entidad_id, operacion) VALUES ('{tabla}', {fila}.id, '{operacion}')"
+
+def _triggers() -> List[str]:
+    sentencias = []
+    for tabla in TABLAS_SYNC:
+        # Una fila movida al historial archivado sigue existiendo para el cliente: no es un delete
+        cuando = f"WHEN {archivo.SIN_MOVER} " if tabla in archivo.TABLAS else ""
+        # Solo columnas de datos: subir la versión del padre no reenvía su fila
+        datos = ", ".join(c.name for c in Base.metadata.tables[tabla].columns if c.name not in _SIN_DATOS)
+        sentencias += [
+            f"CREATE TRIGGER IF NOT EXISTS {tabla}_cambios_ai AFTER INSERT ON {tabla} "
+            f"BEGIN {_registrar(tabla, 'new', 'upsert')}; END",
+            f"CREATE TRIGGER IF NOT EXISTS {tabla}_cambios_au AFTER UPDATE OF {datos} ON {tabla} "
+            f"BEGIN {_registrar(tabla, 'new', 'upsert')}; END",
+            f"CREATE TRIGGER IF NOT EXISTS {tabla}_cambios_ad AFTER DELETE ON {tabla} "
+            f"{cuando}BEGIN {_registrar(tabla, 'old', 'delete')}; END",
+        ]
+    return sentencias
+
+def crear_triggers(conn):
+    for sentencia in _triggers():
+        conn.exec_driver_sql(sentencia)
+
+def registrar_existentes(conn):
+    # Datos previos al registro: un upsert por entidad, para que since=0 sea una descarga completa
+    for tabla in TABLAS_SYNC:
+        conn.exec_driver_sql(
+            f"INSERT OR IGNORE INTO cambios (tabla, entidad_id, operacion) SELECT '{tabla}', id, 'upsert' FROM {tabla} ORDER BY id"
+        )
+
+# -------------------------
+# Pull: GET /api/v1/sync?since=<token>
+# -------------------------
+class ParametrosSync:
+    def __init__(
+        self,
+        since: Optional[str] = Query(None, description="Token de la sincronización anterior; sin token = todo"),
+        tablas: Optional[str] = Query(None, description=f"Tablas separadas por coma (por defecto todas: {', '.join(TABLAS_SYNC)})"),
+        limit: int = Query(LIMITE_SYNC, ge=1, le=LIMITE_SYNC_MAXIMO),
+    ):
+        self.seq = decodificar_cursor(since, 1)[0] if since else 0
+        self.tablas = [t.strip() for t in tablas.split(",") if t.strip()] if tablas else list(TABLAS_SYNC)
+        desconocidas = set(self.tablas) - set(TABLAS_SYNC)
+        if desconocidas:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Tablas desconocidas: {', '.join(sorted(desconocidas))}")
+        self.limit = limit
+
+def cambios_desde(db: Session, params: ParametrosSync) -> dict:
+    C = models.Cambio
+    filas = db.execute(
+        select(C.seq, C.tabla, C.entidad_id, C.operacion)
+        .where(C.seq > params.seq, C.tabla.in_(params.tablas))
+        .order_by(C.seq)
+        .limit(params.limit + 1)
+    ).all()
+    mas = len(filas) > params.limit
+    filas = filas[:params.limit]
+
+    por_tabla = defaultdict(lambda: {"upserts": [], "deletes": []})
+    for f in filas:
+        por_tabla[f.tabla]["upserts" if f.operacion == "upsert" else "deletes"].append(f.entidad_id)
+    for nombre, grupo in por_tabla.items():
+        if not grupo["upserts"]:
+            continue
+        # Filas completas con un IN por tabla; una fila borrada entretanto llega como delete en la próxima
+        tabla = Base.metadata.tables[nombre]
+        ids = grupo["upserts"]
+        grupo["upserts"] = [dict(r._mapping) for r in db.execute(select(tabla).where(tabla.c.id.in_(ids)))]
+        if (archivada := archivo.tabla_archivo(nombre)) is not None and len(grupo["upserts"]) < len(ids):
+            faltan = set(ids) - {f["id"] for f in grupo["upserts"]}
+            grupo["upserts"] += [dict(r._mapping) for r in db.execute(select(archivada).where(archivada.c.id.in_(faltan)))]
+
+    ultimo = filas[-1].seq if filas else params.seq
+    return {"token": codificar_cursor([ultimo]), "mas": mas, "cambios": dict(por_tabla)}
+
+# -------------------------
+# Push idempotente de inspecciones capturadas offline
+# -------------------------
+def recibir_inspecciones(db: Session, payload: schemas.SyncPush) -> dict:
+    I = models.Inspeccion
+    cat = get_catalogos(db)
+    checklists = set(db.scalars(select(models.Checklist.id).where(
+        models.Checklist.id.in_({p.checklist_id for p in payload.inspecciones})
+    )))
+    resultados = []
+    for p in payload.inspecciones:
+        if (existente := archivo.por_clave_cliente(db, p.clave_cliente)) is not None:
+            resultados.append({"clave_cliente": p.clave_cliente, "inspeccion_id": existente.id, "creada": False})
+            continue
+        if bool(p.unidad_id) == bool(p.zona_id):
+            resultados.append({"clave_cliente": p.clave_cliente, "creada": False, "error": "La inspección debe referir a UNA unidad O UNA zona."})
+            continue
+        if p.checklist_id not in checklists:
+            resultados.append({"clave_cliente": p.clave_cliente, "creada": False, "error": "Checklist no encontrado"})
+            continue
+
+        # Inspección, detalles, proyección de estado y clave en una sola transacción
+        ins = I(**p.model_dump(exclude={"detalles"}))
+        db.add(ins)
+        try:
+            db.flush()
+            ins_id = ins.id
+            ui_validos, zi_validos = items_validos(db, ins, p.detalles)
+            filas, indices, errores = clasificar_detalles(ins_id, p.detalles, ui_validos, zi_validos, cat)
+            if filas:
+                ids = db.scalars(
+                    insert(models.InspeccionDetalle).returning(models.InspeccionDetalle.id, sort_by_parameter_order=True),
+                    filas
+                ).all()
+                registrar_detalles(db, ins, [{"id": det_id, **f} for det_id, f in zip(ids, filas)])
+            db.commit()
+        except IntegrityError:
+            # Otro envío con la misma clave ganó la carrera (o una referencia inválida)
+            db.rollback()
+            existente = archivo.por_clave_cliente(db, p.clave_cliente)
+            resultados.append({
+                "clave_cliente": p.clave_cliente,
+                "inspeccion_id": existente.id if existente is not None else None,
+                "creada": False,
+                "error": None if existente is not None else "Referencia inválida",
+            })
+            continue
+        resultados.append({"clave_cliente": p.clave_cliente, "inspeccion_id": ins_id, "creada": True, "errores": errores})
+    return {"resultados": resultados}
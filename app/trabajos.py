@@ -0,0 +1,319 @@
+import hashlib
+import json
+import logging
+import multiprocessing
+import os
+import threading
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta
+from typing import BinaryIO, Callable, NamedTuple, Optional, Type
+
+from fastapi import HTTPException, status
+from pydantic import BaseModel, ValidationError
+from sqlalchemy import update
+from sqlalchemy.orm import Session
+
+from . import models, schemas
+from .archivo import almacenes, archivar
+from .config import settings
+from .database import SessionLocal, engine_para_proceso
+from .inspecciones import documentos
+from .pagination import LIMITE_MAXIMO, ParametrosPagina, aplicar_keyset, codificar_cursor
+from .reportes import FiltrosPendientes, consultar_pendientes
+from .resumenes import reporte_anual
+from .serializacion import a_json, volcar_json
+
+logger = logging.getLogger(__name__)
+
+# -------------------------
+# Trabajos en segundo plano: cola en la tabla `trabajos`, pool de procesos, resultado en JOBS_DIR
+# -------------------------
+PENDIENTE, EN_CURSO, TERMINADO, ERROR, EXPIRADO = "pendiente", "en_curso", "terminado", "error", "expirado"
+LOTE_HISTORIAL = 500
+NDJSON = "application/x-ndjson"
+
+# -------------------------
+# Tipos de trabajo (corren en el proceso hijo; escriben en `salida` y devuelven las filas escritas)
+# -------------------------
+def _pendientes(db: Session, p: schemas.ParametrosTrabajoPendientes, salida: BinaryIO) -> int:
+    filtros = FiltrosPendientes(**p.model_dump())
+    pagina = ParametrosPagina(limit=LIMITE_MAXIMO, after=None)
+    filas = 0
+    while True:
+        resultado = consultar_pendientes(db, filtros, pagina)
+        for fila in resultado["pendientes"]:
+            salida.write(a_json(fila) + b"\n")
+        filas += resultado["en_pagina"]
+        if not resultado["next_cursor"]:
+            return filas
+        pagina.after = resultado["next_cursor"]
+
+def _historial_torre(db: Session, p: schemas.ParametrosTrabajoHistorialTorre, salida: BinaryIO) -> int:
+    U = models.Unidad
+    filas = 0
+    # El historial archivado (si el rango lo alcanza) y después el caliente
+    for I, D in almacenes(db, p.desde):
+        q = db.query(I).join(U, U.id == I.unidad_id).filter(U.torre == p.torre)
+        if p.desde:
+            q = q.filter(I.fecha >= p.desde)
+        if p.hasta:
+            q = q.filter(I.fecha <= p.hasta)
+        cursor = None
+        while True:
+            lote = aplicar_keyset(q, (I.id,), cursor).limit(LOTE_HISTORIAL).all()
+            if not lote:
+                break
+            for doc in documentos(db, lote, {"items", "estados"}, D):
+                salida.write(volcar_json(schemas.InspeccionExpandida, doc) + b"\n")
+            filas += len(lote)
+            cursor = codificar_cursor([lote[-1].id])
+            db.expunge_all()
+    return filas
+
+def _archivar(db: Session, p: schemas.ParametrosTrabajoArchivar, salida: BinaryIO) -> int:
+    resumen = archivar(db, p.antes_de)
+    salida.write(a_json(resumen))
+    return resumen["inspecciones"]
+
+def _reporte_anual(db: Session, p: schemas.ParametrosTrabajoReporteAnual, salida: BinaryIO) -> int:
+    reporte = reporte_anual(db, p.anio)
+    salida.write(a_json(reporte))
+    return len(reporte["unidades"]) + len(reporte["zonas"])
+
+class TipoTrabajo(NamedTuple):
+    parametros: Type[BaseModel]
+    generar: Callable[[Session, BaseModel, BinaryIO], int]
+    extension: str
+    media_type: str
+    reutilizable: bool = True  # False: cada envío vuelve a correr (el resultado depende del momento)
+
+TIPOS = {
+    "pendientes": TipoTrabajo(schemas.ParametrosTrabajoPendientes, _pendientes, "ndjson", NDJSON),
+    "historial_torre": TipoTrabajo(schemas.ParametrosTrabajoHistorialTorre, _historial_torre, "ndjson", NDJSON),
+    "reporte_anual": TipoTrabajo(schemas.ParametrosTrabajoReporteAnual, _reporte_anual, "json", "application/json"),
+    "archivar": TipoTrabajo(schemas.ParametrosTrabajoArchivar, _archivar, "json", "application/json", reutilizable=False),
+}
+
+# -------------------------
+# Ejecución en el proceso hijo
+# -------------------------
+_engine_proceso = None
+
+def ejecutar(trabajo_id: str) -> Optional[str]:
+    """Punto de entrada del pool: reclama el trabajo, genera el archivo y registra el resultado."""
+    global _engine_proceso
+    if _engine_proceso is None:
+        _engine_proceso = engine_para_proceso()
+    T = models.Trabajo
+    with Session(_engine_proceso) as db:
+        # Reclamo atómico: si otro proceso ya lo tomó (reinicio, doble encolado), no se repite
+        reclamado = db.execute(
+            update(T).where(T.id == trabajo_id, T.estado == PENDIENTE)
+            .values(estado=EN_CURSO, iniciado_en=datetime.utcnow())
+        ).rowcount
+        db.commit()
+        if not reclamado:
+            return None
+        trabajo = db.get(T, trabajo_id)
+        tipo = TIPOS[trabajo.tipo]
+        os.makedirs(settings.trabajos_dir, exist_ok=True)
+        ruta = os.path.abspath(os.path.join(settings.trabajos_dir, f"{trabajo_id}.{tipo.extension}"))
+        temporal = ruta + ".tmp"
+        try:
+            with open(temporal, "wb") as salida:
+                filas = tipo.generar(db, tipo.parametros.model_validate(trabajo.parametros), salida)
+            os.replace(temporal, ruta)
+        except Exception as e:
+            db.rollback()
+            logger.exception("Trabajo %s falló", trabajo_id)
+            if os.path.exists(temporal):
+                os.remove(temporal)
+            db.execute(update(T).where(T.id == trabajo_id).values(estado=ERROR, error=repr(e), terminado_en=datetime.utcnow()))
+            db.commit()
+            return None
+        ahora = datetime.utcnow()
+        db.execute(update(T).where(T.id == trabajo_id).values(
+            estado=TERMINADO,
+            terminado_en=ahora,
+            expira_en=ahora + timedelta(seconds=settings.trabajos_ttl),
+            archivo=ruta,
+            media_type=tipo.media_type,
+            filas=filas,
+            bytes=os.path.getsize(ruta),
+        ))
+        db.commit()
+        return ruta
+
+# -------------------------
+# Pool de procesos (lado servidor)
+# -------------------------
+class Ejecutor:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._pool: Optional[ProcessPoolExecutor] = None
+
+    def _obtener_pool(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._pool is None:
+                # spawn: los hijos no heredan el engine ni las conexiones abiertas del servidor
+                self._pool = ProcessPoolExecutor(
+                    max_workers=settings.trabajos_workers,
+                    mp_context=multiprocessing.get_context("spawn"),
+                )
+            return self._pool
+
+    def encolar(self, trabajo_id: str):
+        futuro = self._obtener_pool().submit(ejecutar, trabajo_id)
+        futuro.add_done_callback(lambda f: self._al_terminar(trabajo_id, f))
+
+    def _al_terminar(self, trabajo_id: str, futuro):
+        # El hijo registra éxito y errores; aquí solo queda lo que lo mató (proceso caído, pool roto)
+        if futuro.cancelled() or futuro.exception() is None:
+            return
+        logger.error("Trabajo %s interrumpido: %r", trabajo_id, futuro.exception())
+        T = models.Trabajo
+        with SessionLocal() as db:
+            db.execute(
+                update(T).where(T.id == trabajo_id, T.estado.in_((PENDIENTE, EN_CURSO)))
+                .values(estado=ERROR, error=repr(futuro.exception()), terminado_en=datetime.utcnow())
+            )
+            db.commit()
+
+    def detener(self):
+        with self._lock:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            # Los trabajos en cola quedan 'pendiente' en la tabla y se reanudan al arrancar
+            pool.shutdown(wait=False, cancel_futures=True)
+
+ejecutor = Ejecutor()
+
+# -------------------------
+# Cola persistente
+# -------------------------
+def clave_trabajo(tipo: str, parametros: dict) -> str:
+    return hashlib.sha256(json.dumps([tipo, parametros], sort_keys=True).encode()).hexdigest()
+
+def _vigente(trabajo: models.Trabajo) -> bool:
+    if trabajo.estado in (PENDIENTE, EN_CURSO):
+        return True
+    return (
+        trabajo.estado == TERMINADO
+        and trabajo.expira_en is not None and trabajo.expira_en > datetime.utcnow()
+        and trabajo.archivo is not None and os.path.exists(trabajo.archivo)
+    )
+
+def enviar(db: Session, tipo: str, parametros: dict):
+    """Encola un trabajo o devuelve el vigente con los mismos parámetros. -> (trabajo, reutilizado)"""
+    try:
+        normalizados = TIPOS[tipo].parametros.model_validate(parametros).model_dump(mode="json")
+    except ValidationError as e:
+        raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail=e.errors(include_url=False))
+    T = models.Trabajo
+    clave = clave_trabajo(tipo, normalizados)
+    # Un trabajo que modifica datos solo reutiliza uno que no terminó
+    estados = (PENDIENTE, EN_CURSO, TERMINADO) if TIPOS[tipo].reutilizable else (PENDIENTE, EN_CURSO)
+    previos = db.query(T).filter(T.clave == clave, T.estado.in_(estados)).order_by(T.creado_en.desc())
+    for previo in previos.limit(1):
+        if _vigente(previo):
+            return previo, True
+    trabajo = T(id=uuid.uuid4().hex, tipo=tipo, parametros=normalizados, clave=clave, estado=PENDIENTE, propietario=os.getpid())
+    db.add(trabajo)
+    db.commit()
+    db.refresh(trabajo)
+    ejecutor.encolar(trabajo.id)
+    return trabajo, False
+
+def _proceso_vivo(pid: Optional[int]) -> bool:
+    if not pid:
+        return False
+    if pid == os.getpid():
+        return True
+    if os.name == "nt":
+        # os.kill(pid, 0) terminaría el proceso en Windows: se asume caído
+        return False
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+def limpiar_vencidos(db: Session, ahora: Optional[datetime] = None) -> int:
+    """Borra los resultados vencidos; las filas expiradas quedan otro JOBS_RESULT_TTL (410, no 404)."""
+    T = models.Trabajo
+    ahora = ahora or datetime.utcnow()
+    vencidos = db.query(T).filter(T.estado == TERMINADO, T.expira_en <= ahora).all()
+    for trabajo in vencidos:
+        if trabajo.archivo and os.path.exists(trabajo.archivo):
+            os.remove(trabajo.archivo)
+        trabajo.estado, trabajo.archivo = EXPIRADO, None
+    retencion = ahora - timedelta(seconds=settings.trabajos_ttl)
+    db.query(T).filter(
+        ((T.estado == EXPIRADO) & (T.expira_en <= retencion)) | ((T.estado == ERROR) & (T.terminado_en <= retencion))
+    ).delete(synchronize_session=False)
+    db.commit()
+    return len(vencidos)
+
+class Limpieza:
+    """Hilo que corre limpiar_vencidos cada JOBS_CLEANUP_INTERVAL segundos mientras vive el servidor."""
+
+    def __init__(self, intervalo: float, sesiones=SessionLocal):
+        self.intervalo = intervalo
+        self._sesiones = sesiones
+        self._fin = threading.Event()
+        self._hilo: Optional[threading.Thread] = None
+
+    def iniciar(self):
+        if self._hilo is None and self.intervalo > 0:
+            self._fin.clear()
+            self._hilo = threading.Thread(target=self._bucle, name="limpieza-trabajos", daemon=True)
+            self._hilo.start()
+
+    def _bucle(self):
+        while not self._fin.wait(self.intervalo):
+            try:
+                with self._sesiones() as db:
+                    limpiar_vencidos(db)
+            except Exception:
+                logger.exception("Limpieza de trabajos vencidos falló")
+
+    def detener(self):
+        hilo, self._hilo = self._hilo, None
+        if hilo is not None:
+            self._fin.set()
+            hilo.join()
+
+limpieza = Limpieza(settings.trabajos_limpieza)
+
+def reanudar(db: Session) -> int:
+    """Al arrancar: reencola los trabajos pendientes o interrumpidos cuyo servidor ya no existe."""
+    T = models.Trabajo
+    pid, reanudados = os.getpid(), 0
+    huerfanos = db.query(T.id, T.estado, T.propietario).filter(T.estado.in_((PENDIENTE, EN_CURSO))).all()
+    for trabajo_id, estado, propietario in huerfanos:
+        if propietario != pid and _proceso_vivo(propietario):
+            continue
+        # Tomarlo con la condición original: otro worker que arranca a la vez no lo duplica
+        tomado = db.execute(
+            update(T).where(T.id == trabajo_id, T.estado == estado, T.propietario.is_not_distinct_from(propietario))
+            .values(estado=PENDIENTE, propietario=pid, iniciado_en=None)
+        ).rowcount
+        db.commit()
+        if tomado:
+            ejecutor.encolar(trabajo_id)
+            reanudados += 1
+    limpiar_vencidos(db)
+    return reanudados
+
+def resultado(trabajo: models.Trabajo) -> str:
+    """Ruta del archivo listo para descargar, o el error HTTP que corresponde al estado."""
+    if trabajo.estado in (PENDIENTE, EN_CURSO):
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=f"El trabajo está {trabajo.estado}")
+    if trabajo.estado == ERROR:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=f"El trabajo terminó con error: {trabajo.error}")
+    if not _vigente(trabajo):
+        raise HTTPException(status_code=status.HTTP_410_GONE, detail="El resultado expiró; envíe el trabajo de nuevo")
+    return trabajo.archivo
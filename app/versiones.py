@@ -0,0 +1,84 @@
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import List, Optional
+
+from fastapi import Request, Response, status
+from sqlalchemy import select
+
+from . import archivo
+from .catalogos import no_modificado
+
+# -------------------------
+# Versión de Unidad, ZonaComun e Inspeccion (ETag / Last-Modified), incrementada por triggers
+# -------------------------
+_AHORA = "strftime('%Y-%m-%d %H:%M:%f', 'now')"
+
+# tabla padre, tabla hija, columna de la hija que apunta al padre
+_HIJOS = [
+    ("unidades", "unidad_items", "unidad_id"),
+    ("zonas_comunes", "zona_items", "zona_id"),
+    ("inspecciones", "inspeccion_detalles", "inspeccion_id"),
+]
+
+def _incrementar(tabla: str, id_expr: str) -> str:
+    return f"UPDATE {tabla} SET version = COALESCE(version, 0) + 1, actualizado_en = {_AHORA} WHERE id = {id_expr}"
+
+def _triggers() -> List[str]:
+    sentencias = []
+    for padre, hijo, columna in _HIJOS:
+        # La propia fila: solo si la escritura no tocó ya la versión (evita el doble incremento)
+        sentencias.append(
+            f"CREATE TRIGGER IF NOT EXISTS {padre}_version_au AFTER UPDATE ON {padre} "
+            f"WHEN new.version IS old.version BEGIN {_incrementar(padre, 'new.id')}; END"
+        )
+        sentencias += [
+            f"CREATE TRIGGER IF NOT EXISTS {hijo}_version_ai AFTER INSERT ON {hijo} "
+            f"BEGIN {_incrementar(padre, f'new.{columna}')}; END",
+            f"CREATE TRIGGER IF NOT EXISTS {hijo}_version_au AFTER UPDATE ON {hijo} "
+            f"BEGIN {_incrementar(padre, f'new.{columna}')}; "
+            f"{_incrementar(padre, f'old.{columna}')} AND old.{columna} IS NOT new.{columna}; END",
+            f"CREATE TRIGGER IF NOT EXISTS {hijo}_version_ad AFTER DELETE ON {hijo} "
+            f"{f'WHEN {archivo.SIN_MOVER} ' if hijo in archivo.TABLAS else ''}"
+            f"BEGIN {_incrementar(padre, f'old.{columna}')}; END",
+        ]
+    return sentencias
+
+def crear_triggers(conn):
+    for padre, _, _ in _HIJOS:
+        conn.exec_driver_sql(
+            f"UPDATE {padre} SET version = COALESCE(version, 1), actualizado_en = COALESCE(actualizado_en, {_AHORA}) "
+            f"WHERE version IS NULL OR actualizado_en IS NULL"
+        )
+    for sentencia in _triggers():
+        conn.exec_driver_sql(sentencia)
+
+# -------------------------
+# GET condicional
+# -------------------------
+def consulta_version(modelo, entidad_id: int):
+    # Lectura por clave primaria de dos columnas: lo único que hace falta para responder 304
+    return select(modelo.version, modelo.actualizado_en).where(modelo.id == entidad_id)
+
+def validadores(modelo, entidad_id: int, fila) -> dict:
+    actualizado = (fila.actualizado_en or datetime.utcnow()).replace(tzinfo=timezone.utc)
+    return {
+        "ETag": f'"{modelo.__tablename__}-{entidad_id}-v{fila.version or 1}"',
+        "Last-Modified": format_datetime(actualizado, usegmt=True),
+    }
+
+def no_modificada(request: Request, cabeceras: dict) -> Optional[Response]:
+    """304 si el cliente ya tiene esta versión (If-None-Match, o If-Modified-Since si no lo envía)."""
+    if "if-none-match" in request.headers:
+        r = no_modificado(request, cabeceras["ETag"])
+    else:
+        r = None
+        desde = request.headers.get("if-modified-since")
+        if desde:
+            try:
+                if parsedate_to_datetime(cabeceras["Last-Modified"]) <= parsedate_to_datetime(desde):
+                    r = Response(status_code=status.HTTP_304_NOT_MODIFIED)
+            except (TypeError, ValueError):
+                pass
+    if r is not None:
+        r.headers.update(cabeceras)
+    return r
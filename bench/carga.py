@@ -0,0 +1,134 @@
+"""Prueba de carga: ruta sync (threadpool) vs ruta async (DB_ASYNC=1).
+
+    # contra un servidor ya levantado
+    python -m bench.carga --url http://127.0.0.1:8000 --clientes 200 --duracion 20
+
+    # levanta uvicorn dos veces (sync y async) sobre una BD temporal y compara
+    python -m bench.carga --comparar --clientes 200 --duracion 20
+"""
+import argparse
+import asyncio
+import os
+import random
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+import httpx
+
+def _percentil(valores, p):
+    if not valores:
+        return 0.0
+    valores = sorted(valores)
+    return valores[min(len(valores) - 1, int(round(p / 100 * (len(valores) - 1))))]
+
+async def preparar(c: httpx.AsyncClient, unidades: int = 20, items: int = 10) -> dict:
+    await c.post("/api/v1/catalogos/seed")
+    ch = (await c.post("/api/v1/checklists", json={"nombre": "Carga", "ambito": "UNIDAD"})).json()
+    datos = {"unidades": [], "inspecciones": []}
+    sufijo = random.randint(0, 10**9)
+    for n in range(unidades):
+        u = (await c.post("/api/v1/unidades", json={"torre": f"BENCH{sufijo}", "piso": 1, "numero": str(n)})).json()
+        ids = []
+        for k in range(items):
+            ids.append((await c.post(f"/api/v1/unidades/{u['id']}/items", json={"nombre": f"Item {k}"})).json()["id"])
+        ins = (await c.post("/api/v1/inspecciones", json={"inspector": "carga", "checklist_id": ch["id"], "unidad_id": u["id"]})).json()
+        datos["unidades"].append(u["id"])
+        datos["inspecciones"].append((ins["id"], ids))
+    return datos
+
+async def _cliente(c: httpx.AsyncClient, datos: dict, fin: float, latencias: list, errores: list):
+    while time.perf_counter() < fin:
+        r = random.random()
+        t0 = time.perf_counter()
+        try:
+            if r < 0.2:
+                resp = await c.get("/")
+            elif r < 0.6:
+                resp = await c.get(f"/api/v1/unidades/{random.choice(datos['unidades'])}")
+            elif r < 0.8:
+                ins_id, _ = random.choice(datos["inspecciones"])
+                resp = await c.get(f"/api/v1/inspecciones/{ins_id}")
+            else:
+                ins_id, items = random.choice(datos["inspecciones"])
+                resp = await c.post(f"/api/v1/inspecciones/{ins_id}/detalles", json={"unidad_item_id": random.choice(items), "estado_id": 1})
+            if resp.status_code >= 400:
+                errores.append(resp.status_code)
+        except httpx.HTTPError as e:
+            errores.append(type(e).__name__)
+        latencias.append(time.perf_counter() - t0)
+
+async def carga(url: str, clientes: int, duracion: float) -> dict:
+    limites = httpx.Limits(max_connections=clientes, max_keepalive_connections=clientes)
+    async with httpx.AsyncClient(base_url=url, limits=limites, timeout=60) as c:
+        datos = await preparar(c)
+        latencias, errores = [], []
+        inicio = time.perf_counter()
+        fin = inicio + duracion
+        await asyncio.gather(*[_cliente(c, datos, fin, latencias, errores) for _ in range(clientes)])
+        total = time.perf_counter() - inicio
+    return {
+        "peticiones": len(latencias),
+        "rps": len(latencias) / total,
+        "p50_ms": _percentil(latencias, 50) * 1000,
+        "p99_ms": _percentil(latencias, 99) * 1000,
+        "media_ms": statistics.fmean(latencias) * 1000 if latencias else 0.0,
+        "errores": len(errores),
+    }
+
+def _puerto_libre() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+def _levantar(db_async: bool, ruta_db: str):
+    puerto = _puerto_libre()
+    env = {**os.environ, "DB_ASYNC": "1" if db_async else "0", "DATABASE_URL": f"sqlite:///{ruta_db}"}
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(puerto), "--log-level", "warning"],
+        env=env,
+    )
+    url = f"http://127.0.0.1:{puerto}"
+    for _ in range(100):
+        try:
+            httpx.get(url + "/", timeout=1)
+            return proc, url
+        except httpx.HTTPError:
+            time.sleep(0.1)
+    proc.terminate()
+    raise RuntimeError("uvicorn no arrancó")
+
+def comparar(clientes: int, duracion: float):
+    resultados = {}
+    for modo in (False, True):
+        with tempfile.TemporaryDirectory() as tmp:
+            proc, url = _levantar(modo, os.path.join(tmp, "carga.db"))
+            try:
+                resultados["async" if modo else "sync"] = asyncio.run(carga(url, clientes, duracion))
+            finally:
+                proc.terminate()
+                proc.wait()
+    _imprimir(resultados)
+
+def _imprimir(resultados: dict):
+    print(f"{'modo':<8}{'peticiones':>12}{'rps':>10}{'p50 ms':>10}{'p99 ms':>10}{'errores':>9}")
+    for modo, r in resultados.items():
+        print(f"{modo:<8}{r['peticiones']:>12}{r['rps']:>10.1f}{r['p50_ms']:>10.1f}{r['p99_ms']:>10.1f}{r['errores']:>9}")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default="http://127.0.0.1:8000")
+    parser.add_argument("--clientes", type=int, default=200)
+    parser.add_argument("--duracion", type=float, default=20.0, help="Segundos de carga sostenida")
+    parser.add_argument("--comparar", action="store_true", help="Levanta uvicorn en modo sync y async y compara")
+    args = parser.parse_args(argv)
+    if args.comparar:
+        comparar(args.clientes, args.duracion)
+    else:
+        _imprimir({"servidor": asyncio.run(carga(args.url, args.clientes, args.duracion))})
+
+if __name__ == "__main__":
+    main()
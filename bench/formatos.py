@@ -0,0 +1,91 @@
+"""Tamaño y tiempo de los listados grandes según la codificación de la respuesta.
+
+    python -m bench.generar --db sqlite:///./bench.db --torres 4 --pisos 10 --zonas 20 --anios 1
+    python -m bench.formatos --db ./bench.db
+
+Para cada listado compara JSON por filas (el actual), JSON columnar y MessagePack columnar
+(app/columnar.py), sin comprimir y con gzip. Reporta los bytes transferidos y la mediana de
+latencia en proceso (TestClient): la consulta es la misma en todas las variantes, así que la
+diferencia es la codificación (más la compresión). Trabaja sobre una copia temporal de la BD.
+"""
+import argparse
+import os
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+
+from .suite import cargar_muestra
+
+# nombre, plantilla de ruta (con los ids de la muestra)
+LISTADOS = [
+    ("unidades_torre_items", "/api/v1/unidades?torre={torre}&include=items&limit=1000"),
+    ("unidades_torre", "/api/v1/unidades?torre={torre}&limit=1000"),
+    ("zonas_items", "/api/v1/zonas?include=items&limit=1000"),
+    ("unidad_items", "/api/v1/unidades/{unidad}/items"),
+    ("pendientes", "/api/v1/pendientes?historico=true&limit=1000"),
+]
+FORMATOS = [
+    ("json", "application/json"),
+    ("columnar", "application/vnd.erp.columnar+json"),
+    ("msgpack", "application/vnd.erp.columnar+msgpack"),
+]
+CODIFICACIONES = ["identity", "gzip"]
+
+def medir(c, ruta: str, accept: str, encoding: str, iteraciones: int) -> dict:
+    latencias, tamano = [], 0
+    for _ in range(iteraciones):
+        t0 = time.perf_counter()
+        resp = c.get(ruta, headers={"Accept": accept, "Accept-Encoding": encoding})
+        latencias.append(time.perf_counter() - t0)
+        resp.raise_for_status()
+        tamano = resp.num_bytes_downloaded
+    return {"bytes": tamano, "p50_ms": statistics.median(latencias) * 1000, "tipo": resp.headers["content-type"]}
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--db", required=True, help="Archivo SQLite con los datos (p.ej. generado con bench.generar)")
+    parser.add_argument("--iteraciones", type=int, default=20, help="Solicitudes por combinación")
+    parser.add_argument("--listados", help="Lista separada por comas (por defecto todos)")
+    args = parser.parse_args(argv)
+
+    original = os.path.abspath(args.db)
+    tmp = tempfile.mkdtemp(prefix="bench-")
+    try:
+        ruta_db = os.path.join(tmp, os.path.basename(original))
+        shutil.copyfile(original, ruta_db)
+        os.environ["DATABASE_URL"] = f"sqlite:///{ruta_db}"
+        return _correr(args)
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+
+def _correr(args) -> int:
+    from fastapi.testclient import TestClient
+
+    from app.database import engine
+    from app.main import app
+
+    listados = LISTADOS
+    if args.listados:
+        nombres = set(args.listados.split(","))
+        listados = [l for l in LISTADOS if l[0] in nombres]
+    muestra = cargar_muestra(engine)["muestras"][0]
+
+    print(f"{'listado':<22}{'formato':<10}{'encoding':<10}{'bytes':>11}{'vs json':>9}{'p50 ms':>9}")
+    with TestClient(app) as c:
+        for nombre, plantilla in listados:
+            ruta = plantilla.format(**muestra)
+            base = None
+            for formato, accept in FORMATOS:
+                for encoding in CODIFICACIONES:
+                    r = medir(c, ruta, accept, encoding, args.iteraciones)
+                    if not r["tipo"].startswith(accept):
+                        print(f"{nombre:<22}{formato:<10}{encoding:<10}  no disponible (respondió {r['tipo']})")
+                        continue
+                    base = base or r["bytes"]
+                    print(f"{nombre:<22}{formato:<10}{encoding:<10}{r['bytes']:>11}{r['bytes'] / base:>9.0%}{r['p50_ms']:>9.1f}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
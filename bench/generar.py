@@ -0,0 +1,168 @@
+"""Generador de datos sintéticos para pruebas de rendimiento.
+
+    # edificio de referencia: 50 torres x 30 pisos x 10 unidades x 20 items
+    python -m bench.generar --db sqlite:///./bench.db
+
+    # algo pequeño para probar
+    python -m bench.generar --db sqlite:///./bench.db --torres 2 --pisos 5 --zonas 20 --anios 1
+"""
+import argparse
+import os
+import random
+import time
+from datetime import datetime, timedelta
+
+NOMBRES_ITEM_UNIDAD = [
+    "Cocina", "Baño principal", "Baño social", "Lavaplatos", "Estufa", "Horno", "Nevera", "Lavadora",
+    "Calentador", "Puerta principal", "Ventanas", "Piso", "Techo", "Closet", "Balcón", "Citófono",
+    "Tomas eléctricas", "Iluminación", "Grifería", "Kit limpieza",
+]
+NOMBRES_ITEM_ZONA = [
+    "BBQ", "Caneca", "Futbolito", "Mesa", "Sillas", "Iluminación", "Piso", "Baño", "Extintor", "Señalización",
+]
+TIPOS_ZONA = ["Recreación", "Servicios", "Deportes", "Social"]
+OBSERVACIONES = ["fuga", "rayado", "no enciende", "suelto", "oxidado", "humedad", "roto", "sucio"]
+
+# Mezcla de estados: la mayoría "Bueno"
+MEZCLA_ESTADOS = [("Bueno", 1, 0.80), ("Requiere mantenimiento", 3, 0.15), ("No operativo", 4, 0.05)]
+LOTE = 5000
+
+def _insertar(conn, modelo, filas, devolver_ids=False):
+    from sqlalchemy import insert
+
+    ids = []
+    for i in range(0, len(filas), LOTE):
+        trozo = filas[i:i + LOTE]
+        if devolver_ids:
+            stmt = insert(modelo).returning(modelo.id, sort_by_parameter_order=True)
+            ids += conn.execute(stmt, trozo).scalars().all()
+        else:
+            conn.execute(insert(modelo), trozo)
+    return ids
+
+def generar(engine, torres=50, pisos=30, unidades_por_piso=10, items_unidad=20, zonas=2000, items_zona=10,
+            anios=3, inspecciones_por_anio=2, semilla=42, verbose=True):
+    from sqlalchemy import select
+
+    from app import models
+    from app.migraciones import migrar
+    from app.estado_items import backfill
+    from app.resumenes import reconstruir
+
+    rnd = random.Random(semilla)
+    migrar(engine)
+    t0 = time.perf_counter()
+
+    def log(msg):
+        if verbose:
+            print(f"[{time.perf_counter() - t0:7.1f}s] {msg}", flush=True)
+
+    with engine.begin() as conn:
+        existentes = {n for (n,) in conn.execute(select(models.CatalogoEstado.nombre))}
+        _insertar(conn, models.CatalogoEstado, [
+            {"nombre": n, "orden_severidad": s} for n, s, _ in MEZCLA_ESTADOS if n not in existentes
+        ])
+        estados = dict(conn.execute(select(models.CatalogoEstado.nombre, models.CatalogoEstado.id)).all())
+        pesos = [(estados[n], p) for n, _, p in MEZCLA_ESTADOS]
+        ids_estado, probabilidades = zip(*pesos)
+
+        ch_unidad = _insertar(conn, models.Checklist, [{"nombre": "Entrega unidad", "version": "1.0", "ambito": models.AmbitoEnum.UNIDAD}], True)[0]
+        ch_zona = _insertar(conn, models.Checklist, [{"nombre": "Ronda zonas", "version": "1.0", "ambito": models.AmbitoEnum.ZONA}], True)[0]
+        _insertar(conn, models.ChecklistItem, [
+            {"checklist_id": ch, "texto": f"{n} sin fugas ni daños", "tipo_respuesta": models.TipoRespuestaEnum.SI_NO}
+            for ch, nombres in ((ch_unidad, NOMBRES_ITEM_UNIDAD), (ch_zona, NOMBRES_ITEM_ZONA)) for n in nombres
+        ])
+
+    # Unidades e items (una transacción por torre)
+    items_por_unidad = {}
+    sufijo = rnd.randint(0, 10**6)
+    for t in range(torres):
+        torre = f"T{t + 1:02d}-{sufijo}"
+        with engine.begin() as conn:
+            filas = [{"torre": torre, "piso": p, "numero": f"{p}{u + 1:02d}"}
+                     for p in range(1, pisos + 1) for u in range(unidades_por_piso)]
+            ids = _insertar(conn, models.Unidad, filas, True)
+            items = [{"unidad_id": uid, "nombre": NOMBRES_ITEM_UNIDAD[k % len(NOMBRES_ITEM_UNIDAD)], "estado_id": ids_estado[0]}
+                     for uid in ids for k in range(items_unidad)]
+            ids_items = _insertar(conn, models.UnidadItem, items, True)
+            for n, uid in enumerate(ids):
+                items_por_unidad[uid] = ids_items[n * items_unidad:(n + 1) * items_unidad]
+        log(f"torre {torre}: {len(ids)} unidades, {len(ids_items)} items")
+
+    items_por_zona = {}
+    with engine.begin() as conn:
+        ids = _insertar(conn, models.ZonaComun, [
+            {"nombre": f"Zona {z + 1}", "ubicacion": f"Piso {rnd.randint(1, pisos)}", "tipo": rnd.choice(TIPOS_ZONA)}
+            for z in range(zonas)
+        ], True)
+        items = [{"zona_id": zid, "nombre": NOMBRES_ITEM_ZONA[k % len(NOMBRES_ITEM_ZONA)], "estado_id": ids_estado[0]}
+                 for zid in ids for k in range(items_zona)]
+        ids_items = _insertar(conn, models.ZonaItem, items, True)
+        for n, zid in enumerate(ids):
+            items_por_zona[zid] = ids_items[n * items_zona:(n + 1) * items_zona]
+    log(f"{zonas} zonas, {len(items_por_zona) * items_zona} items de zona")
+
+    # Historial de inspecciones con detalles para cada item (mismas claves en cada fila del executemany)
+    inicio = datetime.utcnow() - timedelta(days=365 * anios)
+    total_segundos = 365 * anios * 24 * 3600
+    inspectores = [f"inspector{i}" for i in range(1, 21)]
+    objetivos = [("unidad_id", ch_unidad, uid, items, "unidad_item_id") for uid, items in items_por_unidad.items()]
+    objetivos += [("zona_id", ch_zona, zid, items, "zona_item_id") for zid, items in items_por_zona.items()]
+    n_ins = n_det = 0
+    for i in range(0, len(objetivos), 500):
+        with engine.begin() as conn:
+            inspecciones, destinos = [], []
+            for campo, ch, oid, items, campo_item in objetivos[i:i + 500]:
+                for _ in range(anios * inspecciones_por_anio):
+                    fecha = inicio + timedelta(seconds=rnd.randrange(total_segundos))
+                    inspecciones.append({"fecha": fecha, "inspector": rnd.choice(inspectores), "checklist_id": ch,
+                                         "unidad_id": None, "zona_id": None, campo: oid})
+                    destinos.append((items, campo_item))
+            ids = _insertar(conn, models.Inspeccion, inspecciones, True)
+            detalles = []
+            for ins_id, (items, campo_item) in zip(ids, destinos):
+                estados_sorteados = rnd.choices(ids_estado, probabilidades, k=len(items))
+                for item_id, est in zip(items, estados_sorteados):
+                    detalles.append({
+                        "inspeccion_id": ins_id, "unidad_item_id": None, "zona_item_id": None,
+                        campo_item: item_id, "estado_id": est,
+                        "observacion": rnd.choice(OBSERVACIONES) if est != ids_estado[0] else None,
+                    })
+            _insertar(conn, models.InspeccionDetalle, detalles)
+            n_ins += len(ids)
+            n_det += len(detalles)
+        log(f"{n_ins} inspecciones, {n_det} detalles")
+
+    # Los detalles se insertaron por fuera de la API: proyectar el estado actual y los resúmenes
+    with engine.begin() as conn:
+        backfill(conn)
+        reconstruir(conn)
+    log("estado actual de items y resúmenes reconstruidos")
+    return {"unidades": len(items_por_unidad), "zonas": len(items_por_zona), "inspecciones": n_ins, "detalles": n_det}
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--db", help="URL de la BD destino (por defecto DATABASE_URL)")
+    parser.add_argument("--torres", type=int, default=50)
+    parser.add_argument("--pisos", type=int, default=30)
+    parser.add_argument("--unidades-por-piso", type=int, default=10)
+    parser.add_argument("--items", type=int, default=20, help="Items por unidad")
+    parser.add_argument("--zonas", type=int, default=2000)
+    parser.add_argument("--items-zona", type=int, default=10)
+    parser.add_argument("--anios", type=int, default=3, help="Años de historial de inspecciones")
+    parser.add_argument("--inspecciones-por-anio", type=int, default=2)
+    parser.add_argument("--semilla", type=int, default=42)
+    args = parser.parse_args(argv)
+    if args.db:
+        os.environ["DATABASE_URL"] = args.db
+
+    from app.database import engine
+
+    resumen = generar(
+        engine, args.torres, args.pisos, args.unidades_por_piso, args.items, args.zonas, args.items_zona,
+        args.anios, args.inspecciones_por_anio, args.semilla,
+    )
+    print(resumen)
+
+if __name__ == "__main__":
+    main()
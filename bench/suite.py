@@ -0,0 +1,361 @@
+"""Suite de rendimiento repetible sobre las rutas de app/main.py.
+
+    # 1) datos sintéticos
+    python -m bench.generar --db sqlite:///./bench.db
+
+    # 2) medir en proceso (TestClient) y por HTTP (uvicorn) y guardar la línea base
+    python -m bench.suite --db ./bench.db --modo ambos --guardar
+
+    # 3) en cada cambio: compara contra bench/baseline.json y sale con código 1 si hay regresión
+    python -m bench.suite --db ./bench.db --modo ambos
+
+Por escenario reporta rps, p50/p95/p99 y consultas SQL por solicitud (leídas de la cabecera
+Server-Timing, así que requiere METRICS_ENABLED=1, el valor por defecto). Cada corrida trabaja sobre
+una copia temporal de la BD para que los escenarios POST no cambien los datos de la siguiente.
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import re
+import shutil
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import httpx
+
+from .carga import _levantar, _percentil
+
+BASELINE = Path(__file__).with_name("baseline.json")
+_CONSULTAS = re.compile(r'desc="(\d+) consultas"')
+
+# nombre, método, plantilla de ruta, cuerpo (función de la muestra o None)
+ESCENARIOS = [
+    ("home", "GET", "/", None),
+    ("estados", "GET", "/api/v1/catalogos/estados", None),
+    ("categorias", "GET", "/api/v1/catalogos/categorias", None),
+    ("articulos", "GET", "/api/v1/articulos", None),
+    ("unidades", "GET", "/api/v1/unidades?limit=100", None),
+    ("unidades_campos", "GET", "/api/v1/unidades?limit=100&fields=id,torre,piso,numero", None),
+    ("unidad", "GET", "/api/v1/unidades/{unidad}", None),
+    ("unidad_items", "GET", "/api/v1/unidades/{unidad}/items", None),
+    ("zonas", "GET", "/api/v1/zonas?limit=100", None),
+    ("zona", "GET", "/api/v1/zonas/{zona}", None),
+    ("zona_items", "GET", "/api/v1/zonas/{zona}/items", None),
+    ("inspeccion", "GET", "/api/v1/inspecciones/{inspeccion}", None),
+    ("pendientes", "GET", "/api/v1/pendientes?limit=100", None),
+    ("pendientes_torre", "GET", "/api/v1/pendientes?torre={torre}&severidad_min=3&limit=100", None),
+    ("pendientes_historico", "GET", "/api/v1/pendientes?historico=true&limit=100", None),
+    ("resumen", "GET", "/api/v1/reportes/resumen", None),
+    ("resumen_torre", "GET", "/api/v1/reportes/resumen/unidades?torre={torre}", None),
+    ("resumen_zonas", "GET", "/api/v1/reportes/resumen/zonas?severidad_min=4", None),
+    ("buscar", "GET", "/api/v1/buscar?q=fuga", None),
+    ("buscar_torre", "GET", "/api/v1/buscar?q=fuga&torre={torre}&tipo=observacion", None),
+    ("export_unidad", "GET", "/api/v1/export/inspecciones?unidad_id={unidad}", None),
+    ("crear_articulo", "POST", "/api/v1/articulos", lambda m: {"nombre": "bench", "precio": 1}),
+    ("crear_unidad", "POST", "/api/v1/unidades",
+     lambda m: {"torre": "BENCH", "piso": 1, "numero": f"{time.time_ns()}-{random.random()}"}),
+    ("crear_item", "POST", "/api/v1/unidades/{unidad}/items", lambda m: {"nombre": "Item bench"}),
+    ("crear_inspeccion", "POST", "/api/v1/inspecciones",
+     lambda m: {"inspector": "bench", "checklist_id": m["checklist"], "unidad_id": m["unidad"]}),
+    ("detalle", "POST", "/api/v1/inspecciones/{inspeccion}/detalles",
+     lambda m: {"unidad_item_id": m["item"], "estado_id": m["estado"]}),
+    ("detalles_batch", "POST", "/api/v1/inspecciones/{inspeccion}/detalles:batch",
+     lambda m: {"detalles": [{"unidad_item_id": i, "estado_id": m["estado"]} for i in m["items"]]}),
+    ("instanciar", "POST", "/api/v1/inspecciones:instanciar",
+     lambda m: {"checklist_id": m["checklist"], "inspector": "bench", "unidad_ids": [m["unidad"]]}),
+    ("metrics", "GET", "/metrics", None),
+    ("seed", "POST", "/api/v1/catalogos/seed", None),
+    ("articulo", "GET", "/api/v1/articulos/{articulo}", None),
+    ("actualizar_articulo", "PUT", "/api/v1/articulos/{articulo}", lambda m: {"nombre": "bench", "precio": 2}),
+    ("eliminar_articulo", "DELETE", "/api/v1/articulos/{articulo_borrable}", None),
+    ("crear_zona", "POST", "/api/v1/zonas", lambda m: {"nombre": f"BENCH {time.time_ns()}", "tipo": "bench"}),
+    ("crear_item_zona", "POST", "/api/v1/zonas/{zona}/items", lambda m: {"nombre": "Item bench"}),
+    ("crear_checklist", "POST", "/api/v1/checklists", lambda m: {"nombre": "bench", "ambito": "UNIDAD"}),
+    ("crear_item_checklist", "POST", "/api/v1/checklists/{checklist}/items", lambda m: {"texto": "¿Funciona?"}),
+    ("inspecciones", "GET", "/api/v1/inspecciones?limit=100", None),
+    ("importar", "POST", "/api/v1/importar/{importable}?formato=csv",
+     lambda m: "torre,piso,numero,item\nBENCH,1,%s,Cocina\n" % time.time_ns()),
+    ("sync", "GET", "/api/v1/sync?limit=500", None),
+    ("sync_push", "POST", "/api/v1/sync/inspecciones",
+     lambda m: {"inspecciones": [{
+         "clave_cliente": f"bench-{time.time_ns()}-{random.random()}", "inspector": "bench",
+         "checklist_id": m["checklist"], "unidad_id": m["unidad"],
+         "detalles": [{"unidad_item_id": m["item"], "estado_id": m["estado"]}],
+     }]}),
+    ("crear_trabajo", "POST", "/api/v1/trabajos", lambda m: {"tipo": "reporte_anual", "parametros": {"anio": 2000}}),
+    ("trabajo", "GET", "/api/v1/trabajos/{trabajo}", None),
+    ("trabajo_resultado", "GET", "/api/v1/trabajos/{trabajo}/resultado", None),
+]
+_PARAMETRO = re.compile(r"\{[^}]+\}")
+
+def rutas_sin_escenario(app) -> list:
+    """(método, ruta) de app sin escenario en ESCENARIOS: la suite tiene que recorrerlas todas."""
+    from fastapi.routing import APIRoute
+
+    cubiertas = {(metodo, _PARAMETRO.sub("{}", plantilla.split("?")[0])) for _, metodo, plantilla, _ in ESCENARIOS}
+    return sorted(
+        (metodo, ruta.path)
+        for ruta in app.routes if isinstance(ruta, APIRoute)
+        for metodo in ruta.methods
+        if (metodo, _PARAMETRO.sub("{}", ruta.path)) not in cubiertas
+    )
+
+class Consumibles:
+    """Ids que se usan una sola vez (DELETE): cada formato en una plantilla toma el siguiente."""
+
+    def __init__(self, ids):
+        self._ids = iter(ids)
+
+    def __format__(self, spec) -> str:
+        return str(next(self._ids, 0))
+
+def _preparar_fijos(engine, consumibles: int) -> dict:
+    # Artículos y un trabajo terminado con su archivo: la BD generada no los trae
+    import uuid
+    from datetime import datetime, timedelta
+
+    from sqlalchemy import insert
+
+    from app import models as m
+
+    ruta = os.path.join(os.path.dirname(engine.url.database), "resultado-bench.json")
+    Path(ruta).write_text("{}")
+    trabajo = uuid.uuid4().hex
+    with engine.begin() as conn:
+        articulo = conn.execute(insert(m.Articulo).values(nombre="bench", precio=1).returning(m.Articulo.id)).scalar()
+        borrables = conn.execute(
+            insert(m.Articulo).returning(m.Articulo.id, sort_by_parameter_order=True),
+            [{"nombre": "bench", "precio": 1}] * consumibles,
+        ).scalars().all() if consumibles else []
+        ahora = datetime.utcnow()
+        conn.execute(insert(m.Trabajo).values(
+            id=trabajo, tipo="reporte_anual", parametros={"anio": 1999}, clave=f"bench-{trabajo}", estado="terminado",
+            creado_en=ahora, terminado_en=ahora, expira_en=ahora + timedelta(days=1),
+            archivo=ruta, media_type="application/json", filas=0, bytes=2,
+        ))
+    return {
+        "articulo": articulo, "articulo_borrable": Consumibles(borrables), "trabajo": trabajo, "importable": "unidades",
+    }
+
+def cargar_muestra(engine, n: int = 200, semilla: int = 7) -> dict:
+    """Ids reales de la BD para parametrizar las rutas (inspecciones de unidad con sus items)."""
+    from sqlalchemy import func, select
+
+    from app import models as m
+
+    rnd = random.Random(semilla)
+    with engine.connect() as conn:
+        detalles = conn.execute(select(func.count()).select_from(m.InspeccionDetalle)).scalar()
+        estado = conn.execute(select(m.CatalogoEstado.id).order_by(m.CatalogoEstado.orden_severidad)).scalars().first()
+        filas = conn.execute(
+            select(m.Inspeccion.id, m.Inspeccion.checklist_id, m.Unidad.id, m.Unidad.torre)
+            .join(m.Unidad, m.Unidad.id == m.Inspeccion.unidad_id)
+            .order_by(func.random()).limit(n)
+        ).all()
+        zonas = conn.execute(select(m.ZonaComun.id).order_by(func.random()).limit(n)).scalars().all()
+        muestras = []
+        for ins_id, checklist, unidad, torre in filas:
+            items = conn.execute(select(m.UnidadItem.id).where(m.UnidadItem.unidad_id == unidad)).scalars().all()
+            if not items:
+                continue
+            muestras.append({
+                "inspeccion": ins_id, "checklist": checklist, "unidad": unidad, "torre": torre,
+                "items": items, "item": rnd.choice(items), "zona": rnd.choice(zonas) if zonas else 0, "estado": estado,
+            })
+    if not muestras or estado is None:
+        raise SystemExit("La BD no tiene inspecciones de unidad: genera datos con python -m bench.generar")
+    return {"detalles": detalles, "muestras": muestras}
+
+def _peticion(escenario, muestra):
+    # -> método, ruta y argumentos de httpx (JSON, o texto CSV para la importación)
+    _, metodo, plantilla, cuerpo = escenario
+    valor = cuerpo(muestra) if cuerpo else None
+    if isinstance(valor, str):
+        return metodo, plantilla.format(**muestra), {"content": valor.encode(), "headers": {"content-type": "text/csv"}}
+    return metodo, plantilla.format(**muestra), {"json": valor}
+
+def _consultas(resp) -> int:
+    coincidencia = _CONSULTAS.search(resp.headers.get("server-timing", ""))
+    return int(coincidencia.group(1)) if coincidencia else -1
+
+def _resumen(latencias, consultas, errores, total) -> dict:
+    return {
+        "peticiones": len(latencias),
+        "rps": len(latencias) / total if total else 0.0,
+        "p50_ms": _percentil(latencias, 50) * 1000,
+        "p95_ms": _percentil(latencias, 95) * 1000,
+        "p99_ms": _percentil(latencias, 99) * 1000,
+        "consultas": max(consultas) if consultas else -1,
+        "errores": errores,
+    }
+
+# -------------------------
+# Ejecutores
+# -------------------------
+def en_proceso(escenarios, muestra: dict, iteraciones: int) -> dict:
+    from fastapi.testclient import TestClient
+
+    from app.main import app
+
+    resultados = {}
+    with TestClient(app) as c:
+        for esc in escenarios:
+            latencias, consultas, errores = [], [], 0
+            inicio = time.perf_counter()
+            for k in range(iteraciones):
+                metodo, ruta, cuerpo = _peticion(esc, muestra["muestras"][k % len(muestra["muestras"])])
+                t0 = time.perf_counter()
+                resp = c.request(metodo, ruta, **cuerpo)
+                latencias.append(time.perf_counter() - t0)
+                consultas.append(_consultas(resp))
+                errores += resp.status_code >= 400
+            resultados[esc[0]] = _resumen(latencias, consultas, errores, time.perf_counter() - inicio)
+    return resultados
+
+async def _http(url: str, escenarios, muestra: dict, iteraciones: int, clientes: int) -> dict:
+    resultados = {}
+    limites = httpx.Limits(max_connections=clientes, max_keepalive_connections=clientes)
+    async with httpx.AsyncClient(base_url=url, limits=limites, timeout=120) as c:
+        for esc in escenarios:
+            latencias, consultas, errores = [], [], [0]
+            pendientes = iter(range(iteraciones))
+
+            async def trabajador():
+                for k in pendientes:
+                    metodo, ruta, cuerpo = _peticion(esc, muestra["muestras"][k % len(muestra["muestras"])])
+                    t0 = time.perf_counter()
+                    try:
+                        resp = await c.request(metodo, ruta, **cuerpo)
+                    except httpx.HTTPError:
+                        errores[0] += 1
+                        continue
+                    latencias.append(time.perf_counter() - t0)
+                    consultas.append(_consultas(resp))
+                    errores[0] += resp.status_code >= 400
+
+            inicio = time.perf_counter()
+            await asyncio.gather(*[trabajador() for _ in range(clientes)])
+            resultados[esc[0]] = _resumen(latencias, consultas, errores[0], time.perf_counter() - inicio)
+    return resultados
+
+def por_http(ruta_db: str, escenarios, muestra: dict, iteraciones: int, clientes: int) -> dict:
+    proc, url = _levantar(os.getenv("DB_ASYNC", "0") not in ("", "0"), ruta_db)
+    try:
+        return asyncio.run(_http(url, escenarios, muestra, iteraciones, clientes))
+    finally:
+        proc.terminate()
+        proc.wait()
+
+# -------------------------
+# Línea base y regresiones
+# -------------------------
+def comparar_baseline(actual: dict, baseline: dict, tolerancia: float, margen_ms: float = 0.0) -> list:
+    """Regresión = p95 peor que baseline * (1 + tolerancia) + margen o más consultas por solicitud."""
+    regresiones = []
+    for modo, escenarios in actual.items():
+        for nombre, r in escenarios.items():
+            base = baseline.get(modo, {}).get(nombre)
+            if base is None:
+                continue
+            if r["p95_ms"] > base["p95_ms"] * (1 + tolerancia) + margen_ms:
+                regresiones.append(
+                    f"{modo}/{nombre}: p95 {r['p95_ms']:.1f} ms > {base['p95_ms']:.1f} ms (+{tolerancia:.0%} +{margen_ms:g} ms)"
+                )
+            if base["consultas"] >= 0 and r["consultas"] > base["consultas"]:
+                regresiones.append(f"{modo}/{nombre}: {r['consultas']} consultas por solicitud > {base['consultas']}")
+            if r["errores"] > base.get("errores", 0):
+                regresiones.append(f"{modo}/{nombre}: {r['errores']} errores > {base.get('errores', 0)}")
+    return regresiones
+
+def _imprimir(modo: str, resultados: dict):
+    print(f"\n[{modo}]")
+    print(f"{'escenario':<22}{'n':>6}{'rps':>9}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'consultas':>11}{'errores':>9}")
+    for nombre, r in resultados.items():
+        print(f"{nombre:<22}{r['peticiones']:>6}{r['rps']:>9.1f}{r['p50_ms']:>9.1f}{r['p95_ms']:>9.1f}"
+              f"{r['p99_ms']:>9.1f}{r['consultas']:>11}{r['errores']:>9}")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--db", required=True, help="Archivo SQLite con los datos (p.ej. generado con bench.generar)")
+    parser.add_argument("--modo", choices=["proceso", "http", "ambos"], default="proceso")
+    parser.add_argument("--iteraciones", type=int, default=200, help="Solicitudes por escenario")
+    parser.add_argument("--clientes", type=int, default=10, help="Concurrencia en modo http")
+    parser.add_argument("--escenarios", help="Lista separada por comas (por defecto todos)")
+    parser.add_argument("--solo-lectura", action="store_true", help="Omite los escenarios POST")
+    parser.add_argument("--baseline", type=Path, default=BASELINE)
+    parser.add_argument("--guardar", action="store_true", help="Guarda los resultados como nueva línea base")
+    parser.add_argument("--tolerancia", type=float, default=0.25, help="Margen relativo sobre el p95 de la línea base")
+    parser.add_argument("--margen-ms", type=float, default=5.0, help="Margen absoluto (evita falsos positivos en rutas de pocos ms)")
+    args = parser.parse_args(argv)
+
+    original = os.path.abspath(args.db)
+    tmp = tempfile.mkdtemp(prefix="bench-")
+    try:
+        ruta_db = os.path.join(tmp, os.path.basename(original))
+        shutil.copyfile(original, ruta_db)
+        return _correr(args, original, ruta_db)
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+
+def _correr(args, original: str, ruta_db: str) -> int:
+    os.environ["DATABASE_URL"] = f"sqlite:///{ruta_db}"
+    from app.database import engine
+    from app.main import app
+    from app.migraciones import migrar
+
+    faltantes = rutas_sin_escenario(app)
+    if faltantes:
+        for metodo, ruta in faltantes:
+            print(f"Ruta sin escenario: {metodo} {ruta}")
+        return 1
+
+    escenarios = ESCENARIOS
+    if args.escenarios:
+        nombres = set(args.escenarios.split(","))
+        escenarios = [e for e in ESCENARIOS if e[0] in nombres]
+    if args.solo_lectura:
+        escenarios = [e for e in escenarios if e[1] == "GET"]
+
+    # Los fijos de la muestra se insertan antes de levantar la app: la copia ya tiene que estar al día
+    migrar(engine)
+    muestra = cargar_muestra(engine)
+    # Cada modo borra artículos distintos
+    fijos = _preparar_fijos(engine, args.iteraciones * (2 if args.modo == "ambos" else 1))
+    muestra["muestras"] = [{**fijos, **m} for m in muestra["muestras"]]
+    print(f"BD {original}: {muestra['detalles']} detalles de inspección")
+
+    actual = {}
+    if args.modo in ("proceso", "ambos"):
+        actual["proceso"] = en_proceso(escenarios, muestra, args.iteraciones)
+        _imprimir("proceso", actual["proceso"])
+    if args.modo in ("http", "ambos"):
+        actual["http"] = por_http(ruta_db, escenarios, muestra, args.iteraciones, args.clientes)
+        _imprimir("http", actual["http"])
+
+    if args.guardar:
+        anterior = json.loads(args.baseline.read_text()) if args.baseline.exists() else {}
+        anterior.update(actual)
+        anterior["detalles"] = muestra["detalles"]
+        args.baseline.write_text(json.dumps(anterior, indent=2, sort_keys=True) + "\n")
+        print(f"\nLínea base guardada en {args.baseline}")
+        return 0
+
+    if not args.baseline.exists():
+        print("\nSin línea base: usa --guardar para crearla")
+        return 0
+    baseline = json.loads(args.baseline.read_text())
+    if baseline.get("detalles") != muestra["detalles"]:
+        print(f"\nAviso: la línea base se midió con {baseline.get('detalles')} detalles, esta BD tiene {muestra['detalles']}")
+    regresiones = comparar_baseline(actual, baseline, args.tolerancia, args.margen_ms)
+    for r in regresiones:
+        print("REGRESIÓN", r)
+    if not regresiones:
+        print("\nSin regresiones frente a la línea base")
+    return 1 if regresiones else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
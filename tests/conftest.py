@@ -0,0 +1,71 @@
+import os
+import shutil
+import tempfile
+from pathlib import Path
+
+import pytest
+
+# Antes de importar app: la configuración y los engines se leen del entorno al importar
+_TMP = tempfile.mkdtemp(prefix="tests-erp-")
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{_TMP}/app.db")
+os.environ.setdefault("JOBS_DIR", f"{_TMP}/trabajos")
+
+from sqlalchemy import create_engine  # noqa: E402
+from sqlalchemy.orm import sessionmaker  # noqa: E402
+
+from app.catalogos import cache_catalogos  # noqa: E402
+from app.migraciones import migrar  # noqa: E402
+
+BD_LEGADA = Path(__file__).resolve().parent.parent / "fastapidb.db"
+
+def pytest_sessionfinish(session, exitstatus):
+    shutil.rmtree(_TMP, ignore_errors=True)
+
+@pytest.fixture
+def bd_legada(tmp_path):
+    """Copia de la BD que se distribuye con el repo (esquema anterior a las migraciones), sin migrar."""
+    ruta = tmp_path / "legada.db"
+    shutil.copyfile(BD_LEGADA, ruta)
+    engine = create_engine(f"sqlite:///{ruta}")
+    yield engine
+    engine.dispose()
+
+@pytest.fixture
+def sesion(bd_legada):
+    """Sesión sobre la BD legada ya migrada (el esquema lo arman las migraciones, no create_all)."""
+    migrar(bd_legada)
+    cache_catalogos.invalidar()
+    db = sessionmaker(autoflush=False, bind=bd_legada)()
+    yield db
+    db.close()
+    cache_catalogos.invalidar()
+
+@pytest.fixture
+def group_commit(bd_legada, monkeypatch):
+    """WRITE_GROUP_COMMIT=1 con el coordinador escribiendo en la BD de la prueba."""
+    from app import escrituras
+    from app.config import settings
+
+    monkeypatch.setattr(settings, "group_commit", True)
+    monkeypatch.setattr(escrituras, "engine", bd_legada)
+    yield escrituras.coordinador
+    escrituras.coordinador.detener()
+
+@pytest.fixture
+def cliente(sesion, bd_legada):
+    """TestClient con las rutas de lectura sobre la BD de la prueba (una sesión nueva por solicitud)."""
+    from fastapi.testclient import TestClient
+
+    from app.database import SessionLocal, get_db_lectura
+    from app.main import app
+
+    def lectura():
+        db = SessionLocal(bind=bd_legada)
+        try:
+            yield db
+        finally:
+            db.close()
+
+    app.dependency_overrides[get_db_lectura] = lectura
+    yield TestClient(app)
+    app.dependency_overrides.clear()
@@ -0,0 +1,84 @@
+from datetime import date, datetime
+
+import pytest
+from fastapi import Response
+from sqlalchemy import event, select
+from sqlalchemy.orm import sessionmaker
+
+from app import models, schemas
+from app.archivo import archivar, preparar
+from app.busqueda import FiltrosBusqueda, buscar, reconstruir_indice
+from app.catalogos import cache_catalogos
+from app.config import settings
+from app.main import crear_inspeccion
+from app.migraciones import migrar
+from app.sincronizacion import ParametrosSync, cambios_desde, recibir_inspecciones
+
+@pytest.fixture
+def con_archivo(bd_legada, tmp_path, monkeypatch):
+    """Sesión sobre la BD legada migrada, con ARCHIVE_DATABASE adjunto como en producción."""
+    ruta = str(tmp_path / "archivo.db")
+    monkeypatch.setattr(settings, "archivo_db", ruta)
+    event.listen(bd_legada, "connect", lambda conn, _: conn.execute("ATTACH DATABASE ? AS archivo", (ruta,)))
+    migrar(bd_legada)
+    preparar(bd_legada)
+    cache_catalogos.invalidar()
+    db = sessionmaker(autoflush=False, bind=bd_legada)()
+    yield db
+    db.close()
+
+def _inspeccion(db, fecha, observacion, clave=None):
+    checklist = db.scalar(select(models.Checklist)) or models.Checklist(nombre="Ronda", ambito=models.AmbitoEnum.UNIDAD)
+    unidad = db.scalar(select(models.Unidad).where(models.Unidad.torre == "R")) or models.Unidad(torre="R", piso=1, numero="101")
+    db.add_all([checklist, unidad])
+    db.flush()
+    item = models.UnidadItem(unidad_id=unidad.id, nombre="Cocina")
+    ins = models.Inspeccion(fecha=fecha, inspector="t", checklist_id=checklist.id, unidad_id=unidad.id, clave_cliente=clave)
+    db.add_all([item, ins])
+    db.flush()
+    det = models.InspeccionDetalle(inspeccion_id=ins.id, unidad_item_id=item.id, estado_id=2, observacion=observacion)
+    db.add(det)
+    db.commit()
+    return ins.id, det.id
+
+def test_archivar_no_es_un_borrado(con_archivo):
+    ins_id, det_id = _inspeccion(con_archivo, datetime(2020, 1, 1), "pared vieja")
+    _inspeccion(con_archivo, datetime.utcnow(), "pared nueva")
+
+    assert archivar(con_archivo, antes_de=date(2021, 1, 1))["inspecciones"] == 1
+    assert con_archivo.get(models.Inspeccion, ins_id) is None
+
+    cambios = cambios_desde(con_archivo, ParametrosSync(since=None, tablas="inspecciones,inspeccion_detalles", limit=1000))
+    assert cambios["cambios"]["inspecciones"]["deletes"] == []
+    assert cambios["cambios"]["inspeccion_detalles"]["deletes"] == []
+    assert ins_id in {f["id"] for f in cambios["cambios"]["inspecciones"]["upserts"]}
+    assert det_id in {f["id"] for f in cambios["cambios"]["inspeccion_detalles"]["upserts"]}
+
+    filtros = FiltrosBusqueda(q="vieja", tipo="observacion", unidad_id=None, zona_id=None, torre=None, limit=5)
+    assert [r["inspeccion_id"] for r in buscar(con_archivo, filtros)["resultados"]] == [ins_id]
+    # Reconstruir el índice también recorre el archivo
+    reconstruir_indice(con_archivo.connection())
+    con_archivo.commit()
+    assert [(r["inspeccion_id"], r["unidad_id"]) for r in buscar(con_archivo, filtros)["resultados"]] == [
+        (ins_id, con_archivo.scalar(select(models.Unidad.id).where(models.Unidad.torre == "R")))
+    ]
+
+def test_clave_cliente_sigue_siendo_idempotente_despues_de_archivar(con_archivo):
+    ins_id, _ = _inspeccion(con_archivo, datetime(2020, 1, 1), None, clave="abc")
+    _inspeccion(con_archivo, datetime.utcnow(), None)
+    archivar(con_archivo, antes_de=date(2021, 1, 1))
+    checklist_id = con_archivo.scalar(select(models.Checklist.id))
+    unidad_id = con_archivo.scalar(select(models.Unidad.id).where(models.Unidad.torre == "R"))
+
+    push = schemas.SyncPush(inspecciones=[{
+        "clave_cliente": "abc", "inspector": "t", "checklist_id": checklist_id, "unidad_id": unidad_id, "detalles": [],
+    }])
+    assert recibir_inspecciones(con_archivo, push)["resultados"] == [
+        {"clave_cliente": "abc", "inspeccion_id": ins_id, "creada": False}
+    ]
+
+    response = Response()
+    payload = schemas.InspeccionCreate(inspector="t", checklist_id=checklist_id, unidad_id=unidad_id, clave_cliente="abc")
+    assert crear_inspeccion(payload, response, con_archivo).id == ins_id
+    assert response.status_code == 200
+    assert con_archivo.scalar(select(models.Inspeccion.id).where(models.Inspeccion.clave_cliente == "abc")) is None
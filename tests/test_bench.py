@@ -0,0 +1,5 @@
+from app.main import app
+from bench.suite import rutas_sin_escenario
+
+def test_toda_ruta_tiene_escenario():
+    assert rutas_sin_escenario(app) == []
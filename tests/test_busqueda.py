@@ -0,0 +1,22 @@
+from app import models
+from app.busqueda import FiltrosBusqueda, buscar
+
+def test_snippet_escapa_el_texto_del_usuario(sesion):
+    checklist = models.Checklist(nombre="Ronda", ambito=models.AmbitoEnum.UNIDAD)
+    unidad = models.Unidad(torre="B", piso=1, numero="101")
+    sesion.add_all([checklist, unidad])
+    sesion.flush()
+    item = models.UnidadItem(unidad_id=unidad.id, nombre="Cocina")
+    ins = models.Inspeccion(inspector="t", checklist_id=checklist.id, unidad_id=unidad.id)
+    sesion.add_all([item, ins])
+    sesion.flush()
+    sesion.add(models.InspeccionDetalle(
+        inspeccion_id=ins.id, unidad_item_id=item.id, estado_id=2,
+        observacion='<img src=x onerror="alert(1)"> fuga & goteo',
+    ))
+    sesion.commit()
+
+    filtros = FiltrosBusqueda(q="fuga", tipo="observacion", unidad_id=None, zona_id=None, torre=None, limit=5)
+    resultado = buscar(sesion, filtros)["resultados"][0]
+    assert resultado["snippet"] == '&lt;img src=x onerror=&quot;alert(1)&quot;&gt; <mark>fuga</mark> &amp; goteo'
+    assert resultado["texto"] == '<img src=x onerror="alert(1)"> fuga & goteo'
@@ -0,0 +1,38 @@
+from app import models
+from app.database import SessionLocal
+from app.pagination import NDJSON
+
+ESTADOS = "/api/v1/catalogos/estados"
+
+def test_if_none_match_devuelve_304(cliente):
+    etag = cliente.get(ESTADOS).headers["etag"]
+
+    r = cliente.get(ESTADOS, headers={"If-None-Match": etag})
+    assert r.status_code == 304
+    assert (r.headers["etag"], r.headers["vary"]) == (etag, "Accept")
+    assert r.content == b""
+
+def test_etag_por_representacion(cliente):
+    base = cliente.get(ESTADOS).headers["etag"]
+    variantes = {
+        cliente.get(ESTADOS, params={"limit": 1}).headers["etag"],
+        cliente.get(ESTADOS, params={"limit": 1, "after": cliente.get(ESTADOS, params={"limit": 1}).json()["next_cursor"]}).headers["etag"],
+        cliente.get(ESTADOS, headers={"Accept": NDJSON}).headers["etag"],
+        cliente.get("/api/v1/catalogos/categorias").headers["etag"],
+    }
+    assert len(variantes | {base}) == 5
+    # El ETag de la lista completa no valida una página ni el NDJSON
+    assert cliente.get(ESTADOS, params={"limit": 1}, headers={"If-None-Match": base}).status_code == 200
+    assert cliente.get(ESTADOS, headers={"Accept": NDJSON, "If-None-Match": base}).status_code == 200
+
+def test_commit_de_catalogo_invalida_el_etag(cliente, bd_legada):
+    etag = cliente.get(ESTADOS).headers["etag"]
+
+    with SessionLocal(bind=bd_legada) as db:
+        db.add(models.CatalogoEstado(nombre="Observado", orden_severidad=2))
+        db.commit()
+
+    r = cliente.get(ESTADOS, headers={"If-None-Match": etag})
+    assert r.status_code == 200
+    assert r.headers["etag"] != etag
+    assert "Observado" in [e["nombre"] for e in r.json()["items"]]
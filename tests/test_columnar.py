@@ -0,0 +1,54 @@
+import msgpack
+import pytest
+
+from app import models
+from app.columnar import COLUMNAR_JSON, COLUMNAR_MSGPACK, tabla
+
+def _decodificar(t: dict) -> list:
+    # Lo que haría un cliente: columnas -> filas, resolviendo diccionarios y offsets de relaciones
+    filas = [{} for _ in range(t["n"])]
+    for nombre, col in t["columnas"].items():
+        if isinstance(col, dict) and "offsets" in col:
+            hijos, offsets = _decodificar(col), col["offsets"]
+            valores = [hijos[offsets[k]:offsets[k + 1]] for k in range(t["n"])]
+        elif isinstance(col, dict):
+            valores = [None if i is None else col["valores"][i] for i in col["indices"]]
+        else:
+            valores = col
+        for fila, v in zip(filas, valores):
+            fila[nombre] = v
+    return filas
+
+def test_tabla_ida_y_vuelta():
+    filas = [
+        {"id": 1, "torre": "A", "nota": None, "items": [{"nombre": "Cocina"}, {"nombre": "Baño"}]},
+        {"id": 2, "torre": "A", "nota": "x", "items": []},
+        {"id": 3, "torre": "B", "nota": None, "items": [{"nombre": "Cocina"}]},
+        {"id": 4, "torre": "A", "nota": None, "items": [{"nombre": "Cocina"}]},
+    ]
+    t = tabla(filas, ["id", "torre", "nota"], {"items": ["nombre"]})
+
+    assert t["columnas"]["torre"] == {"valores": ["A", "B"], "indices": [0, 0, 1, 0]}
+    assert t["columnas"]["items"]["offsets"] == [0, 2, 2, 3, 4]
+    assert _decodificar(t) == filas
+
+@pytest.mark.parametrize("accept", [COLUMNAR_JSON, COLUMNAR_MSGPACK])
+def test_listado_columnar_decodifica_igual_que_json(cliente, sesion, accept):
+    unidades = [models.Unidad(torre="C", piso=p, numero=n) for p, n in ((1, "101"), (1, "102"), (2, "201"))]
+    sesion.add_all(unidades)
+    sesion.flush()
+    sesion.add_all([
+        models.UnidadItem(unidad_id=unidades[0].id, nombre="Cocina", estado_id=2),
+        models.UnidadItem(unidad_id=unidades[0].id, nombre="Baño"),
+        models.UnidadItem(unidad_id=unidades[2].id, nombre="Cocina", estado_id=1),
+    ])
+    sesion.commit()
+    params = {"torre": "C", "include": "items", "limit": 2}
+
+    esperado = cliente.get("/api/v1/unidades", params=params, headers={"Accept": "application/json"}).json()
+    r = cliente.get("/api/v1/unidades", params=params, headers={"Accept": accept})
+
+    assert r.headers["content-type"] == accept
+    documento = msgpack.unpackb(r.content) if accept == COLUMNAR_MSGPACK else r.json()
+    assert _decodificar(documento["items"]) == esperado["items"]
+    assert documento["next_cursor"] == esperado["next_cursor"]
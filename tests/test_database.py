@@ -0,0 +1,66 @@
+import pytest
+from sqlalchemy import text
+from sqlalchemy.exc import IntegrityError, OperationalError
+
+from app.config import settings
+from app.database import _crear_engine, _url_lectura
+from app.migraciones import migrar
+
+_INSPECCION = text("INSERT INTO inspecciones (fecha, inspector, checklist_id) VALUES ('2024-01-01', 't', 9999)")
+
+@pytest.fixture
+def url(bd_legada):
+    migrar(bd_legada)
+    return bd_legada.url
+
+def _pragmas(conn, *nombres):
+    return {n: conn.exec_driver_sql(f"PRAGMA {n}").scalar() for n in nombres}
+
+def test_perfil_de_pragmas(url):
+    eng = _crear_engine(url, 1)
+    try:
+        with eng.connect() as conn:
+            assert _pragmas(conn, "journal_mode", "synchronous", "busy_timeout", "cache_size", "foreign_keys", "query_only") == {
+                "journal_mode": "wal",
+                "synchronous": 1,  # NORMAL
+                "busy_timeout": settings.sqlite_busy_timeout_ms,
+                "cache_size": settings.sqlite_cache_size,
+                "foreign_keys": 1,
+                "query_only": 0,
+            }
+    finally:
+        eng.dispose()
+
+def test_foreign_keys_rechaza_referencias_colgantes(url, monkeypatch):
+    # Con el perfil por defecto un checklist_id inexistente ya no se guarda
+    eng = _crear_engine(url, 1)
+    try:
+        with pytest.raises(IntegrityError), eng.begin() as conn:
+            conn.execute(_INSPECCION)
+    finally:
+        eng.dispose()
+
+    # SQLITE_FOREIGN_KEYS=0 devuelve el comportamiento anterior
+    monkeypatch.setattr(settings, "sqlite_foreign_keys", False)
+    eng = _crear_engine(url, 1)
+    try:
+        with eng.begin() as conn:
+            conn.execute(_INSPECCION)
+    finally:
+        eng.dispose()
+
+def test_pool_de_lectura_es_solo_lectura(url):
+    escritor, lector = _crear_engine(url, 1), _crear_engine(_url_lectura(url), 1, solo_lectura=True)
+    try:
+        assert lector.url.query == {"mode": "ro", "uri": "true"}
+        with escritor.begin() as conn:
+            conn.execute(text("INSERT INTO unidades (torre, piso, numero) VALUES ('L', 1, '101')"))
+        with lector.connect() as conn:
+            assert _pragmas(conn, "query_only", "foreign_keys") == {"query_only": 1, "foreign_keys": 1}
+            # Ve lo confirmado por el escritor, pero no puede escribir
+            assert conn.execute(text("SELECT count(*) FROM unidades WHERE torre = 'L'")).scalar() == 1
+            with pytest.raises(OperationalError):
+                conn.execute(text("DELETE FROM unidades"))
+    finally:
+        escritor.dispose()
+        lector.dispose()
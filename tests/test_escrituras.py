@@ -0,0 +1,93 @@
+import threading
+
+import pytest
+from sqlalchemy import create_engine, event, func, select
+from sqlalchemy.exc import IntegrityError, OperationalError
+
+from app import escrituras, models, schemas
+from app.escrituras import Coordinador
+
+def _unidad(numero: str):
+    def crear(s):
+        unidad = models.Unidad(torre="G", piso=1, numero=numero)
+        s.add(unidad)
+        return unidad
+    return crear
+
+def _en_paralelo(coordinador, *operaciones):
+    # Cada operación desde su hilo, como solicitudes concurrentes -> resultado o excepción
+    salida = [None] * len(operaciones)
+
+    def correr(k, crear):
+        try:
+            salida[k] = coordinador.enviar(crear, schemas.UnidadOut)
+        except Exception as e:
+            salida[k] = e
+
+    hilos = [threading.Thread(target=correr, args=(k, op)) for k, op in enumerate(operaciones)]
+    for h in hilos:
+        h.start()
+    for h in hilos:
+        h.join()
+    return salida
+
+@pytest.fixture
+def coordinador(sesion, bd_legada, monkeypatch):
+    monkeypatch.setattr(escrituras, "engine", bd_legada)
+    coord = Coordinador(max_filas=3, espera_ms=500)
+    lotes = []
+    confirmar = coord._confirmar
+    monkeypatch.setattr(coord, "_confirmar", lambda lote: (lotes.append(len(lote)), confirmar(lote)))
+    coord.lotes = lotes
+    yield coord
+    coord.detener()
+
+def test_error_de_una_operacion_no_afecta_al_resto_del_lote(coordinador, sesion):
+    ok, repetida, otra = _en_paralelo(coordinador, _unidad("101"), _unidad("101"), _unidad("102"))
+
+    assert coordinador.lotes == [3]
+    errores = [r for r in (ok, repetida) if isinstance(r, Exception)]
+    assert len(errores) == 1 and isinstance(errores[0], IntegrityError)
+    assert otra.numero == "102"
+    assert sesion.scalars(select(models.Unidad.numero).where(models.Unidad.torre == "G").order_by(models.Unidad.numero)).all() == ["101", "102"]
+
+def test_fallo_del_lote_llega_a_todas_las_solicitudes(coordinador, tmp_path, monkeypatch):
+    monkeypatch.setattr(escrituras, "engine", create_engine(f"sqlite:///{tmp_path}/no/existe.db"))
+    resultados = _en_paralelo(coordinador, _unidad("201"), _unidad("202"), _unidad("203"))
+
+    assert coordinador.lotes == [3]
+    assert all(isinstance(r, OperationalError) for r in resultados)
+
+def test_commit_del_lote_es_durable(coordinador, bd_legada):
+    # Perfil de la app en cada conexión nueva: WAL + synchronous=NORMAL
+    event.listen(bd_legada, "connect", lambda conn, _: conn.execute("PRAGMA synchronous=NORMAL"))
+    bd_legada.dispose()
+    vistos = []
+
+    def registrar(conn, cursor, sentencia, *_):
+        if sentencia.startswith("BEGIN IMMEDIATE"):
+            vistos.append(conn.exec_driver_sql("PRAGMA synchronous").scalar())
+
+    event.listen(bd_legada, "before_cursor_execute", registrar)
+    try:
+        coordinador.enviar(_unidad("301"), schemas.UnidadOut)
+    finally:
+        event.remove(bd_legada, "before_cursor_execute", registrar)
+    assert vistos == [2]  # FULL
+    with bd_legada.connect() as conn:
+        # La conexión vuelve al pool con el perfil normal
+        assert conn.exec_driver_sql("PRAGMA synchronous").scalar() == 1
+
+def test_detener_confirma_lo_encolado_y_permite_reiniciar(coordinador, sesion):
+    # detener() en cualquier punto de una escritura en curso: la escritura se confirma igual
+    for numero in ("401", "402", "403"):
+        hilo = threading.Thread(target=coordinador.enviar, args=(_unidad(numero), schemas.UnidadOut))
+        hilo.start()
+        coordinador.detener()
+        hilo.join(timeout=5)
+        assert not hilo.is_alive()
+    coordinador.detener()
+    assert coordinador._hilo is None
+    assert sesion.scalars(select(models.Unidad.numero).where(models.Unidad.torre == "G").order_by(models.Unidad.numero)).all() == ["401", "402", "403"]
+    # Una escritura posterior vuelve a levantar el hilo
+    assert coordinador.enviar(_unidad("404"), schemas.UnidadOut).numero == "404"
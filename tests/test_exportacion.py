@@ -0,0 +1,54 @@
+import csv
+import gzip
+import io
+import json
+from datetime import datetime
+
+import pytest
+from sqlalchemy.orm import sessionmaker
+
+from app import database, models
+
+URL = "/api/v1/export/inspecciones"
+RANGO = {"desde": "2024-02-01T00:00:00", "hasta": "2024-03-01T00:00:00"}
+
+@pytest.fixture
+def historial(sesion, bd_legada, monkeypatch):
+    # La exportación abre su propia sesión de lectura
+    monkeypatch.setattr(database, "SessionLectura", sessionmaker(bind=bd_legada))
+    checklist = models.Checklist(nombre="Ronda", ambito=models.AmbitoEnum.UNIDAD)
+    unidad = models.Unidad(torre="E", piso=1, numero="101")
+    sesion.add_all([checklist, unidad])
+    sesion.flush()
+    item = models.UnidadItem(unidad_id=unidad.id, nombre="Cocina")
+    sesion.add(item)
+    ids = {}
+    for mes in (1, 2, 3, 4):
+        ins = models.Inspeccion(fecha=datetime(2024, mes, 1), inspector="t", checklist_id=checklist.id, unidad_id=unidad.id)
+        sesion.add(ins)
+        sesion.flush()
+        sesion.add(models.InspeccionDetalle(inspeccion_id=ins.id, unidad_item_id=item.id, estado_id=2, observacion=f"mes {mes}, ñ"))
+        ids[mes] = ins.id
+    sesion.commit()
+    return ids
+
+def test_csv_y_ndjson_respetan_desde_y_hasta(cliente, historial):
+    r = cliente.get(URL, params=RANGO)
+    assert r.headers["content-type"] == "text/csv; charset=utf-8"
+    filas = list(csv.DictReader(io.StringIO(r.text)))
+    assert [int(f["inspeccion_id"]) for f in filas] == [historial[2], historial[3]]
+    assert (filas[0]["observacion"], filas[0]["estado"]) == ("mes 2, ñ", "Requiere mantenimiento")
+
+    r = cliente.get(URL, params={**RANGO, "formato": "ndjson"})
+    assert r.headers["content-type"] == "application/x-ndjson"
+    assert [json.loads(l)["inspeccion_id"] for l in r.text.splitlines()] == [historial[2], historial[3]]
+
+@pytest.mark.parametrize("formato", ["csv", "ndjson"])
+def test_comprimir_entrega_gzip_del_mismo_contenido(cliente, historial, formato):
+    plano = cliente.get(URL, params={**RANGO, "formato": formato})
+    r = cliente.get(URL, params={**RANGO, "formato": formato, "comprimir": "true"})
+
+    assert r.headers["content-type"] == "application/gzip"
+    assert r.headers["content-disposition"] == f'attachment; filename="inspecciones.{formato}.gz"'
+    assert "content-encoding" not in r.headers
+    assert gzip.decompress(r.content) == plano.content
@@ -0,0 +1,47 @@
+from contextlib import contextmanager
+
+import pytest
+from sqlalchemy import event
+
+from app import models
+
+@contextmanager
+def _sentencias(engine):
+    vistas = []
+    registrar = lambda conn, cursor, sentencia, *_: vistas.append(sentencia)
+    event.listen(engine, "before_cursor_execute", registrar)
+    try:
+        yield vistas
+    finally:
+        event.remove(engine, "before_cursor_execute", registrar)
+
+@pytest.fixture
+def unidades(sesion):
+    filas = [models.Unidad(torre="F", piso=1, numero=n) for n in ("101", "102", "103")]
+    sesion.add_all(filas)
+    sesion.flush()
+    sesion.add_all([models.UnidadItem(unidad_id=u.id, nombre=n) for u in filas for n in ("Cocina", "Baño")])
+    sesion.commit()
+    return filas
+
+def test_fields_solo_lee_y_devuelve_lo_pedido(cliente, bd_legada, unidades):
+    with _sentencias(bd_legada) as vistas:
+        r = cliente.get("/api/v1/unidades", params={"torre": "F", "fields": "numero"})
+
+    assert r.json()["items"] == [{"numero": "101"}, {"numero": "102"}, {"numero": "103"}]
+    assert len(vistas) == 1
+    # id entra por el cursor keyset; el resto de las columnas no se lee
+    assert "unidades.numero" in vistas[0] and "unidades.piso" not in vistas[0] and "unidad_items" not in vistas[0]
+
+@pytest.mark.parametrize("limit", [1, 3])
+def test_include_items_son_dos_consultas(cliente, bd_legada, unidades, limit):
+    with _sentencias(bd_legada) as vistas:
+        r = cliente.get("/api/v1/unidades", params={"torre": "F", "include": "items", "fields": "id", "limit": limit})
+
+    # Una por la página y un IN por los items, sin importar cuántas unidades traiga
+    assert len(vistas) == 2
+    assert [[i["nombre"] for i in u["items"]] for u in r.json()["items"]] == [["Cocina", "Baño"]] * limit
+
+def test_campos_desconocidos_son_400(cliente, unidades):
+    assert cliente.get("/api/v1/unidades", params={"fields": "clave"}).status_code == 400
+    assert cliente.get("/api/v1/unidades", params={"include": "zonas"}).status_code == 400
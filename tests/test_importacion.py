@@ -0,0 +1,125 @@
+import functools
+import io
+
+import anyio
+import pytest
+from fastapi import HTTPException, Request
+from sqlalchemy import func, inspect, select
+
+from app import models, schemas
+from app import main
+from app.importacion import importar_archivo
+from app.main import crear_unidad, importar
+from app.migraciones import migrar
+
+CSV = """torre,piso,numero,item,observacion
+Q,1,101,Cocina,
+Q,1,101,Baño,
+Q,2,201,Cocina,recién pintada
+"""
+
+def _importar(db, texto=CSV):
+    return importar_archivo(db, io.StringIO(texto), "unidades", "csv")
+
+def test_migraciones_crean_uq_unidad_ref(bd_legada):
+    migrar(bd_legada)
+    indices = {i["name"]: i for i in inspect(bd_legada).get_indexes("unidades")}
+    assert indices["uq_unidad_ref"]["unique"]
+    assert indices["uq_unidad_ref"]["column_names"] == ["torre", "piso", "numero"]
+
+@pytest.mark.parametrize("modo", ["directo", "group_commit"])
+def test_unidad_repetida_es_409(sesion, request, modo):
+    if modo == "group_commit":
+        request.getfixturevalue("group_commit")
+    payload = schemas.UnidadCreate(torre="Q", piso=3, numero="301")
+    assert crear_unidad(payload, sesion).numero == "301"
+    with pytest.raises(HTTPException) as error:
+        crear_unidad(payload, sesion)
+    assert error.value.status_code == 409
+    assert sesion.scalar(select(func.count()).select_from(models.Unidad).where(models.Unidad.torre == "Q")) == 1
+
+def test_migracion_fusiona_unidades_repetidas(bd_legada):
+    with bd_legada.begin() as conn:
+        original = conn.exec_driver_sql("INSERT INTO unidades (torre, piso, numero) VALUES ('Z', 9, '901') RETURNING id").scalar()
+        repetida = conn.exec_driver_sql("INSERT INTO unidades (torre, piso, numero) VALUES ('Z', 9, '901') RETURNING id").scalar()
+        conn.exec_driver_sql(f"INSERT INTO unidad_items (unidad_id, nombre) VALUES ({repetida}, 'Cocina')")
+    migrar(bd_legada)
+    with bd_legada.connect() as conn:
+        U, UI = models.Unidad, models.UnidadItem
+        assert conn.execute(select(U.id).where(U.torre == "Z")).scalars().all() == [original]
+        assert conn.execute(select(UI.unidad_id).where(UI.nombre == "Cocina", UI.unidad_id.in_([original, repetida]))).scalars().all() == [original]
+
+def test_importar_unidades_sobre_bd_migrada(sesion):
+    resumen = _importar(sesion)
+    assert resumen["rechazados"] == 0
+    assert (resumen["insertados"], resumen["items_insertados"]) == (2, 3)
+
+    # Reimportar el mismo archivo no duplica nada (on conflict sobre uq_unidad_ref)
+    resumen = _importar(sesion)
+    assert (resumen["insertados"], resumen["actualizados"], resumen["items_insertados"]) == (0, 0, 0)
+    resumen = _importar(sesion, CSV + "Q,2,201,Balcón,\n")
+    assert (resumen["insertados"], resumen["actualizados"], resumen["items_insertados"]) == (0, 1, 1)
+    assert sesion.scalar(select(func.count()).select_from(models.Unidad).where(models.Unidad.torre == "Q")) == 2
+
+def _inspeccionar(db, item: models.UnidadItem, estado_id: int) -> models.Inspeccion:
+    from app.estado_items import registrar_detalles
+
+    checklist = models.Checklist(nombre="Entrega", ambito=models.AmbitoEnum.UNIDAD)
+    db.add(checklist)
+    db.flush()
+    ins = models.Inspeccion(inspector="test", checklist_id=checklist.id, unidad_id=item.unidad_id)
+    db.add(ins)
+    db.flush()
+    detalle = models.InspeccionDetalle(inspeccion_id=ins.id, unidad_item_id=item.id, estado_id=estado_id)
+    db.add(detalle)
+    db.flush()
+    registrar_detalles(db, ins, [detalle])
+    db.commit()
+    return ins
+
+def test_reimportar_no_pisa_estado_proyectado(sesion):
+    _importar(sesion)
+    cocina = sesion.scalars(select(models.UnidadItem).where(models.UnidadItem.nombre == "Cocina")).first()
+    ins = _inspeccionar(sesion, cocina, estado_id=3)
+    resumen_antes = sesion.execute(select(models.ResumenUnidad.estado_id, models.ResumenUnidad.items).where(models.ResumenUnidad.torre == "Q")).all()
+
+    resumen = _importar(sesion)
+    assert resumen["items_actualizados"] == 0
+    sesion.expire_all()
+    assert (cocina.estado_id, cocina.ultima_inspeccion_id) == (3, ins.id)
+    assert sesion.execute(select(models.ResumenUnidad.estado_id, models.ResumenUnidad.items).where(models.ResumenUnidad.torre == "Q")).all() == resumen_antes
+
+def test_reimportar_solo_cuenta_items_cambiados(sesion):
+    _importar(sesion)
+    resumen = _importar(sesion, CSV.replace("recién pintada", "con humedad"))
+    assert (resumen["actualizados"], resumen["items_actualizados"]) == (1, 1)
+    assert sesion.scalar(select(models.UnidadItem.observacion).where(models.UnidadItem.observacion.is_not(None))) == "con humedad"
+
+def test_importar_procesa_el_cuerpo_a_medida_que_llega(sesion, monkeypatch):
+    monkeypatch.setattr(main, "importar_archivo", functools.partial(importar_archivo, tam_lote=1))
+    cuerpo = CSV.encode()
+    # Bloques de 5 bytes: cortan "ñ" y "é" a la mitad
+    partes = [cuerpo[k:k + 5] for k in range(0, len(cuerpo), 5)]
+    unidades_al_leer = []
+
+    async def recibir():
+        unidades_al_leer.append(sesion.scalar(select(func.count()).select_from(models.Unidad).where(models.Unidad.torre == "Q")))
+        return {"type": "http.request", "body": partes.pop(0), "more_body": bool(partes)}
+
+    request = Request({"type": "http", "method": "POST", "path": "/", "headers": [(b"content-type", b"text/csv")]}, recibir)
+    resumen = anyio.run(importar, "unidades", request, None, sesion)
+
+    assert (resumen["insertados"], resumen["items_insertados"], resumen["rechazados"]) == (2, 3, 0)
+    assert unidades_al_leer[0] == 0 and unidades_al_leer[-1] > 0
+    assert sesion.scalar(select(models.UnidadItem.observacion).where(models.UnidadItem.observacion.is_not(None))) == "recién pintada"
+    assert sesion.scalar(select(func.count()).select_from(models.UnidadItem).where(models.UnidadItem.nombre == "Baño")) == 1
+
+def test_zona_con_nombre_repetido_se_rechaza(sesion):
+    sesion.add_all([models.ZonaComun(nombre="Gimnasio"), models.ZonaComun(nombre="Gimnasio"), models.ZonaComun(nombre="Piscina")])
+    sesion.commit()
+    texto = "nombre,tipo,item\nGimnasio,Deporte,Pesas\nPiscina,Recreación,Bomba\n"
+
+    resumen = importar_archivo(sesion, io.StringIO(texto), "zonas", "csv")
+    assert (resumen["actualizados"], resumen["items_insertados"], resumen["rechazados"]) == (1, 1, 1)
+    assert resumen["errores"][0]["indice"] == 2
+    assert sesion.scalars(select(models.ZonaComun.tipo).where(models.ZonaComun.nombre == "Gimnasio")).all() == [None, None]
@@ -0,0 +1,112 @@
+from datetime import datetime
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from fastapi.testclient import TestClient
+from sqlalchemy import select
+
+from app import models, schemas
+from app.database import get_db_lectura
+from app.inspecciones import instanciar
+from app.main import agregar_detalles_inspeccion_batch, app
+
+def _unidad_con_items(db):
+    checklist = models.Checklist(nombre="Ronda", ambito=models.AmbitoEnum.UNIDAD)
+    unidad = models.Unidad(torre="R", piso=1, numero="101")
+    db.add_all([checklist, unidad])
+    db.flush()
+    con_estado = models.UnidadItem(unidad_id=unidad.id, nombre="Cocina", estado_id=2)
+    sin_estado = models.UnidadItem(unidad_id=unidad.id, nombre="Baño")
+    db.add_all([con_estado, sin_estado])
+    db.commit()
+    return checklist, unidad, con_estado, sin_estado
+
+def test_instanciar_no_inventa_estado(sesion):
+    checklist, unidad, con_estado, sin_estado = _unidad_con_items(sesion)
+    salida = instanciar(sesion, schemas.InspeccionInstanciar(checklist_id=checklist.id, inspector="t", unidad_ids=[unidad.id]))
+
+    assert salida["detalles"] == 1
+    sesion.expire_all()
+    # El item sin estado sigue sin estado ni inspección; en los resúmenes solo cuenta el que tenía estado
+    assert (sin_estado.estado_id, sin_estado.ultima_inspeccion_id) == (None, None)
+    assert con_estado.estado_id == 2
+    resumen = sesion.execute(select(models.ResumenUnidad.estado_id, models.ResumenUnidad.items).where(models.ResumenUnidad.torre == "R")).all()
+    assert resumen == [(2, 1)]
+
+def test_instanciar_con_estado_explicito(sesion):
+    checklist, unidad, con_estado, sin_estado = _unidad_con_items(sesion)
+    salida = instanciar(sesion, schemas.InspeccionInstanciar(checklist_id=checklist.id, inspector="t", unidad_ids=[unidad.id], estado_id=1))
+
+    assert salida["detalles"] == 2
+    sesion.expire_all()
+    assert (sin_estado.estado_id, sin_estado.ultima_inspeccion_id) == (1, salida["inspecciones"][0]["id"])
+    assert con_estado.estado_id == 2
+
+def test_obtener_inspeccion_mismos_bytes_que_jsonable_encoder(sesion):
+    checklist, unidad, _, _ = _unidad_con_items(sesion)
+    salida = instanciar(sesion, schemas.InspeccionInstanciar(checklist_id=checklist.id, inspector="Íñigo", unidad_ids=[unidad.id], estado_id=1))
+    ins_id = salida["inspecciones"][0]["id"]
+    sesion.query(models.InspeccionDetalle).update({"observacion": "baño sin luz ✓"})
+    sesion.commit()
+
+    # Lo que devolvía el handler original, serializado por FastAPI sin response_model
+    ins = sesion.get(models.Inspeccion, ins_id)
+    detalles = sesion.scalars(select(models.InspeccionDetalle).where(models.InspeccionDetalle.inspeccion_id == ins_id)).all()
+    esperado = JSONResponse(jsonable_encoder({
+        "inspeccion": schemas.InspeccionOut.model_validate(ins).model_dump(),
+        "detalles": [schemas.InspeccionDetalleOut.model_validate(d).model_dump() for d in detalles],
+    })).body
+
+    app.dependency_overrides[get_db_lectura] = lambda: sesion
+    try:
+        r = TestClient(app).get(f"/api/v1/inspecciones/{ins_id}")
+    finally:
+        app.dependency_overrides.clear()
+    assert r.status_code == 200
+    assert r.content == esperado
+
+def test_listar_inspecciones_hasta_inclusivo(sesion):
+    checklist, unidad, _, _ = _unidad_con_items(sesion)
+    ins = models.Inspeccion(fecha=datetime(2024, 5, 1, 12, 0), inspector="t", checklist_id=checklist.id, unidad_id=unidad.id)
+    sesion.add(ins)
+    sesion.commit()
+
+    app.dependency_overrides[get_db_lectura] = lambda: sesion
+    try:
+        r = TestClient(app).get("/api/v1/inspecciones", params={"hasta": "2024-05-01T12:00:00"})
+    finally:
+        app.dependency_overrides.clear()
+    # Mismo criterio que el reporte de pendientes, la exportación y los trabajos
+    assert [i["inspeccion"]["id"] for i in r.json()["items"]] == [ins.id]
+
+def test_batch_reporta_errores_por_indice(sesion):
+    checklist, unidad, cocina, bano = _unidad_con_items(sesion)
+    otra = models.Unidad(torre="R", piso=2, numero="201")
+    sesion.add(otra)
+    sesion.flush()
+    ajeno = models.UnidadItem(unidad_id=otra.id, nombre="Cocina")
+    ins = models.Inspeccion(inspector="t", checklist_id=checklist.id, unidad_id=unidad.id)
+    sesion.add_all([ajeno, ins])
+    sesion.commit()
+    payload = schemas.InspeccionDetalleBatch(detalles=[
+        {"unidad_item_id": cocina.id, "estado_id": 1},
+        {"unidad_item_id": cocina.id, "zona_item_id": 1, "estado_id": 1},
+        {"unidad_item_id": ajeno.id, "estado_id": 1},
+        {"unidad_item_id": bano.id, "estado_id": 3},
+        {"unidad_item_id": bano.id, "estado_id": 99},
+        {"unidad_item_id": cocina.id, "estado_id": 2, "observacion": "goteo"},
+    ])
+
+    salida = agregar_detalles_inspeccion_batch(ins.id, payload, sesion)
+
+    assert [(e["indice"], e["detalle"]) for e in salida["errores"]] == [
+        (1, "El detalle debe referir a UN item de UNIDAD o de ZONA."),
+        (2, "El item de unidad no corresponde a la inspección."),
+        (4, "Estado inválido"),
+    ]
+    assert [d["indice"] for d in salida["insertados"]] == [0, 3, 5]
+    # Cada id devuelto es la fila de ese índice
+    guardados = {d.id: (d.unidad_item_id, d.estado_id, d.observacion) for d in sesion.scalars(
+        select(models.InspeccionDetalle).where(models.InspeccionDetalle.inspeccion_id == ins.id))}
+    assert {d["id"]: (d["unidad_item_id"], d["estado_id"], d["observacion"]) for d in salida["insertados"]} == guardados
+    assert guardados[salida["insertados"][2]["id"]] == (cocina.id, 2, "goteo")
@@ -0,0 +1,27 @@
+import time
+
+import pytest
+from sqlalchemy import create_engine, text
+from sqlalchemy.exc import OperationalError
+
+from app import metricas
+
+def test_sentencia_fallida_no_desfasa_los_tiempos(tmp_path, monkeypatch):
+    engine = create_engine(f"sqlite:///{tmp_path / 'm.db'}")
+    metricas.instrumentar_engine(engine)
+    stats = metricas.EstadisticasSolicitud()
+    token = metricas._solicitud.set(stats)
+    try:
+        with engine.connect() as conn:
+            with pytest.raises(OperationalError):
+                conn.execute(text("SELECT * FROM no_existe"))
+            # Si el inicio de la sentencia fallida quedara pendiente, esta se mediría desde entonces
+            time.sleep(0.2)
+            conn.execute(text("SELECT 1"))
+            # Nada queda colgado en la conexión (vuelve al pool y la reusan otras solicitudes)
+            assert "metricas_inicio" not in conn.info
+    finally:
+        metricas._solicitud.reset(token)
+        engine.dispose()
+    assert stats.consultas == 1
+    assert stats.tiempo_db < 0.1
@@ -0,0 +1,23 @@
+from sqlalchemy import create_engine
+
+from app.migraciones import detectar_drift, migrar
+
+def test_drift_bd_legada(bd_legada):
+    with bd_legada.connect() as conn:
+        hallazgos = detectar_drift(conn)
+    assert "Falta la restricción única unidades(torre, piso, numero) uq_unidad_ref" in hallazgos
+    assert "Tipo distinto en articulos.precio: FLOAT (modelo: INTEGER)" in hallazgos
+    assert "Columna fuera del modelo: unidad_items.estado" in hallazgos
+
+def test_migrada_sin_drift_de_unicas(bd_legada):
+    migrar(bd_legada)
+    with bd_legada.connect() as conn:
+        hallazgos = detectar_drift(conn)
+    assert not [h for h in hallazgos if "única" in h or h.startswith("Falta")]
+
+def test_bd_nueva_sin_drift(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'nueva.db'}")
+    migrar(engine)
+    with engine.connect() as conn:
+        assert detectar_drift(conn) == []
+    engine.dispose()
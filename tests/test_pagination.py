@@ -0,0 +1,42 @@
+import json
+
+import pytest
+from sqlalchemy.orm import sessionmaker
+from starlette.requests import Request
+
+from app import database, models, schemas
+from app.columnar import COLUMNAR_JSON
+from app.pagination import NDJSON, ParametrosPagina, listar, listar_en_memoria
+
+def _pedido(accept: str) -> Request:
+    return Request({"type": "http", "method": "GET", "path": "/", "headers": [(b"accept", accept.encode())]})
+
+@pytest.mark.parametrize("accept", ["application/json", NDJSON, COLUMNAR_JSON])
+def test_listar_declara_vary_accept(sesion, accept):
+    sesion.add(models.Articulo(nombre="Silla", precio=10))
+    sesion.commit()
+
+    resp = listar(_pedido(accept), sesion.query(models.Articulo), (models.Articulo.id,),
+                  ParametrosPagina(limit=10), schemas.Articulo)
+
+    assert resp.headers["vary"] == "Accept"
+
+@pytest.mark.parametrize("accept", ["application/json", NDJSON])
+def test_listar_en_memoria_declara_vary_accept(sesion, accept):
+    estados = sesion.query(models.CatalogoEstado).all()
+
+    resp = listar_en_memoria(_pedido(accept), estados, ("orden_severidad", "id"),
+                             ParametrosPagina(limit=10), schemas.CatalogoEstadoOut)
+
+    assert resp.headers["vary"] == "Accept"
+
+def test_ndjson_lee_con_sesion_propia(cliente, sesion, bd_legada, monkeypatch):
+    # El cuerpo se escribe después de que el handler cerró su sesión
+    monkeypatch.setattr(database, "SessionLectura", sessionmaker(bind=bd_legada))
+    sesion.add_all([models.Articulo(nombre=n, precio=1) for n in ("Silla", "Mesa", "Lámpara")])
+    sesion.commit()
+
+    r = cliente.get("/api/v1/articulos", params={"limit": 2}, headers={"Accept": NDJSON})
+
+    assert r.headers["content-type"] == NDJSON
+    assert [json.loads(l)["nombre"] for l in r.text.splitlines()] == ["Silla", "Mesa"]
@@ -0,0 +1,36 @@
+from app import models
+from app.estado_items import registrar_detalles
+from app.pagination import ParametrosPagina
+from app.reportes import FiltrosPendientes, consultar_pendientes, pendientes_columnar
+
+def _filtros(**kw):
+    base = dict(severidad_min=None, torre=None, piso=None, zona_id=None, desde=None, hasta=None, inspector=None, historico=False)
+    return FiltrosPendientes(**{**base, **kw})
+
+def _tres_pendientes(db):
+    checklist = models.Checklist(nombre="Ronda", ambito=models.AmbitoEnum.UNIDAD)
+    unidad = models.Unidad(torre="P", piso=1, numero="101")
+    db.add_all([checklist, unidad])
+    db.flush()
+    items = [models.UnidadItem(unidad_id=unidad.id, nombre=f"Item {k}") for k in range(3)]
+    ins = models.Inspeccion(inspector="t", checklist_id=checklist.id, unidad_id=unidad.id)
+    db.add_all([*items, ins])
+    db.flush()
+    detalles = [models.InspeccionDetalle(inspeccion_id=ins.id, unidad_item_id=i.id, estado_id=2) for i in items]
+    db.add_all(detalles)
+    db.flush()
+    registrar_detalles(db, ins, detalles)
+    db.commit()
+
+def test_total_es_de_todos_los_pendientes(sesion):
+    _tres_pendientes(sesion)
+    pagina = consultar_pendientes(sesion, _filtros(torre="P"), ParametrosPagina(limit=2, after=None))
+    assert (pagina["en_pagina"], pagina["total"]) == (2, None)
+
+    pagina = consultar_pendientes(sesion, _filtros(torre="P"), ParametrosPagina(limit=2, after=None), contar=True)
+    assert (pagina["en_pagina"], pagina["total"]) == (2, 3)
+    siguiente = consultar_pendientes(sesion, _filtros(torre="P"), ParametrosPagina(limit=2, after=pagina["next_cursor"]), contar=True)
+    assert (siguiente["en_pagina"], siguiente["total"]) == (1, 3)
+
+    columnar = pendientes_columnar(sesion, _filtros(torre="P"), ParametrosPagina(limit=2, after=None), contar=True)
+    assert (columnar["en_pagina"], columnar["total"]) == (2, 3)
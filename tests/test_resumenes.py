@@ -0,0 +1,58 @@
+from datetime import datetime
+
+from sqlalchemy import select
+
+from app import models
+from app.estado_items import registrar_detalles
+from app.resumenes import reconstruir
+
+def _registrar(db, checklist, fecha, estados, unidad=None, zona=None):
+    # estados: {item: estado_id}
+    ins = models.Inspeccion(fecha=fecha, inspector="t", checklist_id=checklist.id,
+                            unidad_id=unidad and unidad.id, zona_id=zona and zona.id)
+    db.add(ins)
+    db.flush()
+    campo = "unidad_item_id" if unidad else "zona_item_id"
+    detalles = [models.InspeccionDetalle(inspeccion_id=ins.id, estado_id=e, **{campo: item.id}) for item, e in estados.items()]
+    db.add_all(detalles)
+    db.flush()
+    registrar_detalles(db, ins, detalles)
+    db.commit()
+
+def _resumenes(db):
+    RU, RZ = models.ResumenUnidad, models.ResumenZona
+    unidades = {f.estado_id: f.items for f in db.execute(select(RU.estado_id, RU.items).where(RU.torre == "S", RU.items != 0))}
+    zonas = {f.estado_id: f.items for f in db.execute(select(RZ.estado_id, RZ.items).where(RZ.items != 0))}
+    return unidades, zonas
+
+def test_deltas_con_fechas_fuera_de_orden(sesion):
+    checklist = models.Checklist(nombre="Ronda", ambito=models.AmbitoEnum.UNIDAD)
+    unidad, zona = models.Unidad(torre="S", piso=1, numero="101"), models.ZonaComun(nombre="Piscina")
+    sesion.add_all([checklist, unidad, zona])
+    sesion.flush()
+    cocina, bano = models.UnidadItem(unidad_id=unidad.id, nombre="Cocina"), models.UnidadItem(unidad_id=unidad.id, nombre="Baño")
+    bomba = models.ZonaItem(zona_id=zona.id, nombre="Bomba")
+    sesion.add_all([cocina, bano, bomba])
+    sesion.flush()
+
+    _registrar(sesion, checklist, datetime(2024, 3, 1), {cocina: 2, bano: 3}, unidad=unidad)
+    _registrar(sesion, checklist, datetime(2024, 3, 1), {bomba: 3}, zona=zona)
+    assert _resumenes(sesion) == ({2: 1, 3: 1}, {3: 1})
+
+    # Llega tarde una inspección anterior: no cambia el estado vigente ni los resúmenes
+    _registrar(sesion, checklist, datetime(2024, 1, 1), {cocina: 1}, unidad=unidad)
+    _registrar(sesion, checklist, datetime(2024, 1, 1), {bomba: 1}, zona=zona)
+    assert _resumenes(sesion) == ({2: 1, 3: 1}, {3: 1})
+    sesion.refresh(cocina)
+    assert (cocina.estado_id, cocina.ultima_inspeccion_fecha) == (2, datetime(2024, 3, 1))
+
+    # Una posterior sí mueve un item de estado; con la misma fecha desempata el id del detalle
+    _registrar(sesion, checklist, datetime(2024, 5, 1), {bano: 1}, unidad=unidad)
+    _registrar(sesion, checklist, datetime(2024, 5, 1), {bano: 2}, unidad=unidad)
+    _registrar(sesion, checklist, datetime(2024, 5, 1), {bomba: 1}, zona=zona)
+    assert _resumenes(sesion) == ({2: 2}, {1: 1})
+
+    # Los deltas acumulados coinciden con recalcular desde el historial
+    incremental = _resumenes(sesion)
+    reconstruir(sesion)
+    assert _resumenes(sesion) == incremental
@@ -0,0 +1,35 @@
+import asyncio
+
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+
+from app import models, schemas
+from app.catalogos import cache_catalogos
+from app.rutas_async import agregar_detalles_inspeccion_batch
+
+def test_batch_async_valida_items_de_la_inspeccion(sesion):
+    checklist = models.Checklist(nombre="Ronda", ambito=models.AmbitoEnum.UNIDAD)
+    unidad, otra = models.Unidad(torre="S", piso=1, numero="101"), models.Unidad(torre="S", piso=1, numero="102")
+    sesion.add_all([checklist, unidad, otra])
+    sesion.flush()
+    propio, ajeno = models.UnidadItem(unidad_id=unidad.id, nombre="Cocina"), models.UnidadItem(unidad_id=otra.id, nombre="Cocina")
+    ins = models.Inspeccion(inspector="t", checklist_id=checklist.id, unidad_id=unidad.id)
+    sesion.add_all([propio, ajeno, ins])
+    sesion.commit()
+    payload = schemas.InspeccionDetalleBatch(detalles=[
+        {"unidad_item_id": propio.id, "estado_id": 2},
+        {"unidad_item_id": ajeno.id, "estado_id": 2},
+    ])
+
+    async def correr():
+        engine = create_async_engine(sesion.get_bind().url.set(drivername="sqlite+aiosqlite"))
+        try:
+            async with AsyncSession(engine, expire_on_commit=False) as db:
+                return await agregar_detalles_inspeccion_batch(ins.id, payload, db)
+        finally:
+            await engine.dispose()
+
+    salida = asyncio.run(correr())
+    assert [d["unidad_item_id"] for d in salida["insertados"]] == [propio.id]
+    assert [e["indice"] for e in salida["errores"]] == [1]
+    # El estado se validó con la misma caché que usan las rutas sync
+    assert cache_catalogos._datos is not None
@@ -0,0 +1,69 @@
+from datetime import datetime
+
+from app import models
+from app.sincronizacion import ParametrosSync, cambios_desde
+
+def _cambios(db, token=None, tablas="unidades,unidad_items,inspecciones,inspeccion_detalles", limit=1000):
+    return cambios_desde(db, ParametrosSync(since=token, tablas=tablas, limit=limit))
+
+def test_subir_la_version_no_reenvia_al_padre(sesion):
+    checklist = models.Checklist(nombre="Ronda", ambito=models.AmbitoEnum.UNIDAD)
+    unidad = models.Unidad(torre="S", piso=1, numero="101")
+    sesion.add_all([checklist, unidad])
+    sesion.flush()
+    ins = models.Inspeccion(fecha=datetime(2024, 1, 1), inspector="t", checklist_id=checklist.id, unidad_id=unidad.id)
+    sesion.add(ins)
+    sesion.commit()
+    token = _cambios(sesion)["token"]
+
+    item = models.UnidadItem(unidad_id=unidad.id, nombre="Cocina")
+    sesion.add(item)
+    sesion.flush()
+    sesion.add(models.InspeccionDetalle(inspeccion_id=ins.id, unidad_item_id=item.id, estado_id=2))
+    sesion.commit()
+    sesion.refresh(ins)
+
+    cambios = _cambios(sesion, token)["cambios"]
+    assert ins.version > 1
+    assert set(cambios) == {"unidad_items", "inspeccion_detalles"}
+
+    # Un cambio de datos del padre sí viaja
+    ins.inspector = "otro"
+    sesion.commit()
+    assert [f["inspector"] for f in _cambios(sesion, token)["cambios"]["inspecciones"]["upserts"]] == ["otro"]
+
+def test_paginas_con_token(sesion):
+    sesion.add_all([models.Unidad(torre="S", piso=1, numero=str(n)) for n in range(101, 105)])
+    sesion.commit()
+    todas = {u.id for u in sesion.query(models.Unidad)}
+
+    vistas, token, paginas = [], None, []
+    while True:
+        pagina = _cambios(sesion, token, tablas="unidades", limit=2)
+        paginas.append(pagina["mas"])
+        vistas += [f["id"] for f in pagina["cambios"]["unidades"]["upserts"]]
+        token = pagina["token"]
+        if not pagina["mas"]:
+            break
+
+    assert paginas == [True, True, False]
+    assert sorted(vistas) == sorted(todas)
+    # Con el último token no queda nada pendiente
+    assert _cambios(sesion, token, tablas="unidades") == {"token": token, "mas": False, "cambios": {}}
+
+def test_borrado_llega_como_delete(sesion):
+    unidad = models.Unidad(torre="S", piso=1, numero="101")
+    sesion.add(unidad)
+    sesion.flush()
+    item = models.UnidadItem(unidad_id=unidad.id, nombre="Cocina")
+    sesion.add(item)
+    sesion.commit()
+    token = _cambios(sesion)["token"]
+
+    sesion.delete(item)
+    sesion.commit()
+
+    cambios = _cambios(sesion, token)["cambios"]
+    assert cambios["unidad_items"] == {"upserts": [], "deletes": [item.id]}
+    # El padre solo cambió de versión: no se reenvía
+    assert "unidades" not in cambios
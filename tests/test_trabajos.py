@@ -0,0 +1,71 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from app import models, trabajos
+
+@pytest.fixture
+def sin_pool(monkeypatch):
+    # Solo la cola: los trabajos no se ejecutan
+    monkeypatch.setattr(trabajos.ejecutor, "encolar", lambda trabajo_id: None)
+
+def _terminar(db, trabajo, archivo, expira_en):
+    archivo.write_text("{}")
+    trabajo.estado, trabajo.archivo, trabajo.expira_en = trabajos.TERMINADO, str(archivo), expira_en
+    trabajo.terminado_en = datetime.utcnow()
+    db.commit()
+
+def test_reporte_reutiliza_resultado_vigente(sesion, sin_pool, tmp_path):
+    trabajo, reutilizado = trabajos.enviar(sesion, "reporte_anual", {"anio": 2024})
+    assert not reutilizado
+    _terminar(sesion, trabajo, tmp_path / "r.json", datetime.utcnow() + timedelta(hours=1))
+    otro, reutilizado = trabajos.enviar(sesion, "reporte_anual", {"anio": 2024})
+    assert reutilizado and otro.id == trabajo.id
+
+def test_archivar_no_reutiliza_resultado_terminado(sesion, sin_pool, tmp_path):
+    trabajo, _ = trabajos.enviar(sesion, "archivar", {"antes_de": "2024-01-01"})
+    # Mientras no termina, un segundo envío se une al mismo
+    en_curso, reutilizado = trabajos.enviar(sesion, "archivar", {"antes_de": "2024-01-01"})
+    assert reutilizado and en_curso.id == trabajo.id
+
+    _terminar(sesion, trabajo, tmp_path / "a.json", datetime.utcnow() + timedelta(hours=1))
+    nuevo, reutilizado = trabajos.enviar(sesion, "archivar", {"antes_de": "2024-01-01"})
+    assert not reutilizado and nuevo.id != trabajo.id
+    assert nuevo.estado == trabajos.PENDIENTE
+    assert sesion.query(models.Trabajo).filter(models.Trabajo.tipo == "archivar").count() == 2
+
+def test_limpiar_vencidos_borra_archivo_y_luego_la_fila(sesion, sin_pool, tmp_path):
+    trabajo, _ = trabajos.enviar(sesion, "reporte_anual", {"anio": 2024})
+    archivo = tmp_path / "r.json"
+    expira_en = datetime.utcnow() + timedelta(hours=1)
+    _terminar(sesion, trabajo, archivo, expira_en)
+
+    assert trabajos.limpiar_vencidos(sesion, ahora=expira_en - timedelta(seconds=1)) == 0
+    assert archivo.exists()
+
+    assert trabajos.limpiar_vencidos(sesion, ahora=expira_en + timedelta(seconds=1)) == 1
+    assert not archivo.exists()
+    sesion.refresh(trabajo)
+    assert (trabajo.estado, trabajo.archivo) == (trabajos.EXPIRADO, None)
+
+    trabajo_id = trabajo.id
+    trabajos.limpiar_vencidos(sesion, ahora=expira_en + timedelta(seconds=trabajos.settings.trabajos_ttl + 1))
+    assert sesion.query(models.Trabajo).filter(models.Trabajo.id == trabajo_id).count() == 0
+
+def test_limpieza_periodica(sesion, sin_pool, tmp_path):
+    from sqlalchemy.orm import sessionmaker
+
+    trabajo, _ = trabajos.enviar(sesion, "reporte_anual", {"anio": 2023})
+    archivo = tmp_path / "r.json"
+    _terminar(sesion, trabajo, archivo, datetime.utcnow() - timedelta(seconds=1))
+
+    limpieza = trabajos.Limpieza(0.01, sessionmaker(bind=sesion.get_bind()))
+    limpieza.iniciar()
+    try:
+        for _ in range(200):
+            if not archivo.exists():
+                break
+            limpieza._fin.wait(0.01)
+    finally:
+        limpieza.detener()
+    assert not archivo.exists()
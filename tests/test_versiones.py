@@ -0,0 +1,61 @@
+from app import models
+
+def _version(db, unidad):
+    db.expire_all()
+    return db.get(models.Unidad, unidad.id).version
+
+def test_triggers_de_version(sesion):
+    unidad, otra = models.Unidad(torre="V", piso=1, numero="101"), models.Unidad(torre="V", piso=1, numero="102")
+    sesion.add_all([unidad, otra])
+    sesion.commit()
+    v = _version(sesion, unidad)
+
+    unidad.numero = "103"
+    sesion.commit()
+    assert _version(sesion, unidad) == v + 1
+
+    item = models.UnidadItem(unidad_id=unidad.id, nombre="Cocina")
+    sesion.add(item)
+    sesion.commit()
+    assert _version(sesion, unidad) == v + 2
+
+    item.nombre = "Cocina principal"
+    sesion.commit()
+    assert _version(sesion, unidad) == v + 3
+
+    # Mover el item cambia a ambas unidades
+    v_otra = _version(sesion, otra)
+    item.unidad_id = otra.id
+    sesion.commit()
+    assert (_version(sesion, unidad), _version(sesion, otra)) == (v + 4, v_otra + 1)
+
+    sesion.delete(item)
+    sesion.commit()
+    assert (_version(sesion, unidad), _version(sesion, otra)) == (v + 4, v_otra + 2)
+
+    # Una escritura que ya fija la versión no se incrementa dos veces
+    unidad.version = 50
+    sesion.commit()
+    assert _version(sesion, unidad) == 50
+
+def test_if_none_match_devuelve_304(cliente, sesion):
+    unidad = models.Unidad(torre="V", piso=1, numero="101")
+    sesion.add(unidad)
+    sesion.commit()
+    url = f"/api/v1/unidades/{unidad.id}"
+
+    r = cliente.get(url)
+    etag, modificada = r.headers["etag"], r.headers["last-modified"]
+    assert etag == f'"unidades-{unidad.id}-v{unidad.version}"'
+
+    r = cliente.get(url, headers={"If-None-Match": f'"otra", W/{etag}'})
+    assert (r.status_code, r.headers["etag"], r.content) == (304, etag, b"")
+    assert cliente.get(url, headers={"If-Modified-Since": modificada}).status_code == 304
+
+    # Un item nuevo cambia la versión: el ETag anterior ya no valida
+    sesion.add(models.UnidadItem(unidad_id=unidad.id, nombre="Cocina"))
+    sesion.commit()
+    r = cliente.get(url, headers={"If-None-Match": etag})
+    assert r.status_code == 200
+    assert r.headers["etag"] != etag
+    assert [i["nombre"] for i in r.json()["items"]] == ["Cocina"]